@@ -0,0 +1,63 @@
+"""
+Benchmark of scoring a batch of profiles, like the hosts of a /16, against the fingerprint database.
+
+The hosts are drawn from a small number of operating systems: hosts of the same OS answer the
+probes the same way except for the sequence numbers measures, so their profiles only differ in the
+SP and ISR values of SEQ. Compares calling Scoring.score for each profile with Scoring.score_many,
+and with VectorScoring.score_many when numpy is installed.
+
+Usage (from the repository root): python -m benchmarks.bench_batch_scoring [fingerprints] [profiles] [systems]
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_scoring import load_db
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from os_hound.vector_scoring import VectorScoring, np
+from tests.helpers import random_profile
+
+
+def host_profiles(rng: random.Random, scoring: Scoring, os_dicts: list, count: int, systems: int):
+    bases = []
+    for os_dict in rng.sample(os_dicts, systems):
+        bases.append({field: {key: int(value.split("-")[0].split("|")[0], 16) if key in ["T", "TG", "W1", "W"] else value
+                              for key, value in os_dict[field].items()} for field in scoring.filed_names})
+    bases += [random_profile(rng, scoring) for _ in range(systems)]
+    profiles = []
+    for _ in range(count):
+        profile = dict(rng.choice(bases))
+        profile["SEQ"] = dict(profile["SEQ"], SP=rng.randint(0, 0x10F), ISR=rng.randint(0, 0x10F))
+        profiles.append(profile)
+    return profiles
+
+
+def report(name: str, profiles: list, score_many):
+    start = time.perf_counter()
+    results = score_many(profiles)
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    systems = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    scoring = Scoring()
+    compiled = DbParser().compile_db(load_db(count))
+    rng = random.Random(0)
+    profiles = host_profiles(rng, scoring, [fingerprint.os_dict for fingerprint in compiled], profile_count, systems)
+
+    print("scoring\tprofiles\tseconds\tprofiles/s")
+    # The pure Python scorings take too long for the whole batch, they are measured on a part of it
+    sample = profiles[:500]
+    expected = report("score each profile", sample, lambda batch: [scoring.score(profile, compiled) for profile in batch])
+    results = report("Scoring.score_many", sample, lambda batch: scoring.score_many(batch, compiled))
+    assert results == expected
+
+    if np is not None:
+        vector_scoring = VectorScoring(compiled, scoring)
+        vector_results = report("VectorScoring.score_many", profiles, vector_scoring.score_many)
+        assert vector_results[:len(sample)] == expected
@@ -0,0 +1,56 @@
+"""
+Benchmark of loading the fingerprint database from the text file and from the cache.
+
+Measures the text parse, the first load that writes the cache, the warm cache load, and the
+tracemalloc peak of each. Uses os_hound/nmap-db.txt when it exists, a synthetic database with the
+size of nmap's otherwise, or the database given on the command line.
+
+Usage (from the repository root): python -m benchmarks.bench_db_cache [db_path]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_db import write_db
+from os_hound.db_parser import DbParser
+
+
+def measure(name: str, load, repeat: int = 5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        os_dicts = load()
+        times.append(time.perf_counter() - start)
+    # tracemalloc slows the loads down, the memory is measured on a separate run
+    tracemalloc.start()
+    load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}\t{len(os_dicts)}\t{min(times) * 1000:.1f}\t{peak / 1024 / 1024:.1f}")
+
+
+def load_and_write_cache(parser: DbParser):
+    if os.path.exists(parser.cache_path()):
+        os.remove(parser.cache_path())
+    return parser.parse_db()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if len(sys.argv) > 1:
+            db_path = sys.argv[1]
+        else:
+            db_path = DbParser().db_path
+            if not os.path.exists(db_path):
+                db_path = os.path.join(temp_dir, "nmap-db.txt")
+                write_db(db_path, 6000)
+
+        parser = DbParser(db_path, cache_dir=os.path.join(temp_dir, "cache"))
+        print(f"database: {db_path} ({os.path.getsize(db_path) / 1024 / 1024:.1f} MB)")
+        print("load\tfingerprints\tms\ttracemalloc peak MB")
+        measure("text parse", parser.parse_text)
+        measure("cache write", lambda: load_and_write_cache(parser))
+        measure("cache load", parser.parse_db)
+        print(f"cache file: {os.path.getsize(parser.cache_path()) / 1024 / 1024:.1f} MB")
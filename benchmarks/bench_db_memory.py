@@ -0,0 +1,45 @@
+"""
+Benchmark of the memory the parsed fingerprint database holds.
+
+Compares the FingerprintRecord list DbParser parses, with its shared FingerprintLine and interned strings,
+with the same fingerprints as plain dictionaries of dictionaries, as they are loaded from a pickle like the
+cache file. Uses os_hound/nmap-db.txt when it exists, a synthetic database with the size of nmap's otherwise,
+or the database given on the command line.
+
+Usage (from the repository root): python -m benchmarks.bench_db_memory [db_path]
+"""
+import os
+import pickle
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic_db import write_db
+from os_hound.db_parser import DbParser
+
+
+def held_memory(data: bytes):
+    """The memory held by the objects unpickled from the data, traced by tracemalloc."""
+    tracemalloc.start()
+    os_dicts = pickle.loads(data)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(os_dicts), size
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if len(sys.argv) > 1:
+            db_path = sys.argv[1]
+        else:
+            db_path = DbParser().db_path
+            if not os.path.exists(db_path):
+                db_path = os.path.join(temp_dir, "nmap-db.txt")
+                write_db(db_path, 6000, variety=300)
+        records = DbParser(db_path, use_cache=False).parse_text()
+
+    print("representation\tfingerprints\tMB\tpickle MB")
+    for name, os_dicts in [("dictionaries", [record.to_dict() for record in records]), ("records", records)]:
+        data = pickle.dumps(os_dicts, protocol=pickle.HIGHEST_PROTOCOL)
+        count, size = held_memory(data)
+        print(f"{name}\t{count}\t{size / 1024 / 1024:.1f}\t{len(data) / 1024 / 1024:.1f}")
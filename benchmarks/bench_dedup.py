@@ -0,0 +1,57 @@
+"""
+Benchmark of the fingerprints sharing one body, the test lines of several versions of an OS that answer the same.
+
+Compares a synthetic database of distinct fingerprints with one of the same size where each body has several
+titles: the memory the parsed and compiled database holds, and the profiles per second of Scoring.score and
+Scoring.top_k, which score each body once for all its titles.
+
+Usage (from the repository root): python -m benchmarks.bench_dedup [fingerprints] [profiles] [titles]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synthetic_db import write_db
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from tests.helpers import random_profile
+
+
+def load_compiled(count: int, titles: int):
+    """The compiled synthetic database and the memory it holds, traced by tracemalloc."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "nmap-db.txt")
+        write_db(db_path, count, titles=titles)
+        tracemalloc.start()
+        compiled = DbParser().compile_db(DbParser(db_path, use_cache=False).parse_text())
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return compiled, size
+
+
+def report(name: str, profiles: list, score):
+    start = time.perf_counter()
+    results = [score(profile) for profile in profiles]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    titles = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    scoring = Scoring()
+    rng = random.Random(0)
+    profiles = [random_profile(rng, scoring) for _ in range(profile_count)]
+
+    print("database\tprofiles\tseconds\tprofiles/s")
+    for name, db_titles in [("distinct", 1), (f"{titles} titles per body", titles)]:
+        compiled, size = load_compiled(count, db_titles)
+        bodies = len({id(fingerprint.tests) for fingerprint in compiled})
+        print(f"{name}: {len(compiled)} fingerprints, {bodies} bodies, {size / 1024 / 1024:.1f} MB")
+        report(f"{name}: score", profiles, lambda profile: scoring.score(profile, compiled))
+        report(f"{name}: top_k", profiles, lambda profile: scoring.top_k(profile, compiled, k=10))
@@ -0,0 +1,79 @@
+"""
+Benchmark of scoring profiles with the inverted index of DbParser.build_index on a large database.
+
+On a synthetic database of 50000 fingerprints, with hundreds of TCP options and window sizes like
+nmap's database, compares Scoring.score scanning all the database with
+Scoring.score scoring the candidates of the index, for the profiles of hosts answering like a fingerprint
+of the database and for random profiles, which mostly fall back to the full scan.
+
+Usage (from the repository root): python -m benchmarks.bench_index [fingerprints] [profiles] [variety]
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_scoring import load_db
+from os_hound.db_parser import DbParser
+from os_hound.matchers import STOP_VALUES
+from os_hound.scoring import Scoring
+from tests.helpers import NUMERIC_KEYS, random_profile
+
+
+def host_value(rng: random.Random, key: str, value: str):
+    """A value a host answering like the value of the database could send."""
+    part = rng.choice(value.split("|"))
+    if key not in NUMERIC_KEYS or part in STOP_VALUES or not part:
+        return part
+    if "-" in part:
+        low, high = part.split("-")
+        return rng.randrange(int(low, 16), max(int(high, 16), int(low, 16) + 1))
+    if ">" in part:
+        return int(part.lstrip(">"), 16) + rng.randint(1, 16)
+    if "<" in part:
+        return max(int(part.lstrip("<"), 16) - rng.randint(1, 16), 0)
+    return int(part, 16)
+
+
+def host_profile(rng: random.Random, scoring: Scoring, os_dicts: list, os_dict: dict):
+    """The profile of a host answering like a fingerprint of the database, except a few values of other fingerprints."""
+    profile = {}
+    for field in scoring.filed_names:
+        profile[field] = {}
+        for key, value in os_dict[field].items():
+            other = rng.choice(os_dicts)[field]
+            if rng.random() < 0.02 and key in other:
+                value = other[key]
+            profile[field][key] = host_value(rng, key, value)
+    return profile
+
+
+def report(name: str, profiles: list, score):
+    start = time.perf_counter()
+    results = [score(profile) for profile in profiles]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    variety = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    scoring = Scoring()
+    compiled = DbParser().compile_db(load_db(count, variety))
+    start = time.perf_counter()
+    index = DbParser().build_index(compiled)
+    print(f"build_index: {(time.perf_counter() - start) * 1000:.0f} ms for {count} fingerprints, "
+          f"{len(index.postings)} posting lists")
+    rng = random.Random(0)
+    os_dicts = [fingerprint.os_dict for fingerprint in compiled]
+    profiles = {"hosts": [host_profile(rng, scoring, os_dicts, os_dict) for os_dict in rng.sample(os_dicts, profile_count)],
+                "random": [random_profile(rng, scoring) for _ in range(profile_count)]}
+
+    print("scoring\tprofiles\tseconds\tprofiles/s")
+    for kind, kind_profiles in profiles.items():
+        expected = report(f"{kind}: full scan", kind_profiles, lambda profile: scoring.score(profile, compiled))
+        stats = scoring.new_stats()
+        assert report(f"{kind}: index", kind_profiles,
+                      lambda profile: scoring.score(profile, compiled, index, stats)) == expected
+        print(f"\t{stats['candidates'] / len(kind_profiles) / count:.1%} of the database selected as candidates")
@@ -0,0 +1,51 @@
+"""
+Benchmark of the packets per second of scapy's sr1 against the shared PacketSocket.
+
+Sends the same ICMP echo requests to the target with one sr1 call per packet, then through one
+PacketSocket from several threads like the port scanner does. Needs root.
+
+Usage (from the repository root): python -m benchmarks.bench_packet_socket [target] [count]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from scapy.config import conf
+from scapy.layers.inet import IP, ICMP
+from scapy.sendrecv import sr1
+from scapy.supersocket import L3RawSocket
+
+from os_hound.packet_socket import PacketSocket
+
+
+def bench_sr1(target: str, count: int):
+    answered = 0
+    for i in range(count):
+        if sr1(IP(dst=target) / ICMP(id=1, seq=i), timeout=1, verbose=0):
+            answered += 1
+    return answered
+
+
+def bench_packet_socket(target: str, count: int, threads: int):
+    with PacketSocket(target) as packet_socket, ThreadPoolExecutor(threads) as executor:
+        results = executor.map(lambda i: packet_socket.sr1(IP(dst=target) / ICMP(id=2, seq=i), 1), range(count))
+        return sum(1 for resp in results if resp)
+
+
+def report(name: str, count: int, bench, *args):
+    start = time.perf_counter()
+    answered = bench(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{count}\t{answered}\t{elapsed:.2f}\t{count / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    if target.startswith("127."):
+        # Packet sockets do not see the loopback replies
+        conf.L3socket = L3RawSocket
+
+    print("mode\tpackets\tanswered\tseconds\tpps")
+    report("scapy sr1", count, bench_sr1, target, count)
+    report("PacketSocket 1 thread", count, bench_packet_socket, target, count, 1)
+    report("PacketSocket 16 threads", count, bench_packet_socket, target, count, 16)
@@ -0,0 +1,62 @@
+"""
+Benchmark of the memory used to scan all the ports of a host.
+
+Compares the previous way of scanning (a 65535-element list, one Future per port and a dictionary
+of results) with the windowed submission and the PortStateMap of PortScanner. The network is
+mocked, every port is filtered. Each mode runs in its own process so the peak RSS is its own.
+
+Usage (from the repository root): python -m benchmarks.bench_port_scan_memory
+"""
+import concurrent.futures
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from os_hound.port_scanner import PortScanner
+
+
+def fake_sr1(pkt, timeout=2, verbose=0):
+    return None
+
+
+def scan_unbounded(ports):
+    """The scan as it was done before: all the ports submitted at once and a dictionary of results."""
+    states = {}
+    with patch('os_hound.port_scanner.sr1', fake_sr1):
+        scanner = PortScanner(retries=0)
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            res = {executor.submit(scanner._PortScanner__scan_state, "192.0.2.1", port): port for port in list(ports)}
+        for future in concurrent.futures.as_completed(res):
+            states[res[future]] = future.result()
+    return states
+
+
+def scan_windowed(ports):
+    with patch('os_hound.port_scanner.sr1', fake_sr1):
+        return PortScanner(retries=0).scan_port_states("192.0.2.1", ports_list=ports)
+
+
+def run(mode: str, hosts: int):
+    scan = scan_unbounded if mode == "unbounded" else scan_windowed
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Keeping the results of every host like a multi-host scan does
+    results = [scan(range(1, 65536)) for _ in range(hosts)]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode}\t{hosts}\t{len(results[0])}\t{peak / 1024:.0f}\t{max_rss}\t{elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        run(sys.argv[1], int(sys.argv[2]))
+    else:
+        print("mode\thosts\tports\ttracemalloc peak KB\tmax RSS KB\tseconds")
+        for hosts in [1, 2]:
+            for mode in ["unbounded", "windowed"]:
+                out = subprocess.run([sys.executable, "-m", "benchmarks.bench_port_scan_memory", mode, str(hosts)], capture_output=True, text=True, check=True)
+                print(out.stdout.strip())
@@ -0,0 +1,60 @@
+"""
+Benchmark of building the profiles of hosts from their responses.
+
+Compares ProfileBuilder.build_profile reading the scapy packets, as it did before, with building the profile from
+the ResponseRecords it decodes, the decoding included, on random responses of hosts dissected like received ones,
+then lists the tests and shared values of the registry that take the most time per host.
+
+Usage (from the repository root): python -m benchmarks.bench_profile_builder [hosts]
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+
+from os_hound.profile_builder import ProfileBuilder
+from tests.helpers import host_responses
+
+
+def packets_profile(responses: dict):
+    builder = ProfileBuilder({})
+    builder.responses = responses
+    return builder.build_profile()
+
+
+def records_profile(responses: dict):
+    return ProfileBuilder(responses).build_profile()
+
+
+def report(name: str, hosts: list, build):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        profiles = [build(responses) for responses in hosts]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(hosts)}\t{elapsed:.2f}\t{elapsed / len(hosts) * 1000:.2f}")
+    return profiles
+
+
+def report_tests(hosts: list, count: int = 10):
+    totals = {}
+    for responses in hosts:
+        builder = ProfileBuilder(responses)
+        with contextlib.redirect_stdout(io.StringIO()):
+            builder.build_profile()
+        for name, seconds in builder.timings.items():
+            totals[name] = totals.get(name, 0) + seconds
+    print("\ntest\tus/host")
+    for name, seconds in sorted(totals.items(), key=lambda item: -item[1])[:count]:
+        print(f"{'.'.join(name) if isinstance(name, tuple) else name}\t{seconds / len(hosts) * 1e6:.1f}")
+
+
+if __name__ == "__main__":
+    host_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(0)
+    hosts = [host_responses(rng) for _ in range(host_count)]
+
+    print("responses\thosts\tseconds\tms/host")
+    expected = report("scapy packets", hosts, packets_profile)
+    assert report("ResponseRecord", hosts, records_profile) == expected
+    report_tests(hosts)
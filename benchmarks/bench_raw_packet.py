@@ -0,0 +1,66 @@
+"""
+Benchmark of decoding received packets, with scapy's dissection against the RawPacketParser.
+
+The packets are the replies of a port scan, SYN-ACK and RST padded like short Ethernet frames, and random
+IPv4 packets that scapy dissects. Compares dissecting each packet with scapy, what the sockets did before, and turning it into a
+ResponseRecord, with RawPacketParser.decode, which leaves the packets it does not parse to scapy.
+
+Usage (from the repository root): python -m benchmarks.bench_raw_packet [packets]
+"""
+import random
+import sys
+import time
+
+from scapy.layers.inet import IP, TCP
+from os_hound.raw_packet import RawPacketParser
+from os_hound.response_record import ResponseRecord
+from tests.helpers import random_packet
+
+
+def scan_replies(rng: random.Random, count: int):
+    replies = []
+    for _ in range(count):
+        if rng.random() < 0.2:
+            tcp = TCP(sport=rng.randrange(1, 65536), dport=40000, flags="SA", seq=rng.getrandbits(32), ack=12346,
+                      window=64240, options=[("MSS", 1460), ("SAckOK", b""), ("Timestamp", (rng.getrandbits(32), 0)),
+                                             ("NOP", None), ("WScale", 7)])
+        else:
+            tcp = TCP(sport=rng.randrange(1, 65536), dport=40000, flags="RA", seq=0, ack=12346, window=0)
+        data = bytes(IP(src="192.0.2.10", dst="192.0.2.1", ttl=64, id=rng.randrange(65536)) / tcp)
+        replies.append(data + bytes(max(46 - len(data), 0)))
+    return replies
+
+
+def dissected(data: bytes):
+    try:
+        IP(data)
+    except Exception:
+        return False
+    return True
+
+
+def report(name: str, packets: list, decode):
+    start = time.perf_counter()
+    for data in packets:
+        decode(data)
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(packets)}\t{elapsed:.2f}\t{len(packets) / elapsed:.0f}")
+
+
+def scapy_record(data: bytes):
+    return ResponseRecord(IP(data))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    parser = RawPacketParser()
+    for packets_name, packets in [("scan replies", scan_replies(rng, count)),
+                                  ("random packets", [data for data in (random_packet(rng) for _ in range(count))
+                                                     if dissected(data)])]:
+        parsed = sum(parser.parse(data) is not None for data in packets)
+        print(f"{packets_name}, {parsed / len(packets):.0%} parsed without scapy")
+        print("decoding\tpackets\tseconds\tpackets/s")
+        report("scapy IP()", packets, IP)
+        report("scapy ResponseRecord", packets, scapy_record)
+        report("RawPacketParser", packets, parser.decode)
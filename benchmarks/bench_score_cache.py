@@ -0,0 +1,52 @@
+"""
+Benchmark of scoring the hosts of a fleet, which often send the same profile, with a ScoreCache.
+
+The hosts run a few images, so their profiles are drawn from a small number of distinct profiles.
+Compares Scoring.top_k for every host with ScoreCache.top_k, and reports the hits and misses of the cache,
+and the time of a second run loading the cache saved by the first one.
+
+Usage (from the repository root): python -m benchmarks.bench_score_cache [fingerprints] [hosts] [images]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_scoring import load_db
+from os_hound.db_parser import DbParser
+from os_hound.score_cache import ScoreCache
+from os_hound.scoring import Scoring
+from tests.helpers import random_profile
+
+
+def report(name: str, profiles: list, top_k):
+    start = time.perf_counter()
+    results = [[(match.os_dict["os_title"], match.score) for match in top_k(profile)] for profile in profiles]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    host_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    images = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    scoring = Scoring()
+    compiled = DbParser().compile_db(load_db(count))
+    rng = random.Random(0)
+    distinct = [random_profile(rng, scoring) for _ in range(images)]
+    # Each host builds its own profile, equal to the profile of its image
+    hosts = [{field: dict(values) for field, values in rng.choice(distinct).items()} for _ in range(host_count)]
+
+    print("scoring\thosts\tseconds\thosts/s")
+    expected = report("Scoring.top_k", hosts, lambda profile: scoring.top_k(profile, compiled))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "scores.pickle")
+        cache = ScoreCache("synthetic", path=path)
+        assert report("ScoreCache.top_k", hosts, lambda profile: cache.top_k(scoring, profile, compiled)) == expected
+        print(f"\t{cache.hits} hits, {cache.misses} misses")
+        cache.save()
+        loaded = ScoreCache("synthetic", path=path)
+        assert report("saved ScoreCache.top_k", hosts, lambda profile: loaded.top_k(scoring, profile, compiled)) == expected
+        print(f"\t{loaded.hits} hits, {loaded.misses} misses")
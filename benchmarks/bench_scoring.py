@@ -0,0 +1,77 @@
+"""
+Benchmark of scoring profiles against the fingerprint database.
+
+Compares the scoring loop that parsed the database values for every profile with the scoring of
+the values compiled once by DbParser.compile_db, on a synthetic database with the size of nmap's.
+The top 10 of Scoring.top_k is measured with the same compiled values, and the share of the
+fingerprints and comparisons their branch and bound pruning abandoned is reported. With numpy installed, the
+columnar scoring of VectorScoring is measured too.
+
+Usage (from the repository root): python -m benchmarks.bench_scoring [fingerprints] [profiles]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_db import write_db
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from os_hound.vector_scoring import VectorScoring, np
+from tests.helpers import reference_score, random_profile
+
+
+def load_db(count: int, variety: int = 0):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "nmap-db.txt")
+        write_db(db_path, count, variety=variety)
+        return DbParser(db_path, use_cache=False).parse_text()
+
+
+def report(name: str, profiles: list, score):
+    start = time.perf_counter()
+    results = [score(profile) for profile in profiles]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.2f}")
+    return results
+
+
+def report_pruned(totals: dict):
+    comparisons = totals["comparisons"] + totals["pruned_comparisons"]
+    print(f"\tpruned {totals['pruned_fingerprints'] / totals['fingerprints']:.0%} of the fingerprints, "
+          f"{totals['pruned_comparisons'] / comparisons:.0%} of the comparisons")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    scoring = Scoring()
+    os_dicts = load_db(count)
+    rng = random.Random(0)
+    profiles = [random_profile(rng, scoring) for _ in range(profile_count)]
+    # Profiles with the values of a fingerprint of the database, like the profile of a known host
+    for os_dict in rng.sample(os_dicts, profile_count):
+        profiles.append({field: {key: int(value.split("-")[0].split("|")[0], 16) if key in ["T", "TG", "W1", "W"] else value
+                                 for key, value in os_dict[field].items()} for field in scoring.filed_names})
+
+    start = time.perf_counter()
+    compiled = DbParser().compile_db(os_dicts)
+    print(f"compile_db: {(time.perf_counter() - start) * 1000:.0f} ms for {count} fingerprints")
+
+    print("scoring\tprofiles\tseconds\tprofiles/s")
+    expected = report("parse per profile", profiles, lambda profile: reference_score(scoring.scoring_dict, profile, os_dicts))
+    totals = scoring.new_stats()
+    results = report("compiled matchers", profiles, lambda profile: scoring.score(profile, compiled, stats=totals))
+    assert results == expected
+    report_pruned(totals)
+    totals = scoring.new_stats()
+    report("top 10 with confidence", profiles, lambda profile: scoring.top_k(profile, compiled, 10, stats=totals))
+    report_pruned(totals)
+
+    if np is not None:
+        start = time.perf_counter()
+        vector_scoring = VectorScoring(compiled, scoring)
+        print(f"VectorScoring: {(time.perf_counter() - start) * 1000:.0f} ms to build the columns")
+        results = report("numpy columns", profiles, vector_scoring.score)
+        assert results == expected
@@ -0,0 +1,53 @@
+"""
+Benchmark of scoring profiles against a large database split into shards scored by worker processes.
+
+On a synthetic database the size of nmap's merged with in-house fingerprints, compares Scoring.score and
+Scoring.top_k in the main process with ShardedScoring for several numbers of shards, and reports the time
+taken to start and warm the worker processes. The speedup needs as many free CPUs as shards.
+
+Usage (from the repository root): python -m benchmarks.bench_sharded_scoring [fingerprints] [profiles] [shards...]
+"""
+import os
+import random
+import sys
+import time
+
+from benchmarks.bench_scoring import load_db
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from os_hound.sharded_scoring import ShardedScoring
+from tests.helpers import random_profile
+
+
+def report(name: str, profiles: list, score):
+    start = time.perf_counter()
+    results = [score(profile) for profile in profiles]
+    elapsed = time.perf_counter() - start
+    print(f"{name}\t{len(profiles)}\t{elapsed:.2f}\t{len(profiles) / elapsed:.2f}")
+    return results
+
+
+def top_k_results(matches: list):
+    return [(match.os_dict["os_title"], match.score, match.possible) for match in matches]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    profile_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    shard_counts = [int(arg) for arg in sys.argv[3:]] or [2, 4, os.cpu_count() or 1]
+    scoring = Scoring()
+    compiled = DbParser().compile_db(load_db(count, variety=300))
+    rng = random.Random(0)
+    profiles = [random_profile(rng, scoring) for _ in range(profile_count)]
+    print(f"{count} fingerprints, {os.cpu_count()} CPUs")
+
+    print("scoring\tprofiles\tseconds\tprofiles/s")
+    expected = report("Scoring.score", profiles, lambda profile: scoring.score(profile, compiled))
+    expected_top = report("Scoring.top_k", profiles, lambda profile: top_k_results(scoring.top_k(profile, compiled)))
+    for shards in sorted(set(shard_counts)):
+        start = time.perf_counter()
+        with ShardedScoring(compiled, shards=shards) as sharded:
+            print(f"{shards} shards: {time.perf_counter() - start:.2f} s to start and warm the workers")
+            assert report(f"{shards} shards: score", profiles, sharded.score) == expected
+            assert report(f"{shards} shards: top_k", profiles,
+                          lambda profile: top_k_results(sharded.top_k(profile))) == expected_top
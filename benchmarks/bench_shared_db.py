@@ -0,0 +1,81 @@
+"""
+Benchmark of worker processes scoring against the fingerprint database.
+
+Each worker either loads the database from the cache of DbParser and builds its own VectorScoring, or
+attaches to the file written once by SharedDb.write. Reports the startup time of the workers and their
+memory after scoring a few profiles: the private memory they do not share with the other workers and
+their proportional share of the shared pages (PSS), read from /proc on Linux.
+
+Usage (from the repository root): python -m benchmarks.bench_shared_db [fingerprints] [workers]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_db import write_db
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from os_hound.shared_db import SharedDb
+from os_hound.vector_scoring import VectorScoring
+from tests.helpers import random_profile
+
+
+def memory():
+    """The private and proportional memory of the process in MB, None when /proc is not there."""
+    try:
+        with open("/proc/self/smaps_rollup") as smaps:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in smaps if line.endswith("kB\n")}
+    except OSError:
+        return None, None
+    return (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, fields["Pss"] / 1024
+
+
+def worker(mode: str, db_path: str, cache_dir: str, shared_path: str, barrier):
+    start = time.perf_counter()
+    if mode == "shared":
+        scoring = SharedDb(shared_path)
+    else:
+        scoring = VectorScoring(DbParser(db_path, cache_dir=cache_dir).compile_db())
+    startup = time.perf_counter() - start
+    rng = random.Random(os.getpid())
+    for _ in range(5):
+        try:
+            scoring.score(random_profile(rng, Scoring()))
+        except ValueError:
+            pass
+    # Every worker is alive when the memory is read, so the shared pages are split between all of them
+    barrier.wait()
+    return (startup,) + memory()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "nmap-db.txt")
+        cache_dir = os.path.join(temp_dir, "cache")
+        shared_path = os.path.join(temp_dir, "nmap-db.shared")
+        write_db(db_path, count, variety=300)
+        parser = DbParser(db_path, cache_dir=cache_dir)
+        start = time.perf_counter()
+        SharedDb.write(shared_path, parser.compile_db())
+        print(f"parse, compile and SharedDb.write: {time.perf_counter() - start:.2f} s, "
+              f"{os.path.getsize(shared_path) / 1024 / 1024:.1f} MB file")
+
+        context = multiprocessing.get_context("spawn")
+        print("mode\tworkers\tstartup s\tprivate MB\tPSS MB")
+        for mode in ["private", "shared"]:
+            with context.Manager() as manager:
+                barrier = manager.Barrier(workers)
+                with context.Pool(workers) as pool:
+                    results = pool.starmap(worker, [(mode, db_path, cache_dir, shared_path, barrier)] * workers)
+            startup = sum(result[0] for result in results) / workers
+            if results[0][1] is None:
+                print(f"{mode}\t{workers}\t{startup:.2f}\tn/a\tn/a")
+            else:
+                private = sum(result[1] for result in results) / workers
+                pss = sum(result[2] for result in results) / workers
+                print(f"{mode}\t{workers}\t{startup:.2f}\t{private:.1f}\t{pss:.1f}")
@@ -0,0 +1,94 @@
+"""
+Synthetic fingerprint database in the nmap-db.txt format for the benchmarks.
+
+The values are drawn from the kinds of expressions the real database uses (alternatives,
+hexadecimal ranges, thresholds and plain strings), so parsing and scoring have the same work to do.
+Like in the real database, the SEQ values vary a lot between fingerprints while the TTL ranges
+and the lines of the other tests come from a small set of common values. More TCP options and
+window sizes can be drawn from, like the hundreds of them of the real database.
+"""
+import random
+
+HEADER = "# Synthetic nmap OS fingerprint database\n\n# Generated for the benchmarks of OS Hound\n\n"
+
+
+TTL_RANGES = ["3B-45", "7B-85", "FA-104", "40", "80", "FF", "39-43", "2E-38"]
+OPTIONS = ["M5B4NW8NNT11SLL", "M5B4ST11NW8", "M5B4NNSW0N", "M5B4"]
+WINDOWS = ["FFFF", "8000", "7210", "FAF0"]
+
+
+def variants(values: list, count: int, variant):
+    """
+    The values extended with generated ones up to count values.
+    :param values: The common values.
+    :param count: The number of values, the common values only when it is not more than their number.
+    :param variant: Function of the number of a generated value returning it.
+    :return: The list of values.
+    """
+    return values + [variant(i) for i in range(count - len(values))]
+
+
+def hex_range(rng: random.Random, low: int, high: int):
+    start = rng.randint(low, high)
+    return f"{start:X}-{start + rng.randint(1, 16):X}"
+
+
+def fingerprint(rng: random.Random, index: int, options: list = None, windows: list = None):
+    """
+    Generate the text of one fingerprint.
+    :param rng: The random generator.
+    :param index: The number of the fingerprint, used in its title.
+    :param options: The TCP options drawn from, OPTIONS by default.
+    :param windows: The window sizes drawn from, WINDOWS by default.
+    :return: The text of the fingerprint.
+    """
+    ops = rng.choice(options or OPTIONS)
+    win = rng.choice(windows or WINDOWS)
+    ttl = rng.choice(TTL_RANGES)
+    tg = rng.choice(["40", "80", "FF"])
+    df = rng.choice(['Y', 'N'])
+    # T3 answers with a SYN-ACK or not at all, T4-T7 with a RST without options
+    t3_line = rng.choice(["R=N", f"R=Y%DF={df}%T={ttl}%TG={tg}%W={win}%S=O%A=S+%F=AS%O={ops}%RD=0%Q="])
+    rst_line = f"R=Y%DF={df}%T={ttl}%TG={tg}%W=0%S={rng.choice(['A', 'Z'])}%A={rng.choice(['S+', 'Z'])}%F={rng.choice(['AR', 'R'])}%O=%RD=0%Q="
+    lines = [
+        f"# Synthetic device {index}",
+        f"Fingerprint Synthetic OS {index}",
+        f"Class Vendor{index % 97} | OS{index % 13} | {index % 7}.X | general purpose",
+        f"CPE cpe:/o:vendor{index % 97}:os{index % 13}:{index % 7}",
+        f"SEQ(SP={hex_range(rng, 0, 0x100)}%GCD=1-6%ISR={hex_range(rng, 0, 0x110)}%TI={rng.choice(['I', 'Z', 'RD', 'RI|I'])}%CI={rng.choice(['I', 'Z', 'RI'])}%II={rng.choice(['I', 'Z', 'RI'])}%SS=S%TS={rng.choice(['U', 'A', '7', '1', '8|A'])})",
+        "OPS(" + "%".join(f"O{i}={ops}" for i in range(1, 7)) + ")",
+        "WIN(" + "%".join(f"W{i}={win}" for i in range(1, 7)) + ")",
+        f"ECN(R=Y%DF={df}%T={ttl}%TG={tg}%W={win}%O={ops}%CC={rng.choice(['Y', 'N'])}%Q=)",
+        f"T1(R=Y%DF={df}%T={ttl}%TG={tg}%S=O%A=S+%F=AS%RD=0%Q=)",
+        "T2(R=N)",
+        f"T3({t3_line})",
+        f"T4({rst_line})",
+        f"T5({rst_line})",
+        f"T6({rst_line})",
+        f"T7({rst_line})",
+        f"U1(DF=N%T={ttl}%TG={tg}%IPL={rng.choice(['38', '164', '>A0'])}%UN=0%RIPL=G%RID=G%RIPCK=G%RUCK=G%RUD=G)",
+        f"IE(DFI={rng.choice(['N', 'S', 'Y'])}%T={ttl}%TG={tg}%CD={rng.choice(['S', 'Z'])})",
+    ]
+    return "\n".join(lines)
+
+
+def write_db(db_path: str, count: int, seed: int = 0, variety: int = 0, titles: int = 1):
+    """
+    Write a synthetic database file.
+    :param db_path: The path of the file.
+    :param count: The number of fingerprints, a multiple of titles.
+    :param seed: The seed of the random generator.
+    :param variety: The number of TCP options and of window sizes drawn from, the few common ones by default.
+    :param titles: The number of titles of each fingerprint body, like the versions of an OS that answer the same.
+    """
+    rng = random.Random(seed)
+    options = variants(OPTIONS, variety, lambda i: f"M{0x5B4 - i % 0x100:X}NW{i // 0x100 % 10}NNT11SLL")
+    windows = variants(WINDOWS, variety, lambda i: f"{0x1000 + 0x10 * i:X}")
+    with open(db_path, "w", encoding="utf8") as db_file:
+        db_file.write(HEADER)
+        texts = []
+        for i in range(count // titles):
+            text = fingerprint(rng, i, options, windows)
+            texts += [text.replace(f"Synthetic OS {i}\n", f"Synthetic OS {i}.{version}\n") if titles > 1 else text
+                      for version in range(titles)]
+        db_file.write("\n\n".join(texts))
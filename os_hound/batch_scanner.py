@@ -0,0 +1,146 @@
+import random
+import socket
+import threading
+import time
+from functools import partial
+from scapy.config import conf
+from scapy.layers.inet import IP, TCP
+from os_hound.packet_socket import PacketSocket
+from os_hound.port_states import PortStateMap
+from os_hound.rate_limiter import RateLimiter
+from os_hound.raw_packet import RawPacketParser
+from os_hound.rtt_estimator import RttEstimator
+
+
+class BatchScanner:
+    """
+    Class for scanning ports with a stateless batch SYN scan.
+
+    All SYN packets are sent from one long-lived raw socket with the same source port and
+    sequence number, and a single receive loop matches the SYN-ACK/RST replies back to their port.
+    The replies are decoded by the RawPacketParser instead of being dissected by scapy.
+    """
+    # Number of ports of the first round timed to update the RTT estimator
+    RTT_SAMPLES = 64
+
+    def __init__(self, retries: int = 1, rate_limiter: RateLimiter = None, rtt_estimator: RttEstimator = None, packet_socket: PacketSocket = None):
+        """
+        :param retries: Number of extra rounds sent to the ports that did not reply.
+        :param rate_limiter: Optional rate limiter capping the packets per second.
+        :param rtt_estimator: The RTT estimator of the target, it decides how long to keep listening
+         for late replies after the last packet of a round was sent.
+        :param packet_socket: Optional open socket to the target shared with the probes,
+         otherwise the scan opens its own socket.
+        """
+        self.retries = retries
+        self.rate_limiter = rate_limiter
+        self.rtt_estimator = rtt_estimator or RttEstimator()
+        self.packet_socket = packet_socket
+        self.packets_sent = 0
+        self.parser = RawPacketParser()
+
+    def scan(self, target_ip: str, ports_list: list):
+        """
+        Scan the given ports of the target.
+
+        :param target_ip: The target IP address, or a host name such as localhost.
+        :param ports_list: A list or range of ports to scan, read again by every round.
+        :return: A PortStateMap of each port that replied to 'open' or 'closed'.
+        """
+        # The replies are matched on their source address, never on the name the target was given as
+        target_ip = socket.gethostbyname(target_ip)
+        src_port = random.randint(1024, 65535)
+        seq_num = random.randint(0, (2 ** 32) - 1)
+        states = PortStateMap()
+        sent_times = {}
+        rtt_samples = 0
+        done = threading.Event()
+
+        handle = partial(self.__handle, target_ip, src_port, seq_num, states, sent_times)
+        if self.packet_socket:
+            sock = self.packet_socket
+            sock.add_listener(handle)
+            receiver = None
+        else:
+            sock = self.__open_socket(target_ip, src_port)
+            receiver = threading.Thread(target=self.__receive, args=(sock, handle, done), daemon=True)
+            receiver.start()
+
+        try:
+            for attempt in range(self.retries + 1):
+                # The ports without a reply are read from the states, no list of them is built for a round
+                for port in (port for port in ports_list if port not in states):
+                    if self.rate_limiter:
+                        self.rate_limiter.acquire()
+                    # Only the replies of the first round give reliable RTT samples, a few of them are enough
+                    if attempt == 0 and rtt_samples < self.RTT_SAMPLES:
+                        sent_times[port] = time.monotonic()
+                        rtt_samples += 1
+                    self.packets_sent += 1
+                    sock.send(IP(dst=target_ip) / TCP(sport=src_port, dport=port, flags='S', seq=seq_num))
+
+                # Waiting for the replies of the last packets sent
+                time.sleep(self.rtt_estimator.timeout(attempt))
+                sent_times.clear()
+                if all(port in states for port in ports_list):
+                    break
+        finally:
+            if receiver:
+                done.set()
+                receiver.join()
+                sock.close()
+            else:
+                sock.remove_listener(handle)
+
+        return states
+
+    def __open_socket(self, target_ip: str, src_port: int):
+        """
+        Open the raw L3 socket, with a BPF filter for the target when it can be compiled.
+        :param target_ip: The target IP address.
+        :param src_port: The source port used for all the SYN packets.
+        :return: The L3 socket.
+        """
+        try:
+            return conf.L3socket(filter=f"tcp and src host {target_ip} and dst port {src_port}")
+        except Exception:
+            # No BPF compiler available, the receive loop does the matching on its own
+            return conf.L3socket()
+
+    def __receive(self, sock, handle, done: threading.Event):
+        """
+        Receive loop of the socket opened by the scan.
+        :param sock: The L3 socket the SYN packets are sent from.
+        :param handle: The function matching a reply to its port.
+        :param done: Event set when the scan is over.
+        """
+        while not done.is_set():
+            if not sock.select([sock], 0.05):
+                continue
+            resp = self.parser.receive(sock)
+            if resp:
+                handle(resp)
+
+    def __handle(self, target_ip: str, src_port: int, seq_num: int, states: PortStateMap, sent_times: dict, resp: IP):
+        """
+        Match a reply to the scanned port and record the state of the port.
+        :param target_ip: The target IP address.
+        :param src_port: The source port used for all the SYN packets.
+        :param seq_num: The sequence number used for all the SYN packets.
+        :param states: PortStateMap filled with the state of each port that replied.
+        :param sent_times: Dictionary of the send time of each port, used to sample the RTT.
+        :param resp: The received packet, a ResponseRecord or a scapy packet.
+        """
+        if not resp.haslayer(TCP) or resp[IP].src != target_ip:
+            return
+        # Only the replies to our SYN packets acknowledge our sequence number
+        if resp[TCP].dport != src_port or resp[TCP].ack != (seq_num + 1) & 0xFFFFFFFF:
+            return
+        sent_time = sent_times.pop(resp[TCP].sport, None)
+        if sent_time is not None:
+            self.rtt_estimator.update(time.monotonic() - sent_time)
+        # The flags of a ResponseRecord are an integer, 0x12 is SYN-ACK and 0x04 RST
+        if resp[TCP].flags == 0x12:
+            states[resp[TCP].sport] = 'open'
+        elif resp[TCP].flags & 0x04:
+            states[resp[TCP].sport] = 'closed'
@@ -1,22 +1,100 @@
 import re
+import hashlib
+import os
+import pickle
+import tempfile
 from os import path
+from os_hound.fingerprint_index import FingerprintIndex
+from os_hound.fingerprint_record import FingerprintLine, FingerprintRecord
+from os_hound.matchers import CompiledFingerprint
+
 
 class DbParser:
-    def __init__(self):
-        pass
+    """
+    Class for parsing the nmap fingerprint database.
+
+    The parsed fingerprints are kept in a pickle cache file in the user cache directory. The cache is
+    used as long as the modification time of the database did not change, or its content hash is the same.
+    """
+    # Bump when the parsed format changes so older cache files are ignored
+    CACHE_VERSION = 3
+
+    def __init__(self, db_path: str = None, cache_dir: str = None, use_cache: bool = True):
+        """
+        :param db_path: Path of the database file, the nmap-db.txt of the package by default.
+        :param cache_dir: Directory of the cache file, the os-hound directory of the user cache directory by default.
+        :param use_cache: False to always parse the database file.
+        """
+        package_directory = path.dirname(path.abspath(__file__))
+        self.db_path = path.abspath(db_path or path.join(package_directory, 'nmap-db.txt'))
+        self.cache_dir = cache_dir or self.__default_cache_dir()
+        self.use_cache = use_cache
 
     def parse_db(self):
         """
         Parse the database file and
         return a list of all dictionaries of OS fingerprints.
-        :return: list of dictionaries
+        :return: list of FingerprintRecord, read-only dictionaries of the fingerprints
+        """
+        if not self.use_cache:
+            return self.parse_text()
+
+        stat = os.stat(self.db_path)
+        cache = self.__read_cache()
+        if cache and cache["mtime_ns"] == stat.st_mtime_ns and cache["size"] == stat.st_size:
+            return cache["os_dicts"]
+
+        # The modification time changed, the cache is still valid if the content did not
+        sha256 = self.db_version()
+        if cache and cache["sha256"] == sha256:
+            os_dicts = cache["os_dicts"]
+        else:
+            os_dicts = self.parse_text()
+        self.__write_cache({"version": self.CACHE_VERSION, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                            "sha256": sha256, "os_dicts": os_dicts})
+
+        return os_dicts
+
+    def db_version(self):
+        """
+        The version of the database, the hash of the content of the file, which changes with any fingerprint.
+        :return: The hexadecimal SHA-256 of the database file.
+        """
+        with open(self.db_path, "rb") as db_file:
+            return hashlib.sha256(db_file.read()).hexdigest()
+
+    def compile_db(self, os_dicts: list[dict] = None):
+        """
+        Compile every value of the fingerprints to a Matcher, so scoring does not parse them again for each profile.
+        Equal values share one Matcher.
+        :param os_dicts: The parsed fingerprints, the database is parsed when they are not given.
+        :return: list of CompiledFingerprint, with the parsed fingerprint in their os_dict.
+        """
+        if os_dicts is None:
+            os_dicts = self.parse_db()
+        matchers = {}
+        return [CompiledFingerprint(os_dict, matchers) for os_dict in os_dicts]
+
+    def build_index(self, fingerprints: list[CompiledFingerprint] = None):
+        """
+        Build the inverted index of the compiled fingerprints, from the values of their tests to the fingerprints,
+        for Scoring.score to only score the candidates of a profile.
+        :param fingerprints: The compiled fingerprints, the database is parsed and compiled when they are not given.
+        :return: The FingerprintIndex.
+        """
+        if fingerprints is None:
+            fingerprints = self.compile_db()
+        return FingerprintIndex(fingerprints)
+
+    def parse_text(self):
+        """
+        Parse the text of the database file without using the cache.
+        :return: list of FingerprintRecord, read-only dictionaries of the fingerprints
         """
         filed_names = ["SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE"]
         os_dicts = []
         # opening the database file
-        package_directory = path.dirname(path.abspath(__file__))
-        database_directory = path.join(package_directory, 'nmap-db.txt')
-        db_file = open(database_directory, encoding="utf8")
+        db_file = open(self.db_path, encoding="utf8")
         # parsing the database file
         db_os_list = db_file.read().split("\n\n")
         db_os_list.pop(0)
@@ -49,4 +127,74 @@ class DbParser:
             os_dicts.append(os_dict)
         db_file.close()
 
-        return os_dicts
+        return self.__compact(os_dicts, filed_names)
+
+    def cache_path(self):
+        """
+        The path of the cache file of the database, one file for each database path.
+        :return: The path.
+        """
+        name = hashlib.sha256(self.db_path.encode()).hexdigest()[:16]
+        return path.join(self.cache_dir, f"nmap-db-{name}.pickle")
+
+    def __read_cache(self):
+        """
+        Read the cache file.
+        :return: The cache dictionary, or None if there is no usable cache file.
+        """
+        try:
+            with open(self.cache_path(), "rb") as cache_file:
+                cache = pickle.load(cache_file)
+        except Exception:
+            # A damaged pickle raises about any exception, the database is parsed again
+            return None
+        if not isinstance(cache, dict) or cache.get("version") != self.CACHE_VERSION or \
+                not all(key in cache for key in ("mtime_ns", "size", "sha256", "os_dicts")):
+            return None
+        return cache
+
+    def __write_cache(self, cache: dict):
+        """
+        Write the cache file, replacing the previous one at once so a reader never sees half of it.
+        A cache directory that can not be written to is ignored.
+        :param cache: The cache dictionary.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as cache_file:
+                pickle.dump(cache, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path())
+        except OSError:
+            pass
+
+    @staticmethod
+    def __compact(os_dicts: list, filed_names: list):
+        """
+        Turn the parsed fingerprints into compact records of interned strings. Equal test lines are one shared
+        FingerprintLine, many fingerprints only differ in their title and description and share all their lines.
+        :param os_dicts: The parsed fingerprints.
+        :param filed_names: The names of the test lines.
+        :return: list of FingerprintRecord
+        """
+        lines = {}
+        for os_dict in os_dicts:
+            for field in filed_names:
+                tests = os_dict[field]
+                key = tuple(tests.items())
+                if key not in lines:
+                    lines[key] = FingerprintLine.from_dict(tests)
+                os_dict[field] = lines[key]
+        return [FingerprintRecord(os_dict) for os_dict in os_dicts]
+
+    @staticmethod
+    def __default_cache_dir():
+        """
+        The os-hound directory of the user cache directory.
+        :return: The path.
+        """
+        if os.name == "nt":
+            base = os.environ.get("LOCALAPPDATA") or path.expanduser("~\\AppData\\Local")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or path.expanduser("~/.cache")
+        return path.join(base, "os-hound")
@@ -0,0 +1,83 @@
+from math import inf
+
+
+class FingerprintIndex:
+    """
+    Inverted index of the compiled database, from the values of the tests to the fingerprints that have them.
+
+    A posting list holds the positions of the fingerprints whose value of a (field, key) matches a string
+    profile value, or may match an integer profile value of a bucket of 2 ** bucket_bits integers. Ranges
+    spanning more than max_buckets buckets are kept in one wide posting list of the (field, key), looked up
+    for every integer value. Every fingerprint that matches a profile value is in its postings, a fingerprint
+    of the postings of an integer value may not match it.
+    """
+    __slots__ = ('count', 'postings', 'errors', 'bucket_bits', 'max_buckets')
+
+    def __init__(self, fingerprints: list, bucket_bits: int = 4, max_buckets: int = 64):
+        """
+        :param fingerprints: The compiled fingerprints, from DbParser.compile_db.
+        :param bucket_bits: The number of low bits of the integer values ignored by the buckets.
+        :param max_buckets: The number of buckets of the widest range put in buckets.
+        """
+        self.count = len(fingerprints)
+        self.postings = {}
+        self.errors = set()
+        self.bucket_bits = bucket_bits
+        self.max_buckets = max_buckets
+
+        # The fingerprints sharing a test line are indexed together
+        lines = {}
+        for position, fingerprint in enumerate(fingerprints):
+            for field, tests in fingerprint.tests.items():
+                line = lines.get(id(tests))
+                if line is None:
+                    line = lines[id(tests)] = (field, tests, [])
+                line[2].append(position)
+        for field, tests, positions in lines.values():
+            for key, matcher in tests.items():
+                for posting_key in self.__posting_keys(field, key, matcher):
+                    self.postings.setdefault(posting_key, []).extend(positions)
+                if matcher.error:
+                    self.errors.add((field, key))
+
+    def lookup(self, field: str, key: str, value, is_str: bool):
+        """
+        The postings of a value of a profile.
+        :param field: The field.
+        :param key: The key of the test in the field.
+        :param value: The value of the profile.
+        :param is_str: True if the value is a string, it is an integer otherwise.
+        :return: List of the posting lists of the fingerprints that may match the value, a fingerprint can be in
+         several of them.
+        """
+        if is_str:
+            postings = [self.postings.get((field, key, value))]
+        else:
+            postings = [self.postings.get((field, key, value >> self.bucket_bits)), self.postings.get((field, key, None))]
+        return [posting for posting in postings if posting]
+
+    def can_raise(self, field: str, key: str):
+        """
+        Whether a value of the database of the (field, key) has an invalid part, and raises against an integer.
+        :param field: The field.
+        :param key: The key of the test in the field.
+        :return: True if scoring an integer value of the (field, key) can raise.
+        """
+        return (field, key) in self.errors
+
+    def __posting_keys(self, field: str, key: str, matcher):
+        """
+        The keys of the postings of a value of the database.
+        :param field: The field.
+        :param key: The key of the test in the field.
+        :param matcher: The Matcher of the value.
+        :return: Set of (field, key, string or bucket), the bucket is None for the wide postings.
+        """
+        posting_keys = {(field, key, string) for string in matcher.strings}
+        for low, high in matcher.intervals:
+            if low == -inf or high == inf or ((high - 1) >> self.bucket_bits) - (low >> self.bucket_bits) >= self.max_buckets:
+                posting_keys.add((field, key, None))
+            else:
+                posting_keys.update((field, key, bucket)
+                                    for bucket in range(low >> self.bucket_bits, ((high - 1) >> self.bucket_bits) + 1))
+        return posting_keys
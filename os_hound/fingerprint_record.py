@@ -0,0 +1,139 @@
+import sys
+from collections.abc import ItemsView, Mapping
+
+# The test lines of a fingerprint, in the order of the database
+TEST_FIELDS = ("SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE")
+# The keys of a parsed fingerprint, in the order of the dictionaries DbParser parsed before the records
+FIELDS = TEST_FIELDS + ("os_title", "os_info", "os_cpe", "os_description", "description")
+
+
+class RowItems(ItemsView):
+    """
+    Items view of a FingerprintLine or a FingerprintRecord, iterating its keys along with its tuple of values
+    instead of looking each value up by its key.
+    """
+    __slots__ = ()
+
+    def __iter__(self):
+        return zip(self._mapping, self._mapping.values())
+
+
+class FingerprintLine(Mapping):
+    """
+    Compact read-only dictionary of the values of a test line of the database, such as T1(R=Y%DF=N).
+
+    The values are interned strings in a tuple, looked up through the position of their key. Lines with
+    the same keys share one tuple of keys and one dictionary of their positions.
+    """
+    __slots__ = ('names', 'positions', 'strings')
+    # Shared (keys, positions) of each tuple of keys
+    layouts = {}
+
+    def __init__(self, keys: tuple, values: tuple):
+        """
+        :param keys: The keys of the line, in their order in the database.
+        :param values: The values of the keys.
+        """
+        layout = self.layouts.get(keys)
+        if layout is None:
+            keys = tuple(sys.intern(key) for key in keys)
+            layout = self.layouts[keys] = (keys, {key: position for position, key in enumerate(keys)})
+        self.names, self.positions = layout
+        self.strings = tuple(sys.intern(value) for value in values)
+
+    @classmethod
+    def from_dict(cls, tests: dict):
+        """
+        :param tests: The dictionary of the values of the line.
+        :return: The FingerprintLine of the dictionary.
+        """
+        return cls(tuple(tests), tuple(tests.values()))
+
+    def __getitem__(self, key: str):
+        return self.strings[self.positions[key]]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def items(self):
+        return RowItems(self)
+
+    def values(self):
+        return self.strings
+
+    def __getstate__(self):
+        return self.names, self.strings
+
+    def __setstate__(self, state: tuple):
+        # The pickle shares the keys and values of the lines, only the positions are looked up again
+        names, self.strings = state
+        layout = self.layouts.get(names)
+        if layout is None:
+            layout = self.layouts[names] = (names, {key: position for position, key in enumerate(names)})
+        self.names, self.positions = layout
+
+    def __repr__(self):
+        return f"FingerprintLine({dict(self.items())!r})"
+
+
+class FingerprintRecord(Mapping):
+    """
+    Compact read-only dictionary of a parsed fingerprint of the database, with the keys of FIELDS.
+
+    The values are in one tuple, at the position of their key in FIELDS, the FingerprintLine of each test
+    line first, so the record is a fixed size object instead of a dictionary of dictionaries. Records compare
+    equal to the dictionaries with the same values, and to_dict returns such a dictionary.
+    """
+    __slots__ = ('row',)
+    positions = {field: position for position, field in enumerate(FIELDS)}
+
+    def __init__(self, os_dict: dict):
+        """
+        :param os_dict: The parsed fingerprint, the values of its test lines already FingerprintLine or dictionaries.
+        """
+        lines = (os_dict[field] for field in TEST_FIELDS)
+        # The classes and CPEs of the versions of an OS are the same
+        others = (os_dict[field] for field in FIELDS[len(TEST_FIELDS):])
+        self.row = tuple(tests if isinstance(tests, FingerprintLine) else FingerprintLine.from_dict(tests)
+                         for tests in lines) + \
+            tuple(sys.intern(value) if isinstance(value, str) else value for value in others)
+
+    def __getitem__(self, key: str):
+        return self.row[self.positions[key]]
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def items(self):
+        return RowItems(self)
+
+    def values(self):
+        return self.row
+
+    def to_dict(self):
+        """
+        :return: The fingerprint as the dictionary of dictionaries DbParser parsed before the records.
+        """
+        return {field: dict(value.items()) if isinstance(value, FingerprintLine) else value
+                for field, value in self.items()}
+
+    def __getstate__(self):
+        return self.row
+
+    def __setstate__(self, state: tuple):
+        self.row = state
+
+    def __repr__(self):
+        return f"FingerprintRecord({self['os_title']!r})"
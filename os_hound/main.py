@@ -6,7 +6,30 @@ from os_hound.db_parser import DbParser
 from os_hound.scoring import Scoring
 from os_hound.profile_builder import ProfileBuilder
 from os_hound.port_scanner import PortScanner
+from os_hound.packet_socket import PacketSocket
 from os_hound.probes import Probes
+from os_hound.rate_limiter import RateLimiter
+from os_hound.rtt_estimator import RttEstimator
+from os_hound.scan_pipeline import ScanPipeline
+
+
+def print_open_ports(open_ports: list, common_ports: dict):
+    """
+    Print the table of the open ports and their common service.
+    :param open_ports: The list of open ports.
+    :param common_ports: Dictionary of the common ports and their service.
+    """
+    print("Open Ports: ")
+    col_names = ["Port", "Service"]
+    data = []
+    for k in open_ports:
+        if k in common_ports.keys():
+            data.append((k, common_ports.get(k)))
+        else:
+            data.append((k, "not common"))
+
+    print(tabulate(data, headers=col_names, tablefmt="grid"))
+    print("\n")
 
 
 def main():
@@ -84,6 +107,7 @@ _______________________________________/\\\_____________________________________
         common_ports_list = None
         start = None
         end = None
+        fingerprint_only = False
         target = questionary.text("Enter the IP address to scan: ").ask()
         match = re.match(r"[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}", target)
         if not target:
@@ -92,7 +116,7 @@ _______________________________________/\\\_____________________________________
             pass
         elif not bool(match):
             raise ValueError("You've entered an Invalid IP address.")
-        scan_type = questionary.select("Select a scan type:", choices=["Most common ports", "Port Range", "1000 first ports", "All ports"]).ask()
+        scan_type = questionary.select("Select a scan type:", choices=["Most common ports", "Port Range", "1000 first ports", "All ports", "Fingerprint only"]).ask()
         match scan_type:
             case "1000 first ports":
                 start = 1
@@ -105,6 +129,11 @@ _______________________________________/\\\_____________________________________
             case "All ports":
                 start = 1
                 end = 65535
+            case "Fingerprint only":
+                # All the ports in priority order until an open and a closed port are found
+                start = 1
+                end = 65535
+                fingerprint_only = True
             case "Port Range":
                 start = int(questionary.text("Enter the start port number: ").ask())
                 end = int(questionary.text("Enter the end port number: ").ask())
@@ -112,55 +141,79 @@ _______________________________________/\\\_____________________________________
                     raise ValueError("Invalid port range. Ports should be between 0 and 65535.")
             case _:
                 raise ValueError("Invalid scan type.")
+        if fingerprint_only:
+            engine = "Threaded"
+        else:
+            engine = questionary.select("Select a scan engine:", choices=["Threaded", "Batch"]).ask()
+        if engine not in ["Threaded", "Batch"]:
+            raise ValueError("Invalid scan engine.")
+        pipelined = False
+        if engine == "Threaded" and not fingerprint_only:
+            ans = questionary.select("Start probing as soon as an open and a closed port are found?", choices=["Yes", "No"]).ask()
+            pipelined = ans == "Yes"
+        pps = questionary.text("Enter the packets per second limit (leave empty for no limit): ").ask()
+        if pps:
+            burst = questionary.text("Enter the burst size: ", default="1").ask()
+            rate_limiter = RateLimiter(float(pps), int(burst))
+        else:
+            rate_limiter = RateLimiter()
 
     except ValueError as ve:
         print(ve)
         sys.exit(1)
 
-    open_ports = PortScanner().syn_scan(target, start, end, common_ports_list)
+    rtt_estimator = RttEstimator()
+    # One socket to the target for the whole scan and all the probes
+    packet_socket = PacketSocket(target).open()
+    scanner = PortScanner(rate_limiter, rtt_estimator, packet_socket=packet_socket)
+    pipeline = None
+    if pipelined:
+        # The probes start as soon as an open and a closed port are found while the rest of the ports are scanned
+        pipeline = ScanPipeline(scanner, target, start, end, common_ports_list).start()
+        pipeline.wait_ready()
+        open_ports = pipeline.open_ports
+        closed_ports = pipeline.closed_ports
+    else:
+        port_states = scanner.scan_port_states(target, start, end, common_ports_list, engine.lower(), fingerprint_only, list(common_ports.keys()))
+        open_ports = [port for port, state in port_states.items() if state == 'open']
+        closed_ports = [port for port, state in port_states.items() if state == 'closed']
+        print(f"The scan sent {scanner.packets_sent} packets in {scanner.scan_time:.2f} seconds.")
 
     if not open_ports:
+        packet_socket.close()
         if end and start:
             print(f"No open ports found on {target} between ports {start} and {end}.")
         else:
             print(f"No open ports found on {target}.")
         raise SystemExit
 
-    print("Open Ports: ")
-    col_names = ["Port", "Service"]
-    data = []
-    for k in open_ports:
-        if k in common_ports.keys():
-            data.append((k, common_ports.get(k)))
-        else:
-            data.append((k, "not common"))
+    if not pipeline:
+        print_open_ports(open_ports, common_ports)
 
-    print(tabulate(data, headers=col_names, tablefmt="grid"))
-    print("\n")
+    responses = Probes(target, open_ports, closed_ports, rate_limiter, rtt_estimator, packet_socket).probe_all()
 
-    p = Probes(target, open_ports)
-    probes = [p.tcp_syn_probe, p.icmp_echo_probe, p.tcp_ecn_probe, p.tcp_probe, p.tcp_probe, p.tcp_probe, p.tcp_probe, p.tcp_probe, p.tcp_probe, p.udp_probe]
-    responses = {}
-    for i in range(0, len(probes)):
-        if probes[i] == p.tcp_probe:
-            response, probe_type, original_pkt = probes[i](f'T{i-1}')
-            responses[probe_type] = [response, original_pkt]
-            continue
-        else:
-            response, probe_type, original_pkt = probes[i]()
-            responses[probe_type] = [response, original_pkt]
-            continue
+    if pipeline:
+        print_open_ports(pipeline.join(), common_ports)
+    packet_socket.close()
 
     profile = ProfileBuilder(responses).build_profile()
-    os_dicts = DbParser().parse_db()
-    results = Scoring().score(profile, os_dicts)
-    print(f"The OS Prediction is: {results[0][0]['os_title']}")
-    print(f"The OS Information: {results[0][0]['os_info']}")
-    if results[0][0]['os_description'] != "":
-        print(f"The OS description: {results[0][0]['os_description']}")
+    os_dicts = DbParser().compile_db()
+    results = Scoring().top_k(profile, os_dicts, k=5)
+    best = results[0].os_dict
+    print(f"The OS Prediction is: {best['os_title']} ({results[0].confidence:.0f}% confidence)")
+    print(f"The OS Information: {best['os_info']}")
+    if best['os_description'] != "":
+        print(f"The OS description: {best['os_description']}")
         print("\n")
-    if results[0][0]['os_cpe'] != "":
-        print(f"The OS CPE: {results[0][0]['os_cpe']}")
+    if best['os_cpe'] != "":
+        print(f"The OS CPE: {best['os_cpe']}")
+    print("Closest matches: ")
+    print(tabulate([(match.os_dict['os_title'], f"{match.confidence:.0f}%", f"{match.score}/{match.possible}")
+                    for match in results], headers=["OS", "Confidence", "Points"], tablefmt="grid"))
+
+    achieved_pps = rate_limiter.achieved_pps()
+    if achieved_pps:
+        print(f"Sent {rate_limiter.packets_sent} packets at {achieved_pps:.1f} packets per second.")
 
 
 if __name__ == "__main__":
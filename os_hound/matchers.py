@@ -0,0 +1,132 @@
+from math import inf
+from os_hound.fingerprint_record import FingerprintLine
+
+# Returned by Matcher.match_int when the database value stops the scoring of the rest of the field
+STOP = "STOP"
+
+# Database values that stop the scoring of the rest of the field when the profile value is an integer
+STOP_VALUES = ['G', 'U', 'I', 'BI', 'RI', 'RD', 'Z']
+
+
+class Matcher:
+    """
+    Compiled form of a value of the fingerprint database, such as "1-5|7|>A".
+
+    A string profile value matches when it is one of the "|" alternatives of the value. An integer
+    profile value matches when it is in one of the half-open intervals the hexadecimal ranges,
+    thresholds and numbers of the value are compiled to. Parts that are not valid hexadecimal
+    raise the same ValueError as int(x, 16) when they are reached, like the scoring always did.
+    """
+    __slots__ = ('value', 'strings', 'intervals', 'stop', 'error')
+
+    def __init__(self, value: str):
+        """
+        :param value: The value of the database.
+        """
+        self.value = value
+        self.strings = frozenset(value.split("|"))
+        self.intervals = []
+        self.stop = False
+        self.error = None
+
+        if "|" in value:
+            for part in value.split("|"):
+                if "-" in part:
+                    bounds = part.split("-")
+                    self.__add(lambda: (int(bounds[0], 16), int(bounds[1], 16)))
+                elif ">" in part:
+                    self.__add(lambda: (int(part.strip(">"), 16) + 1, inf))
+                else:
+                    self.__add(lambda: (int(part, 16), int(part, 16) + 1))
+                if self.error:
+                    # The parts after an invalid one are never reached
+                    break
+        elif "-" in value:
+            bounds = value.split("-")
+            self.__add(lambda: (int(bounds[0], 16), int(bounds[1], 16)))
+        elif ">" in value:
+            self.__add(lambda: (int(value.lstrip(">"), 16) + 1, inf))
+        elif "<" in value:
+            self.__add(lambda: (-inf, int(value.lstrip("<"), 16)))
+        elif value in STOP_VALUES:
+            self.stop = True
+        else:
+            self.__add(lambda: (int(value, 16), int(value, 16) + 1))
+
+        self.intervals = tuple(self.intervals)
+
+    def __repr__(self):
+        return f"Matcher({self.value!r})"
+
+    def match_str(self, profile_value: str):
+        """
+        Match a string profile value.
+        :param profile_value: The value of the profile.
+        :return: True if it matches.
+        """
+        return profile_value in self.strings
+
+    def match_int(self, profile_value: int):
+        """
+        Match an integer profile value.
+        :param profile_value: The value of the profile.
+        :return: True if it matches, False if it does not, STOP if the rest of the field is not scored.
+        """
+        if self.stop:
+            return STOP
+        for low, high in self.intervals:
+            if low <= profile_value < high:
+                return True
+        if self.error:
+            raise ValueError(self.error)
+        return False
+
+    def __add(self, bounds):
+        """
+        Add the interval of a part of the value, or record the error of an invalid part.
+        :param bounds: Function returning the low and high bound of the interval.
+        """
+        try:
+            self.intervals.append(bounds())
+        except ValueError as ve:
+            self.error = str(ve)
+
+
+class CompiledFingerprint:
+    """
+    Fingerprint of the database with every test value compiled to a Matcher.
+
+    Fingerprints compiled with the same matchers dictionary share one dictionary of matchers for
+    equal test lines, which lets the scoring score a line once for all the fingerprints that have it,
+    and one tests dictionary for equal bodies, all their test lines, scored once for all their titles.
+    """
+    __slots__ = ('os_dict', 'tests', 'errors')
+
+    def __init__(self, os_dict: dict, matchers: dict = None):
+        """
+        :param os_dict: The parsed fingerprint.
+        :param matchers: Optional dictionary of the matchers, test lines, bodies and sets of errors already compiled,
+         shared by the fingerprints so every distinct value, line and body is compiled once.
+        """
+        if matchers is None:
+            matchers = {}
+        self.os_dict = os_dict
+        self.tests = {}
+        for field, tests in os_dict.items():
+            if isinstance(tests, (dict, FingerprintLine)):
+                line = (field, frozenset(tests.items()))
+                if line not in matchers:
+                    matchers[line] = {key: matchers.get(value) or matchers.setdefault(value, Matcher(value))
+                                      for key, value in tests.items()}
+                self.tests[field] = matchers[line]
+        # Fingerprints with the same test lines, that only differ in their title and description, share one body
+        body = tuple((field, id(tests)) for field, tests in self.tests.items())
+        if body not in matchers:
+            # The values with an invalid part, they raise when they score an integer. Equal sets are shared
+            errors = frozenset((field, key) for field, tests in self.tests.items()
+                               for key, matcher in tests.items() if matcher.error)
+            matchers[body] = (self.tests, matchers.setdefault(errors, errors))
+        self.tests, self.errors = matchers[body]
+
+    def __repr__(self):
+        return f"CompiledFingerprint({self.os_dict.get('os_title')!r})"
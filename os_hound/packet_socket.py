@@ -0,0 +1,219 @@
+import socket
+import threading
+import time
+from scapy.config import conf
+from scapy.layers.inet import IP, TCP, ICMP, IPerror, UDPerror, UDP
+from os_hound.raw_packet import RawPacketParser, ICMP_ERROR_TYPES
+from os_hound.response_record import ResponseRecord
+
+# The (request, reply) ICMP types of the queries, answered with the id and seq of the request
+ICMP_ANSWERS = frozenset([(8, 0), (13, 14), (15, 16), (17, 18), (33, 34), (35, 36), (37, 38)])
+# The TCP flags the answers are told apart with
+SYN, RST, ACK = 0x02, 0x04, 0x10
+
+
+class PacketSocket:
+    """
+    Class for a long-lived L3 socket to a target shared by the port scanner and the probes.
+
+    The socket is opened once with a BPF filter limited to the target, and a single receive thread
+    matches each incoming packet to the request it answers, so sending a packet costs a send and a
+    match instead of opening a socket and a sniffer for every packet like scapy's sr1 does. The packets are
+    decoded by the RawPacketParser into ResponseRecord, the answers and the packets given to the listeners,
+    and matched to the requests on the fields of the records. Only the few answers the records do not tell
+    apart, UDP replies and ICMP errors quoting a TCP or ICMP header, are dissected by scapy to be matched.
+    """
+    def __init__(self, target_ip: str):
+        """
+        :param target_ip: The target IP address, or a host name such as localhost.
+        """
+        # The answers are matched on their source address, never on the name the target was given as
+        self.target_ip = socket.gethostbyname(target_ip)
+        self.sock = None
+        self.receiver = None
+        self.pending = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.parser = RawPacketParser()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        """Open the socket and start the receive thread."""
+        try:
+            self.sock = conf.L3socket(filter=f"src host {self.target_ip}")
+        except Exception:
+            # No BPF compiler available, the receive thread does the filtering on its own
+            self.sock = conf.L3socket()
+        self.closed.clear()
+        self.receiver = threading.Thread(target=self.__receive, daemon=True)
+        self.receiver.start()
+        return self
+
+    def close(self):
+        """Stop the receive thread and close the socket."""
+        self.closed.set()
+        if self.receiver:
+            self.receiver.join()
+            self.receiver = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def send(self, pkt: IP):
+        """
+        Send a packet without waiting for an answer.
+        :param pkt: The packet to send.
+        """
+        self.sock.send(pkt)
+
+    def sr1(self, pkt: IP, timeout: float):
+        """
+        Send a packet and wait for the first packet answering it.
+        Can be called from several threads at once.
+
+        :param pkt: The packet to send.
+        :param timeout: Seconds to wait for the answer.
+        :return: The ResponseRecord of the answer or None.
+        """
+        return self.sr1_timed(pkt, timeout)[0]
+
+    def sr1_timed(self, pkt: IP, timeout: float):
+        """
+        Send a packet and wait for the first packet answering it, timing both packets.
+        The times are taken with time.perf_counter_ns right before the send and right after the receive.
+
+        :param pkt: The packet to send.
+        :param timeout: Seconds to wait for the answer.
+        :return: Tuple of the ResponseRecord of the answer or None, the send time and the receive time or None.
+        """
+        # Building the packet once so random fields are fixed before matching the answers against it
+        data = bytes(pkt)
+        pkt = pkt.__class__(data)
+        request = [pkt, self.parser.decode(data), threading.Event(), None, None]
+        with self.lock:
+            self.pending.append(request)
+        try:
+            sent_ns = time.perf_counter_ns()
+            self.sock.send(pkt)
+            request[2].wait(timeout)
+        finally:
+            with self.lock:
+                if request in self.pending:
+                    self.pending.remove(request)
+
+        return request[3], sent_ns, request[4]
+
+    def add_listener(self, listener):
+        """
+        Register a function called with every packet received from the target that did not answer a request.
+        :param listener: The function.
+        """
+        with self.lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a function registered with add_listener.
+        :param listener: The function.
+        """
+        with self.lock:
+            self.listeners.remove(listener)
+
+    def __receive(self):
+        """Receive loop matching the packets from the target to the pending requests."""
+        while not self.closed.is_set():
+            if not self.sock.select([self.sock], 0.05):
+                continue
+            link_type, data, received = self.sock.recv_raw()
+            received_ns = time.perf_counter_ns()
+            data = self.parser.ip_data(link_type, data) if data is not None else None
+            resp = self.parser.decode(data, received) if data is not None else None
+            if not resp or resp[IP].src != self.target_ip:
+                continue
+
+            with self.lock:
+                request = self.__match(resp, data)
+                if request:
+                    self.pending.remove(request)
+                    request[3] = resp
+                    request[4] = received_ns
+                listeners = list(self.listeners)
+
+            if request:
+                request[2].set()
+            else:
+                for listener in listeners:
+                    listener(resp)
+
+    def __match(self, resp: ResponseRecord, data: bytes):
+        """
+        Find the pending request a received packet answers, called with the lock held.
+        :param resp: The ResponseRecord of the packet.
+        :param data: The bytes of the packet, dissected by scapy when the records do not tell whether it answers.
+        :return: The request, None if it answers none of them.
+        """
+        packet = None
+        for request in self.pending:
+            answers = self.__answers(resp, request[1])
+            if answers is None:
+                if packet is None:
+                    try:
+                        packet = IP(bytes(data))
+                    except Exception:
+                        return None
+                answers = packet.answers(request[0])
+            if answers:
+                return request
+        return None
+
+    @staticmethod
+    def __answers(resp: ResponseRecord, sent: ResponseRecord):
+        """
+        Tell whether a packet answers a request from their records, with the checks of scapy's Packet.answers.
+        :param resp: The ResponseRecord of the received packet.
+        :param sent: The ResponseRecord of the request.
+        :return: True or False, None when the records do not tell and scapy has to.
+        """
+        if sent is None:
+            return None
+        ip, sent_ip = resp[IP], sent[IP]
+        if ip.dst != sent_ip.src:
+            return False
+        if ip.proto == 1 and resp.haslayer(ICMP) and resp[ICMP].type in ICMP_ERROR_TYPES:
+            # An ICMP error answers the request whose headers it quotes
+            if not resp.haslayer(IPerror):
+                return None
+            quoted = resp[IPerror]
+            if quoted.src != sent_ip.src or quoted.dst != sent_ip.dst or quoted.proto != sent_ip.proto:
+                return False
+            if resp.haslayer(UDPerror) and sent.haslayer(UDP):
+                return resp[UDPerror].sport == sent[UDP].sport and resp[UDPerror].dport == sent[UDP].dport
+            return None
+        if ip.src != sent_ip.dst or ip.proto != sent_ip.proto:
+            return False
+
+        if resp.haslayer(TCP) and sent.haslayer(TCP):
+            tcp, sent_tcp = resp[TCP], sent[TCP]
+            # A RST gets no answer, and a SYN only answers a SYN with a SYN-ACK
+            if sent_tcp.flags & RST:
+                return False
+            if tcp.flags & SYN and (not tcp.flags & ACK or not sent_tcp.flags & SYN):
+                return False
+            if tcp.sport != sent_tcp.dport or tcp.dport != sent_tcp.sport:
+                return False
+            if not (sent_tcp.flags & SYN and not sent_tcp.flags & ACK) and abs(sent_tcp.ack - tcp.seq) > 2:
+                return False
+            if tcp.flags & RST and not tcp.flags & ACK:
+                return True
+            return abs(sent_tcp.seq - tcp.ack) <= 2 + len(sent_tcp.payload)
+        if resp.haslayer(ICMP) and sent.haslayer(ICMP):
+            icmp, sent_icmp = resp[ICMP], sent[ICMP]
+            return (sent_icmp.type, icmp.type) in ICMP_ANSWERS and icmp.id == sent_icmp.id and icmp.seq == sent_icmp.seq
+        # The payload of a UDP reply answers by the rules of its layers
+        return None
@@ -2,65 +2,156 @@ from scapy.volatile import RandShort
 from scapy.sendrecv import *
 from scapy.layers.inet import IP, TCP
 import concurrent.futures
+import itertools
+import threading
+import time
+from os_hound.batch_scanner import BatchScanner
+from os_hound.packet_socket import PacketSocket
+from os_hound.port_states import PortStateMap
+from os_hound.rate_limiter import RateLimiter
+from os_hound.rtt_estimator import RttEstimator
 
 
 class PortScanner:
     """Class for scanning ports."""
-    def __init__(self):
-        pass
+    def __init__(self, rate_limiter: RateLimiter = None, rtt_estimator: RttEstimator = None, retries: int = 2, window: int = 64,
+                 packet_socket: PacketSocket = None):
+        """
+        :param rate_limiter: Optional rate limiter shared with the probes to cap the packets per second.
+        :param rtt_estimator: The RTT estimator of the target driving the wait time of each packet,
+         share it with the probes so they benefit from the RTT measured during the scan.
+        :param retries: Number of retransmissions for a port that did not reply.
+        :param window: Maximum number of ports submitted to the thread pool at once,
+         it keeps the memory of a scan constant whatever the size of the range.
+        :param packet_socket: Optional open socket to the target shared with the probes,
+         otherwise each packet is sent with its own scapy sr1 call.
+        """
+        self.rate_limiter = rate_limiter
+        self.rtt_estimator = rtt_estimator or RttEstimator()
+        self.retries = retries
+        self.window = window
+        self.packet_socket = packet_socket
+        # Results and statistics of the last scan
+        self.port_states = PortStateMap()
+        self.packets_sent = 0
+        self.scan_time = 0
+        self.__lock = threading.Lock()
+        self.__cancel = threading.Event()
 
-    def syn_scan(self, target_ip: str, start_port: int = None, end_port: int = None, ports_list: list = None):
+    def syn_scan(self, target_ip: str, start_port: int = None, end_port: int = None, ports_list: list = None, engine: str = "threaded",
+                 fingerprint_only: bool = False, priority_ports: list = None):
         """
         Scan ports using the SYN scan method.
+        The state of every scanned port is kept in port_states.
 
         :param target_ip: The target IP address.
         :param start_port: The start port to scan.
         :param end_port:  The end port to scan.
         :param ports_list: A list of ports to scan.
+        :param engine: The scan engine, "threaded" or "batch" (see scan_port_states).
+        :param fingerprint_only: Stop the scan as soon as an open and a closed port are found.
+        :param priority_ports: Ports visited first, e.g. the most common ports.
         :return: A list of open ports.
         """
+        port_states = self.scan_port_states(target_ip, start_port, end_port, ports_list, engine, fingerprint_only, priority_ports)
+        return [port for port, state in port_states.items() if state == 'open']
+
+    def scan_port_states(self, target_ip: str, start_port: int = None, end_port: int = None, ports_list: list = None, engine: str = "threaded",
+                         fingerprint_only: bool = False, priority_ports: list = None):
+        """
+        Scan ports using the SYN scan method and determine the state of each one.
+        The number of packets sent and the elapsed time are kept in packets_sent and scan_time.
+
+        :param target_ip: The target IP address.
+        :param start_port: The start port to scan.
+        :param end_port:  The end port to scan.
+        :param ports_list: A list of ports to scan.
+        :param engine: The scan engine, "threaded" sends each port with its own sr1 call,
+         "batch" sends all the ports from one raw socket (see BatchScanner).
+        :param fingerprint_only: Stop the scan as soon as an open and a closed port are found,
+         which is all the probes need for the OS detection. Only supported by the threaded engine.
+        :param priority_ports: Ports visited first, e.g. the most common ports.
+        :return: PortStateMap of the scanned ports to their state, 'open', 'closed' or 'filtered'.
+        """
+        if not ports_list and start_port and end_port:
+            ports_list = range(start_port, end_port + 1)
+
+        if engine == "batch":
+            if fingerprint_only:
+                raise ValueError("The fingerprint only scan is only supported by the threaded engine.")
+            start_time = time.monotonic()
+            batch_scanner = BatchScanner(retries=self.retries, rate_limiter=self.rate_limiter, rtt_estimator=self.rtt_estimator,
+                                         packet_socket=self.packet_socket)
+            self.port_states = batch_scanner.scan(target_ip, ports_list)
+            for port in ports_list:
+                if port not in self.port_states:
+                    self.port_states[port] = 'filtered'
+            self.packets_sent = batch_scanner.packets_sent
+            self.scan_time = time.monotonic() - start_time
+            return self.port_states
+        elif engine != "threaded":
+            raise ValueError(f"Invalid scan engine: {engine}")
+
         # MULTITHREADING CODE
-        open_ports = []
+        open_found = False
+        closed_found = False
+        for port, state in self.iter_syn_scan(target_ip, ports_list=ports_list, priority_ports=priority_ports):
+            open_found = open_found or state == 'open'
+            closed_found = closed_found or state == 'closed'
+            if fingerprint_only and open_found and closed_found:
+                break
+
+        return self.port_states
+
+    def iter_syn_scan(self, target_ip: str, start_port: int = None, end_port: int = None, ports_list: list = None, priority_ports: list = None):
+        """
+        Scan ports using the SYN scan method, yielding the state of each port as soon as it is known.
+        Closing the generator early cancels the ports that were not scanned yet.
+
+        :param target_ip: The target IP address.
+        :param start_port: The start port to scan.
+        :param end_port:  The end port to scan.
+        :param ports_list: A list of ports to scan.
+        :param priority_ports: Ports visited first, e.g. the most common ports.
+        :return: A generator of (port, state) tuples, the state being 'open', 'closed' or 'filtered'.
+        """
         if not ports_list and start_port and end_port:
-            ports_list = list(range(start_port, end_port + 1))
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            res = [executor.submit(self.__scan, target_ip, port) for port in ports_list]
-
-        for port in concurrent.futures.as_completed(res):
-            if port.result():
-                open_ports.append(port.result())
-            else:
-                pass
-
-        # SYNCHRONOUS CODE
-        # open_ports = []
-        # if not ports_list and start_port and end_port:
-        #     for port in range(start_port, end_port + 1):
-        #         res = None
-        #         res = self.__scan(target_ip, port)
-        #         if res:
-        #             open_ports.append(port)
-        #         else:
-        #             pass
-        #
-        # else:
-        #     for port in ports_list:
-        #         res = None
-        #         res = self.__scan(target_ip, port)
-        #         if res:
-        #             open_ports.append(port)
-        #         else:
-        #             pass
-
-        return open_ports
-
-    def __scan(self, target_ip, port: int):
+            ports_list = range(start_port, end_port + 1)
+        ports = iter(ports_list)
+        if priority_ports:
+            first = [port for port in priority_ports if port in ports_list]
+            first_set = set(first)
+            ports = itertools.chain(first, (port for port in ports_list if port not in first_set))
+
+        start_time = time.monotonic()
+        self.packets_sent = 0
+        self.port_states = PortStateMap()
+        self.__cancel.clear()
+        executor = concurrent.futures.ThreadPoolExecutor()
+        try:
+            # Only a window of ports is submitted at once, the next port is submitted when one completes
+            res = {executor.submit(self.__scan_state, target_ip, port): port for port in itertools.islice(ports, self.window)}
+
+            while res:
+                done, _ = concurrent.futures.wait(res, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    port = res.pop(future)
+                    for next_port in itertools.islice(ports, 1):
+                        res[executor.submit(self.__scan_state, target_ip, next_port)] = next_port
+                    self.port_states[port] = future.result()
+                    yield port, future.result()
+        finally:
+            # Reaching the in-flight workers so they stop before their next retransmission
+            self.__cancel.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.scan_time = time.monotonic() - start_time
+
+    def __scan_state(self, target_ip, port: int):
         """
-        Scan a single port.
+        Scan a single port and determine its state.
         :param target_ip: The target IP address.
         :param port: The port to scan.
-        :return: The list of open ports.
+        :return: 'open' for a SYN-ACK reply, 'closed' for a RST reply and 'filtered' otherwise.
         """
         # Use a random source port for each scan
         src_port = RandShort()
@@ -69,15 +160,38 @@ class PortScanner:
         pkt = IP(dst=target_ip) / TCP(sport=src_port, dport=port, flags='S')
 
         try:
-            # Sending the packet and waiting for a response
-            resp = sr1(pkt, timeout=2, verbose=0, retry=2)
+            resp = None
+            for attempt in range(self.retries + 1):
+                if self.__cancel.is_set():
+                    break
+                # Sending the packet and waiting for a response
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                with self.__lock:
+                    self.packets_sent += 1
+                sent_time = time.monotonic()
+                timeout = self.rtt_estimator.timeout(attempt)
+                if self.packet_socket:
+                    resp = self.packet_socket.sr1(pkt, timeout)
+                else:
+                    resp = sr1(pkt, timeout=timeout, verbose=0)
+                if resp:
+                    # Only a reply to the first transmission gives a reliable RTT sample
+                    if attempt == 0:
+                        self.rtt_estimator.update(time.monotonic() - sent_time)
+                    break
 
-            if resp:
+            if resp and resp.haslayer(TCP):
+                # The flags of the ResponseRecord of the packet socket are an integer, like the ones of BatchScanner
+                flags = int(resp[TCP].flags)
                 # SYN-ACK indicates the port is open
-                if resp[TCP].flags == 'SA':
-                    return port
-                elif resp[TCP].flags == 'RA':
-                    return None
+                if flags == 0x12:
+                    return 'open'
+                # RST indicates the port is closed
+                elif flags & 0x04:
+                    return 'closed'
 
         except Exception:
-            print(f"port {port} is closed.")
+            print(f"Failed to scan port {port}.")
+
+        return 'filtered'
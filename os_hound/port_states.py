@@ -0,0 +1,79 @@
+from collections.abc import MutableMapping
+
+
+class PortStateMap(MutableMapping):
+    """
+    Compact map of the state of each port of a host.
+
+    Every port uses 2 bits of a bytearray, so the map of all the 65536 ports of a host takes 16 KB
+    no matter how many ports were scanned. It behaves like a dictionary of port to state.
+    """
+    STATES = [None, 'open', 'closed', 'filtered']
+    CODES = {'open': 1, 'closed': 2, 'filtered': 3}
+
+    __slots__ = ('bits', 'count')
+
+    def __init__(self, states: dict = None):
+        """
+        :param states: Optional dictionary of port to state to fill the map with.
+        """
+        self.bits = bytearray(65536 // 4)
+        self.count = 0
+        if states:
+            self.update(states)
+
+    def __getitem__(self, port: int):
+        state = self.STATES[self.__code(port)]
+        if state is None:
+            raise KeyError(port)
+        return state
+
+    def __setitem__(self, port: int, state: str):
+        if state not in self.CODES:
+            raise ValueError(f"Invalid port state: {state}")
+        if self.__code(port) == 0:
+            self.count += 1
+        shift = (port & 3) * 2
+        self.bits[port >> 2] = (self.bits[port >> 2] & ~(3 << shift)) | (self.CODES[state] << shift)
+
+    def __delitem__(self, port: int):
+        if self.__code(port) == 0:
+            raise KeyError(port)
+        self.bits[port >> 2] &= ~(3 << ((port & 3) * 2))
+        self.count -= 1
+
+    def __iter__(self):
+        for index, byte in enumerate(self.bits):
+            # Skipping the 4 ports of the byte at once when none of them was scanned
+            if byte:
+                for i in range(4):
+                    if (byte >> (i * 2)) & 3:
+                        yield index * 4 + i
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, port):
+        return isinstance(port, int) and 0 <= port < 65536 and self.__code(port) != 0
+
+    def __repr__(self):
+        return f"PortStateMap({dict(self.items())})"
+
+    def ports(self, state: str):
+        """
+        List the ports in the given state.
+        :param state: 'open', 'closed' or 'filtered'.
+        :return: List of the ports in that state in ascending order.
+        """
+        code = self.CODES[state]
+        return [port for port in self if self.__code(port) == code]
+
+    def __code(self, port: int):
+        """
+        Read the 2 bits of a port.
+        :param port: The port number.
+        :return: The state code of the port, 0 if it was not scanned.
+        """
+        if not 0 <= port < 65536:
+            raise KeyError(port)
+        return (self.bits[port >> 2] >> ((port & 3) * 2)) & 3
@@ -1,20 +1,94 @@
 from scapy.sendrecv import *
 from scapy.layers.inet import IP, TCP, ICMP, UDP
 import random
+import time
 from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+from os_hound.packet_socket import PacketSocket
+from os_hound.rate_limiter import RateLimiter
+from os_hound.rtt_estimator import RttEstimator
 
 
 class Probes:
     """Class for generating, sending probes and collecting the response for OS fingerprinting."""
-    def __init__(self, target_ip, open_ports: list):
+    # Seconds between the sends of two consecutive SYN probes
+    SYN_INTERVAL = 0.1
+
+    def __init__(self, target_ip, open_ports: list, closed_ports: list = None, rate_limiter: RateLimiter = None, rtt_estimator: RttEstimator = None,
+                 packet_socket: PacketSocket = None):
         self.target_ip = target_ip
         self.open_ports = open_ports
+        self.closed_ports = closed_ports
+        self.rate_limiter = rate_limiter
+        self.rtt_estimator = rtt_estimator or RttEstimator()
+        self.packet_socket = packet_socket
+
+    def __sr1(self, pkt: IP):
+        """
+        Send a probe packet and wait for its response, respecting the rate limiter if there is one.
+        The wait time comes from the RTT estimator which is updated with the RTT of the response.
+        :param pkt: The probe packet.
+        :return: The response or None.
+        """
+        return self.__sr1_timed(pkt)[0]
+
+    def __sr1_timed(self, pkt: IP):
+        """
+        Send a probe packet and wait for its response like __sr1, timing both packets with time.perf_counter_ns.
+        Through the packet socket the times are taken next to the send and the receive, with scapy's sr1
+        they are taken around the call and include its setup time.
+        :param pkt: The probe packet.
+        :return: Tuple of the response or None, the send time and the receive time or None.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        if self.packet_socket:
+            response, sent_ns, received_ns = self.packet_socket.sr1_timed(pkt, self.rtt_estimator.timeout())
+        else:
+            sent_ns = time.perf_counter_ns()
+            response = sr1(pkt, timeout=self.rtt_estimator.timeout(), verbose=0)
+            received_ns = time.perf_counter_ns() if response else None
+        if response:
+            self.rtt_estimator.update((received_ns - sent_ns) / 1e9)
+        return response, sent_ns, received_ns
+
+    def __closed_port(self):
+        """
+        Pick the port for the probes that need a closed port (T5, T6, T7 and U1).
+        A port the scan found closed answers right away, a random port is often filtered and times out.
+        :return: A closed port if one is known, a random port that is not open otherwise.
+        """
+        if self.closed_ports:
+            return random.choice(self.closed_ports)
+
+        closed_port = (random.randint(0, 65535))
+        while closed_port in self.open_ports:
+            closed_port = random.randint(0, 65535)
+        return closed_port
 
     def tcp_syn_probe(self):
         """Generate and send 6 SYN packets with different TCP options and collect the responses."""
         res_list = []
         probe_type = "SYN"
+        pkt_list = self.__syn_packets()
+
+        # Send 6 SYN packets and collect responses, each one SYN_INTERVAL after the previous one was sent
+        start = time.monotonic()
+        for i, pkt in enumerate(pkt_list):
+            response = self.__sr1_at(pkt, start + i * self.SYN_INTERVAL)[0]
+            if response:
+                res_list.append(response)
+
+        return res_list, probe_type, pkt_list
+
+    def __syn_packets(self):
+        """
+        Generate the 6 SYN packets with different TCP options.
+        Each packet has its own source port so its answer can be told apart from the others.
+        :return: The list of the 6 packets.
+        """
         open_port = random.choice(self.open_ports)
+        sport = random.randint(1024, 65529)
         # Generate random sequence and acknowledgment numbers
         seq_num = random.randint(0, (2 ** 32) - 1)
         ack_num = random.randint(0, (2 ** 32) - 1)
@@ -22,46 +96,47 @@ class Probes:
         # Creating 6 SYN packets with different TCP options
         pkt1 = IP(dst=self.target_ip) / TCP(
             options=[('WScale', 10), ('NOP', None), ('MSS', 1460), ('Timestamp', (0xFFFFFFFF, 0)), ('SAckOK', '')],
-            window=1, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=1, flags="S", sport=sport, dport=open_port, seq=seq_num, ack=ack_num,)
         pkt2 = IP(dst=self.target_ip) / TCP(
             options=[('MSS', 1400), ('WScale', 0), ('SAckOK', ''), ('Timestamp', (0xFFFFFFFF, 0)), ('EOL', None)],
-            window=63, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=63, flags="S", sport=sport + 1, dport=open_port, seq=seq_num, ack=ack_num,)
         pkt3 = IP(dst=self.target_ip) / TCP(
             options=[('Timestamp', (0xFFFFFFFF, 0)), ('NOP', None), ('NOP', None), ('WScale', 5), ('NOP', None), ('MSS', 640)],
-            window=4, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=4, flags="S", sport=sport + 2, dport=open_port, seq=seq_num, ack=ack_num,)
         pkt4 = IP(dst=self.target_ip) / TCP(
             options=[('SAckOK', ''), ('Timestamp', (0xFFFFFFFF, 0)), ('WScale', 10), ('EOL', None)],
-            window=4, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=4, flags="S", sport=sport + 3, dport=open_port, seq=seq_num, ack=ack_num,)
         pkt5 = IP(dst=self.target_ip) / TCP(
             options=[('MSS', 536), ('SAckOK', ''), ('Timestamp', (0xFFFFFFFF, 0)), ('WScale', 10), ('EOL', None)],
-            window=16, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=16, flags="S", sport=sport + 4, dport=open_port, seq=seq_num, ack=ack_num,)
         pkt6 = IP(dst=self.target_ip) / TCP(
             options=[('MSS', 265), ('SAckOK', ''), ('Timestamp', (0xFFFFFFFF, 0))],
-            window=512, flags="S", dport=open_port, seq=seq_num, ack=ack_num,)
+            window=512, flags="S", sport=sport + 5, dport=open_port, seq=seq_num, ack=ack_num,)
 
-        pkt_list = [pkt1, pkt2, pkt3, pkt4, pkt5, pkt6]
-
-        # Send 6 SYN packets and collect responses
-        for pkt in pkt_list:
-            response = sr1(pkt, verbose=0, timeout=2)
-            if response:
-                res_list.append(response)
-            sleep(0.1)
-
-        return res_list, probe_type, pkt_list
+        return [pkt1, pkt2, pkt3, pkt4, pkt5, pkt6]
 
     def icmp_echo_probe(self):
         """Generate and send 2 ICMP Echo Request packets with different ICMP options and collect the responses."""
         probe_type = "IE"
+        pkt1, pkt2 = self.__icmp_echo_packets()
+
+        # Send the ICMP requests
+        response1 = self.__sr1(pkt1)
+        response2 = self.__sr1(pkt2)
+
+        return [response1, response2], probe_type, [pkt1, pkt2]
+
+    def __icmp_echo_packets(self):
+        """
+        Generate the 2 ICMP Echo Request packets with different ICMP options.
+        :return: The 2 packets.
+        """
         # First ICMP Echo Request
         icmp_1 = ICMP(type=8, code=9, id=random.randint(0, 65535), seq=295)  # type=8 means Echo Request
         payload_1 = b'\x00' * 120
         ip_1 = IP(dst=self.target_ip, flags="DF", tos=0, id=random.randint(0, 65535))
         pkt1 = ip_1 / icmp_1 / payload_1
 
-        # Send the first ICMP request
-        response1 = sr1(pkt1, timeout=1, verbose=0)
-
         # Extracting ICMP request ID and sequence number
         icmp_request_id = icmp_1.id
         icmp_seq = icmp_1.seq
@@ -72,14 +147,23 @@ class Probes:
         ip_2 = IP(dst=self.target_ip, flags="DF", tos=4, id=random.randint(0, 65535))
         pkt2 = ip_2 / icmp_2 / payload_2
 
-        # Send the second ICMP request
-        response2 = sr1(pkt2, timeout=1, verbose=0)
-
-        return [response1, response2], probe_type, [pkt1, pkt2]
+        return pkt1, pkt2
 
     def tcp_ecn_probe(self):
         """Generate and send a TCP packet with ECN flag set and collect the response."""
         probe_type = "ECN"
+        pkt = self.__ecn_packet()
+
+        # Send the packet
+        response = self.__sr1(pkt)
+
+        return response, probe_type, pkt
+
+    def __ecn_packet(self):
+        """
+        Generate the TCP packet with ECN flag set.
+        :return: The packet.
+        """
         open_port = random.choice(self.open_ports)
 
         # Defining the TCP options
@@ -99,12 +183,7 @@ class Probes:
         ip_pkt = IP(dst=self.target_ip)
 
         # Combine IP and TCP to create the full packet
-        pkt = ip_pkt / tcp_pkt
-
-        # Send the packet
-        response = sr1(pkt, timeout=1, verbose=0)
-
-        return response, probe_type, pkt
+        return ip_pkt / tcp_pkt
 
     def tcp_probe(self, probe_type: str):
         """Generate and send a TCP packet with the specified probe type ['T2', 'T3', 'T4', 'T5', 'T6', 'T7'] and collect the response."""
@@ -112,10 +191,21 @@ class Probes:
             print("Invalid probe type.")
             return None
 
+        pkt = self.__tcp_packet(probe_type)
+
+        # Send the packet
+        response = self.__sr1(pkt)
+
+        return response, probe_type, pkt
+
+    def __tcp_packet(self, probe_type: str):
+        """
+        Generate the TCP packet of the specified probe type.
+        :param probe_type: 'T2', 'T3', 'T4', 'T5', 'T6' or 'T7'.
+        :return: The packet.
+        """
         open_port = random.choice(self.open_ports)
-        closed_port = (random.randint(0, 65535))
-        while closed_port in self.open_ports:
-            closed_port = random.randint(0, 65535)
+        closed_port = self.__closed_port()
 
         # Common TCP options for T2-T7 except T7's window scale
         tcp_options = [('WScale', 10), ('NOP', None), ('MSS', 265), ('Timestamp', (0xFFFFFFFF, 0)), ('SAckOK', '')]
@@ -142,44 +232,105 @@ class Probes:
             tcp_pkt = TCP(sport=random.randint(1024, 65535), dport=closed_port, window=32768, flags='A', options=tcp_options)
             ip_pkt.flags = 'DF'  # Setting IP DF bit
 
-        elif probe_type == 'T7':
+        else:
             tcp_options[0] = ('WScale', 15)  # Changing the window scale for T7
             tcp_pkt = TCP(sport=random.randint(1024, 65535), dport=closed_port, window=65535, flags='FPU', options=tcp_options)
 
-        else:
-            print("Invalid probe type.")
-            return None
-
         # Combine IP and TCP to create the full packet
-        pkt = ip_pkt / tcp_pkt
-
-        # Send the packet
-        response = sr1(pkt, timeout=1, verbose=0)
-
-        return response, probe_type, pkt
+        return ip_pkt / tcp_pkt
 
     def udp_probe(self):
         """Generate and send a UDP packet with 300 bytes of data and collect the response."""
         probe_type = "U1"
+        pkt = self.__udp_packet()
+
+        # Send the packet and capture the response
+        response = self.__sr1(pkt)
+
+        return self.__port_unreachable(response), probe_type, pkt
+
+    def __udp_packet(self):
+        """
+        Generate the UDP packet with 300 bytes of data sent to a closed port.
+        :return: The packet.
+        """
         # Constructing the IP packet
         ip_pkt = IP(dst=self.target_ip, id=0x1042)
 
-        # Pick a random port that is not open
-        target_port = (random.randint(0, 65535))
-        while target_port in self.open_ports:
-            target_port = random.randint(0, 65535)
+        # Pick a closed port
+        target_port = self.__closed_port()
 
         # Constructing the UDP packet with 'C' repeated 300 times as data
         udp_pkt = UDP(sport=random.randint(1024, 65535), dport=target_port, chksum=0) / ('C' * 300)
 
         # Combine IP and UDP to create the full packet
-        pkt = ip_pkt / udp_pkt
-
-        # Send the packet and capture the response
-        response = sr1(pkt, timeout=1, verbose=0)
-
+        return ip_pkt / udp_pkt
+
+    @staticmethod
+    def __port_unreachable(response):
+        """
+        Keep the response of the UDP probe only if it is an ICMP port unreachable.
+        :param response: The response or None.
+        :return: The response or None.
+        """
         # Checking the response for ICMP port unreachable
         if response and response.haslayer(ICMP) and response[ICMP].type == 3 and response[ICMP].code == 3:
-            return response, probe_type, pkt
-        else:
-            return None, probe_type, pkt
+            return response
+        return None
+
+    def probe_all(self):
+        """
+        Send all the probes and collect the responses, with the probes in flight at the same time.
+
+        The 6 SYN probes are still sent 100 ms apart, the ECN, T2-T7, U1 and IE probes are sent along
+        with them, and the replies are matched back to their probe by a single packet socket. An
+        unresponsive target costs about one timeout instead of one timeout per probe.
+
+        Every entry also carries the (send, receive) time.perf_counter_ns of its packets, for SYN one pair
+        per response, which ProfileBuilder uses for the ISR, SP and TS tests.
+
+        :return: Dictionary of the probe type to the response, the original packet and the times, as ProfileBuilder expects it.
+        """
+        packet_socket = self.packet_socket
+        if not packet_socket:
+            self.packet_socket = PacketSocket(self.target_ip).open()
+
+        try:
+            syn_pkts = self.__syn_packets()
+            ie_pkts = list(self.__icmp_echo_packets())
+            other_pkts = {"ECN": self.__ecn_packet(), "U1": self.__udp_packet()}
+            for probe_type in ['T2', 'T3', 'T4', 'T5', 'T6', 'T7']:
+                other_pkts[probe_type] = self.__tcp_packet(probe_type)
+
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=len(syn_pkts) + len(ie_pkts) + len(other_pkts)) as executor:
+                syn_futures = [executor.submit(self.__sr1_at, pkt, start + i * self.SYN_INTERVAL) for i, pkt in enumerate(syn_pkts)]
+                ie_futures = [executor.submit(self.__sr1_timed, pkt) for pkt in ie_pkts]
+                other_futures = {probe_type: executor.submit(self.__sr1_timed, pkt) for probe_type, pkt in other_pkts.items()}
+
+            syn_results = [future.result() for future in syn_futures if future.result()[0]]
+            ie_results = [future.result() for future in ie_futures]
+            responses = {"SYN": [[result[0] for result in syn_results], syn_pkts, [result[1:] for result in syn_results]],
+                         "IE": [[result[0] for result in ie_results], ie_pkts, [result[1:] for result in ie_results]]}
+            for probe_type, future in other_futures.items():
+                response, sent_ns, received_ns = future.result()
+                responses[probe_type] = [response, other_pkts[probe_type], (sent_ns, received_ns)]
+            responses["U1"][0] = self.__port_unreachable(responses["U1"][0])
+        finally:
+            if not packet_socket:
+                self.packet_socket.close()
+                self.packet_socket = None
+
+        return responses
+
+    def __sr1_at(self, pkt: IP, send_time: float):
+        """
+        Wait until the given time then send a probe packet and wait for its response.
+        :param pkt: The probe packet.
+        :param send_time: The time.monotonic() to send the packet at.
+        :return: Tuple of the response or None, the send time and the receive time or None.
+        """
+        delay = send_time - time.monotonic()
+        if delay > 0:
+            sleep(delay)
+        return self.__sr1_timed(pkt)
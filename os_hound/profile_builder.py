@@ -1,173 +1,264 @@
+import time
+from os_hound.response_record import ResponseRecord
 from os_hound.test_methods import TestMethods
-from scapy.layers.inet import TCP
+
+# The fields of the profile, in their order
+FIELDS = ("SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE")
+# The number of SYN probes, each giving an O and a W test
+SYN_PROBES = 6
+
+
+class ProfileTest:
+    """
+    A test of the profile, or an intermediate value shared by several tests, computed from named inputs.
+
+    An input is the name of a response or probe of RESPONSE_INPUTS, of a shared value of SHARED_VALUES or the
+    (field, key) of another test of PROFILE_TESTS. The function is called with the TestMethods and the value of
+    each input. It is skipped when one of its required values is missing, which a test the response of its
+    probe is missing for would have returned "None" for.
+    """
+    __slots__ = ('function', 'inputs', 'required')
+
+    def __init__(self, function, inputs: tuple = (), required: tuple = None):
+        """
+        :param function: The function computing the value from the TestMethods and the values of the inputs.
+        :param inputs: The names of the inputs of the function.
+        :param required: The names of the values that must not be missing, the inputs by default.
+        """
+        self.function = function
+        self.inputs = inputs
+        self.required = inputs if required is None else required
+
+
+# The responses and probes of Probes.probe_all the tests read: the probe type, the position in its entry (the
+# response, the probe, the times) and the position in the list of the SYN and IE probes
+RESPONSE_INPUTS = {"SYN": ("SYN", 0, None), "SYN times": ("SYN", 2, None), "T1": ("SYN", 0, 0),
+                   "T1 probe": ("SYN", 1, 0), "IE": ("IE", 0, None), "IE1": ("IE", 0, 0), "IE2": ("IE", 0, 1)}
+for _probe_type in ("ECN", "T2", "T3", "T4", "T5", "T6", "T7", "U1"):
+    RESPONSE_INPUTS[_probe_type] = (_probe_type, 0, None)
+    RESPONSE_INPUTS[f"{_probe_type} probe"] = (_probe_type, 1, None)
+
+
+def _method(name: str):
+    """The function calling a test method of the TestMethods, the one of a subclass overriding it included."""
+    return lambda methods, *inputs: getattr(methods, name)(*inputs)
+
+
+def _list_or_missing(value):
+    """:return: The list a test returned, None when it returned "None"."""
+    return None if value == "None" else value
+
+
+# The values shared by several tests, each computed once for the profile
+SHARED_VALUES = {
+    # The send times of the SYN probes recorded by Probes.probe_all, in seconds
+    "syn_sent_times": ProfileTest(lambda methods, times: [sent_ns / 1e9 for sent_ns, received_ns in times],
+                                  ("SYN times",)),
+    "send_intervals": ProfileTest(lambda methods, syn, times: methods.send_intervals(syn, times) if times else None,
+                                  ("SYN", "syn_sent_times")),
+    # The differences of the ISNs and their GCD
+    "isn_gcd": ProfileTest(_method("tcp_isn_gcd"), ("SYN",)),
+    # The ISR and the rates of the ISN counter, missing without differences
+    "isn_rates": ProfileTest(lambda methods, isn_gcd, intervals: _list_or_missing(
+        methods.tcp_isn_isr(isn_gcd[0], intervals)), ("isn_gcd", "send_intervals"), ("isn_gcd",)),
+    "hop_count": ProfileTest(_method("hop_count"), ("U1",)),
+    "syn_options": ProfileTest(lambda methods, syn: _list_or_missing(methods.extract_tcp_options(syn)), ("SYN",)),
+    "syn_windows": ProfileTest(lambda methods, syn: _list_or_missing(methods.extract_tcp_window_size(syn)),
+                               ("SYN",)),
+}
+
+
+def _initial_ttl(methods: TestMethods, hop_count: int):
+    """The T test from the shared hop count, like TestMethods.compute_initial_ttl."""
+    return None if hop_count is None else 64 + hop_count
+
+
+def _tcp_tests(probe: str, keys: tuple):
+    """
+    The tests of the response to a TCP probe.
+    :param probe: The name of the response in RESPONSE_INPUTS.
+    :param keys: The keys of the tests of the field.
+    :return: Dictionary of each key to its test.
+    """
+    probe_pkt = f"{probe} probe"
+    tests = {
+        "R": ProfileTest(lambda methods, response: methods.check_responsiveness("SYN", response), (probe,), ()),
+        "DF": ProfileTest(_method("check_dont_fragment_bit"), (probe,)),
+        "T": ProfileTest(_initial_ttl, ("hop_count",), (probe, "U1")),
+        "TG": ProfileTest(_method("ttl_guess_test"), (probe,)),
+        "W": ProfileTest(_method("extract_tcp_window_size"), (probe,)),
+        "O": ProfileTest(_method("extract_tcp_options"), (probe,)),
+        "CC": ProfileTest(_method("congestion_control_test"), (probe,)),
+        "S": ProfileTest(_method("sequence_test"), (probe, probe_pkt)),
+        "A": ProfileTest(_method("ack_test"), (probe, probe_pkt)),
+        "F": ProfileTest(_method("extract_tcp_flags"), (probe,)),
+        "RD": ProfileTest(_method("get_rst_data_checksum"), (probe,)),
+        # An empty Q is kept when the probe has no response
+        "Q": ProfileTest(_method("check_tcp_quirks"), (probe,), ()),
+    }
+    return {key: tests[key] for key in keys}
+
+
+def _listed_test(shared: str, position: int):
+    """The test of the value of one SYN probe in a list of the values of all of them."""
+    return ProfileTest(lambda methods, values: values[position] if position < len(values) else "None", (shared,))
+
+
+# The test of each (field, key) of the profile, in the order of the profile
+PROFILE_TESTS = {
+    ("SEQ", "SP"): ProfileTest(lambda methods, isn_rates, isn_gcd: methods.tcp_isn_sp(isn_rates[1], isn_gcd[1]),
+                               ("isn_rates", "isn_gcd")),
+    ("SEQ", "GCD"): ProfileTest(lambda methods, isn_gcd: isn_gcd[1], ("isn_gcd",)),
+    ("SEQ", "ISR"): ProfileTest(lambda methods, isn_rates: isn_rates[0], ("isn_rates",)),
+    ("SEQ", "TI"): ProfileTest(lambda methods, syn: methods.ip_id_sequence(syn, "TI"), ("SYN",)),
+    ("SEQ", "CI"): ProfileTest(lambda methods, *responses: methods.ip_id_sequence(list(responses), "CI"),
+                               ("T5", "T6", "T7")),
+    ("SEQ", "II"): ProfileTest(lambda methods, ie: methods.ip_id_sequence(ie, "II"), ("IE",)),
+    # Only when the TCP and ICMP IP ID sequences are both incremental
+    ("SEQ", "SS"): ProfileTest(lambda methods, ti, ii, syn, ie: methods.shared_ip_id(syn, ie)
+                               if ti == ii and ii in ["RI", "BI", "I"] else "None",
+                               (("SEQ", "TI"), ("SEQ", "II"), "SYN", "IE")),
+    ("SEQ", "TS"): ProfileTest(_method("calculate_ts"), ("SYN", "syn_sent_times"), ("SYN",)),
+}
+PROFILE_TESTS.update({("OPS", f"O{number}"): _listed_test("syn_options", number - 1)
+                      for number in range(1, SYN_PROBES + 1)})
+PROFILE_TESTS.update({("WIN", f"W{number}"): _listed_test("syn_windows", number - 1)
+                      for number in range(1, SYN_PROBES + 1)})
+PROFILE_TESTS.update({("ECN", key): test for key, test in
+                      _tcp_tests("ECN", ("R", "DF", "T", "TG", "W", "O", "CC", "Q")).items()})
+PROFILE_TESTS.update({("T1", key): test for key, test in
+                      _tcp_tests("T1", ("R", "DF", "T", "TG", "S", "A", "F", "RD", "Q")).items()})
+for _probe_type in ("T2", "T3", "T4", "T5", "T6", "T7"):
+    PROFILE_TESTS.update({(_probe_type, key): test for key, test in
+                          _tcp_tests(_probe_type, ("R", "DF", "T", "TG", "W", "S", "A", "F", "RD", "Q")).items()})
+PROFILE_TESTS.update({
+    ("U1", "R"): ProfileTest(lambda methods, u1: methods.check_responsiveness("U1", u1), ("U1",), ()),
+    ("U1", "DF"): ProfileTest(_method("check_dont_fragment_bit"), ("U1",)),
+    ("U1", "T"): ProfileTest(_initial_ttl, ("hop_count",), ("U1",)),
+    ("U1", "TG"): ProfileTest(_method("ttl_guess_test"), ("U1",)),
+    ("U1", "IPL"): ProfileTest(_method("get_ip_total_length"), ("U1",)),
+    ("U1", "UN"): ProfileTest(_method("check_icmp_unused_field"), ("U1",)),
+    ("U1", "RIPL"): ProfileTest(_method("check_returned_ip_length"), ("U1",)),
+    ("U1", "RID"): ProfileTest(_method("check_returned_ip_id"), ("U1",)),
+    ("U1", "RIPCK"): ProfileTest(_method("check_returned_ip_checksum"), ("U1",)),
+    ("U1", "RUCK"): ProfileTest(_method("check_returned_udp_checksum"), ("U1", "U1 probe")),
+    ("U1", "RUD"): ProfileTest(_method("check_returned_udp_data_integrity"), ("U1",)),
+    ("IE", "R"): ProfileTest(lambda methods, ie1, ie2: "Y" if methods.check_responsiveness("IE", ie1) and
+                             methods.check_responsiveness("IE", ie2) else "N", ("IE1", "IE2"), ()),
+    ("IE", "DFI"): ProfileTest(_method("dfi_test_value"), ("IE",), ("IE1", "IE2")),
+    ("IE", "T"): ProfileTest(_initial_ttl, ("hop_count",), ("IE1", "U1")),
+    ("IE", "TG"): ProfileTest(_method("ttl_guess_test"), ("IE1",)),
+    ("IE", "CD"): ProfileTest(_method("icmp_response_code"), ("IE",), ("IE1", "IE2")),
+})
 
 
 class ProfileBuilder:
+    """
+    Builds the OS profile from the responses by evaluating the tests of PROFILE_TESTS.
+
+    The selected tests and the shared values they depend on are ordered once so that each one is computed at most
+    once per profile, after the values it reads, and tests whose required responses are missing are skipped.
+    timings holds the seconds each test and shared value of the last profile took, its dependencies not included,
+    and skipped the ones that were skipped.
+    """
+    # The evaluation order of each selection of tests
+    plans = {}
+
     def __init__(self, responses: dict):
-        self.responses = responses
+        """
+        :param responses: The responses of Probes.probe_all, their packets are decoded once into ResponseRecord.
+        """
+        self.responses = ResponseRecord.decode(responses)
         self.methods = TestMethods()
+        self.values = {}
+        self.timings = {}
+        self.skipped = set()
 
-    def build_profile(self):
+    def build_profile(self, tests=None):
         """
         Build the OS profile by using all the test methods
         based on the responses from all the probes sent.
 
+        :param tests: Optional fields, or (field, key) tests, to build the profile of; all the tests by default.
+         The tests the selected ones depend on are computed too, but not added to the profile.
         :return: returns a dictionary containing the OS profile
         """
-        os_dict = {"SEQ": {}, "OPS": {}, "WIN": {}, "ECN": {}, "T1": {}, "T2": {}, "T3": {}, "T4": {}, "T5": {}, "T6": {}, "T7": {}, "U1": {}, "IE": {}}
-
-        # SEQ
-        diff1, gcd = self.methods.tcp_isn_gcd(self.responses["SYN"][0])
-        isr, seq_rates = self.methods.tcp_isn_isr(diff1)
-        os_dict["SEQ"]["SP"] = self.methods.tcp_isn_sp(seq_rates, gcd)
-        os_dict["SEQ"]["GCD"] = gcd
-        os_dict["SEQ"]["ISR"] = isr
-        os_dict["SEQ"]["TI"] = self.methods.ip_id_sequence(self.responses["SYN"][0], "TI")
-        os_dict["SEQ"]["CI"] = self.methods.ip_id_sequence([self.responses['T5'][0], self.responses['T6'][0], self.responses['T7'][0]], "CI")
-        os_dict["SEQ"]["II"] = self.methods.ip_id_sequence(self.responses["IE"][0], "II")
-
-        opt_ii = ["RI", "BI", "I"]
-        if os_dict["SEQ"]["TI"] == os_dict["SEQ"]["II"] and os_dict["SEQ"]["II"] in opt_ii:
-            os_dict["SEQ"]["SS"] = self.methods.shared_ip_id(self.responses["SYN"][0], self.responses["IE"][0])
-        os_dict["SEQ"]["TS"] = self.methods.calculate_ts(self.responses["SYN"][0])
-
-        # OPS
-        op_list = self.methods.extract_tcp_options(self.responses["SYN"][0])
-        op_counter = 1
-        for op in op_list:
-            os_dict["OPS"][f"O{op_counter}"] = op
-            op_counter += 1
-
-        # WIN
-        ws_list = self.methods.extract_tcp_window_size(self.responses["SYN"][0])
-        ws_counter = 1
-        for ws in ws_list:
-            os_dict["WIN"][f"W{ws_counter}"] = ws
-            ws_counter += 1
-
-        # ECN
-        os_dict["ECN"]["R"] = self.methods.check_responsiveness("ECN", self.responses["ECN"][0])
-        os_dict["ECN"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["ECN"][0])
-        os_dict["ECN"]["T"] = self.methods.compute_initial_ttl(self.responses["ECN"][0], self.responses["U1"][0])
-        os_dict["ECN"]["TG"] = self.methods.ttl_guess_test(self.responses["ECN"][0])
-        os_dict["ECN"]["W"] = self.methods.extract_tcp_window_size(self.responses["ECN"][0])
-        os_dict["ECN"]["O"] = self.methods.extract_tcp_options(self.responses["ECN"][0])
-        os_dict["ECN"]["CC"] = self.methods.congestion_control_test(self.responses["ECN"][0])
-        os_dict["ECN"]["Q"] = self.methods.check_tcp_quirks(self.responses["ECN"][0])
-
-        # T1
-        os_dict["T1"]["R"] = self.methods.check_responsiveness("SYN", self.responses["SYN"][0][0])
-        os_dict["T1"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["SYN"][0][0])
-        os_dict["T1"]["T"] = self.methods.compute_initial_ttl(self.responses["SYN"][0][0], self.responses["U1"][0])
-        os_dict["T1"]["TG"] = self.methods.ttl_guess_test(self.responses["SYN"][0][0])
-        os_dict["T1"]["S"] = self.methods.sequence_test(self.responses["SYN"][0][0], self.responses["SYN"][1][0])
-        os_dict["T1"]["A"] = self.methods.ack_test(self.responses["SYN"][0][0], self.responses["SYN"][1][0])
-        os_dict["T1"]["F"] = self.methods.extract_tcp_flags(self.responses["SYN"][0][0])
-        os_dict["T1"]["RD"] = self.methods.get_rst_data_checksum(self.responses["SYN"][0][0])
-        os_dict["T1"]["Q"] = self.methods.check_tcp_quirks(self.responses["SYN"][0][0])
-
-        # T2
-        os_dict["T2"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T2"][0])
-        os_dict["T2"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T2"][0])
-        os_dict["T2"]["T"] = self.methods.compute_initial_ttl(self.responses["T2"][0], self.responses["U1"][0])
-        os_dict["T2"]["TG"] = self.methods.ttl_guess_test(self.responses["T2"][0])
-        os_dict["T2"]["W"] = self.methods.extract_tcp_window_size(self.responses["T2"][0])
-        os_dict["T2"]["S"] = self.methods.sequence_test(self.responses["T2"][0], self.responses["T2"][1])
-        os_dict["T2"]["A"] = self.methods.ack_test(self.responses["T2"][0], self.responses["T2"][1])
-        os_dict["T2"]["F"] = self.methods.extract_tcp_flags(self.responses["T2"][0])
-        os_dict["T2"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T2"][0])
-        os_dict["T2"]["Q"] = self.methods.check_tcp_quirks(self.responses["T2"][0])
-
-        # T3
-        os_dict["T3"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T3"][0])
-        os_dict["T3"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T3"][0])
-        os_dict["T3"]["T"] = self.methods.compute_initial_ttl(self.responses["T3"][0], self.responses["U1"][0])
-        os_dict["T3"]["TG"] = self.methods.ttl_guess_test(self.responses["T3"][0])
-        os_dict["T3"]["W"] = self.methods.extract_tcp_window_size(self.responses["T3"][0])
-        os_dict["T3"]["S"] = self.methods.sequence_test(self.responses["T3"][0], self.responses["T3"][1])
-        os_dict["T3"]["A"] = self.methods.ack_test(self.responses["T3"][0], self.responses["T3"][1])
-        os_dict["T3"]["F"] = self.methods.extract_tcp_flags(self.responses["T3"][0])
-        os_dict["T3"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T3"][0])
-        os_dict["T3"]["Q"] = self.methods.check_tcp_quirks(self.responses["T3"][0])
-
-        # T4
-        os_dict["T4"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T4"][0])
-        os_dict["T4"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T4"][0])
-        os_dict["T4"]["T"] = self.methods.compute_initial_ttl(self.responses["T4"][0], self.responses["U1"][0])
-        os_dict["T4"]["TG"] = self.methods.ttl_guess_test(self.responses["T4"][0])
-        os_dict["T4"]["W"] = self.methods.extract_tcp_window_size(self.responses["T4"][0])
-        os_dict["T4"]["S"] = self.methods.sequence_test(self.responses["T4"][0], self.responses["T4"][1])
-        os_dict["T4"]["A"] = self.methods.ack_test(self.responses["T4"][0], self.responses["T4"][1])
-        os_dict["T4"]["F"] = self.methods.extract_tcp_flags(self.responses["T4"][0])
-        os_dict["T4"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T4"][0])
-        os_dict["T4"]["Q"] = self.methods.check_tcp_quirks(self.responses["T4"][0])
-
-        # T5
-        os_dict["T5"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T5"][0])
-        os_dict["T5"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T5"][0])
-        os_dict["T5"]["T"] = self.methods.compute_initial_ttl(self.responses["T5"][0], self.responses["U1"][0])
-        os_dict["T5"]["TG"] = self.methods.ttl_guess_test(self.responses["T5"][0])
-        os_dict["T5"]["W"] = self.methods.extract_tcp_window_size(self.responses["T5"][0])
-        os_dict["T5"]["S"] = self.methods.sequence_test(self.responses["T5"][0], self.responses["T5"][1])
-        os_dict["T5"]["A"] = self.methods.ack_test(self.responses["T5"][0], self.responses["T5"][1])
-        os_dict["T5"]["F"] = self.methods.extract_tcp_flags(self.responses["T5"][0])
-        os_dict["T5"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T5"][0])
-        os_dict["T5"]["Q"] = self.methods.check_tcp_quirks(self.responses["T5"][0])
-
-        # T6
-        os_dict["T6"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T6"][0])
-        os_dict["T6"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T6"][0])
-        os_dict["T6"]["T"] = self.methods.compute_initial_ttl(self.responses["T6"][0], self.responses["U1"][0])
-        os_dict["T6"]["TG"] = self.methods.ttl_guess_test(self.responses["T6"][0])
-        os_dict["T6"]["W"] = self.methods.extract_tcp_window_size(self.responses["T6"][0])
-        os_dict["T6"]["S"] = self.methods.sequence_test(self.responses["T6"][0], self.responses["T6"][1])
-        os_dict["T6"]["A"] = self.methods.ack_test(self.responses["T6"][0], self.responses["T6"][1])
-        os_dict["T6"]["F"] = self.methods.extract_tcp_flags(self.responses["T6"][0])
-        os_dict["T6"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T6"][0])
-        os_dict["T6"]["Q"] = self.methods.check_tcp_quirks(self.responses["T6"][0])
-
-        # T7
-        os_dict["T7"]["R"] = self.methods.check_responsiveness("SYN", self.responses["T7"][0])
-        os_dict["T7"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["T7"][0])
-        os_dict["T7"]["T"] = self.methods.compute_initial_ttl(self.responses["T7"][0], self.responses["U1"][0])
-        os_dict["T7"]["TG"] = self.methods.ttl_guess_test(self.responses["T7"][0])
-        os_dict["T7"]["W"] = self.methods.extract_tcp_window_size(self.responses["T7"][0])
-        os_dict["T7"]["S"] = self.methods.sequence_test(self.responses["T7"][0], self.responses["T7"][1])
-        os_dict["T7"]["A"] = self.methods.ack_test(self.responses["T7"][0], self.responses["T7"][1])
-        os_dict["T7"]["F"] = self.methods.extract_tcp_flags(self.responses["T7"][0])
-        os_dict["T7"]["RD"] = self.methods.get_rst_data_checksum(self.responses["T7"][0])
-        os_dict["T7"]["Q"] = self.methods.check_tcp_quirks(self.responses["T7"][0])
-
-        # U1
-        os_dict["U1"]["R"] = self.methods.check_responsiveness("U1", self.responses["U1"][0])
-        os_dict["U1"]["DF"] = self.methods.check_dont_fragment_bit(self.responses["U1"][0])
-        os_dict["U1"]["T"] = self.methods.compute_initial_ttl(self.responses["U1"][0], self.responses["U1"][0])
-        os_dict["U1"]["TG"] = self.methods.ttl_guess_test(self.responses["U1"][0])
-        os_dict["U1"]["IPL"] = self.methods.get_ip_total_length(self.responses["U1"][0])
-        os_dict["U1"]["UN"] = self.methods.check_icmp_unused_field(self.responses["U1"][0])
-        os_dict["U1"]["RIPL"] = self.methods.check_returned_ip_length(self.responses["U1"][0])
-        os_dict["U1"]["RID"] = self.methods.check_returned_ip_id(self.responses["U1"][0])
-        os_dict["U1"]["RIPCK"] = self.methods.check_returned_ip_checksum(self.responses["U1"][0])
-        os_dict["U1"]["RUCK"] = self.methods.check_returned_udp_checksum(self.responses["U1"][0], self.responses["U1"][1])
-        os_dict["U1"]["RUD"] = self.methods.check_returned_udp_data_integrity(self.responses["U1"][0])
-
-        # IE
-        r1 = self.methods.check_responsiveness("IE", self.responses["IE"][0][0])
-        r2 = self.methods.check_responsiveness("IE", self.responses["IE"][0][1])
-        if r1 and r2:
-            os_dict["IE"]["R"] = "Y"
-        else:
-            os_dict["IE"]["R"] = "N"
-
-        os_dict["IE"]["DFI"] = self.methods.dfi_test_value(self.responses["IE"][0])
-        os_dict["IE"]["T"] = self.methods.compute_initial_ttl(self.responses["IE"][0][0], self.responses["U1"][0])
-        os_dict["IE"]["TG"] = self.methods.ttl_guess_test(self.responses["IE"][0][0])
-        os_dict["IE"]["CD"] = self.methods.icmp_response_code(self.responses["IE"][0])
-
-        # Remove None keys
-        for key in list(os_dict.keys()):
-            for k in list(os_dict[key].keys()):
-                if os_dict[key][k] == "None":
-                    os_dict[key].pop(k)
+        selected = self.__select(tests)
+        values = self.values = {name: self.__response(name) for name in RESPONSE_INPUTS}
+        timings = self.timings = {}
+        skipped = self.skipped = set()
+
+        methods = self.methods
+        clock = time.perf_counter
+        for name, test in self.__plan(selected):
+            for required in test.required:
+                if values[required] is None:
+                    skipped.add(name)
+                    values[name] = None
+                    break
+            else:
+                inputs = [values[input_name] for input_name in test.inputs]
+                start = clock()
+                values[name] = test.function(methods, *inputs)
+                timings[name] = clock() - start
+
+        fields = {field for field, key in selected}
+        os_dict = {field: {} for field in FIELDS if field in fields}
+        for field, key in selected:
+            value = values[(field, key)]
+            # Remove the skipped tests and the ones without a value
+            if (field, key) not in skipped and value != "None":
+                os_dict[field][key] = value
 
         return os_dict
+
+    @staticmethod
+    def __select(tests):
+        """
+        :param tests: The fields or (field, key) tests selected, None for all of them.
+        :return: Tuple of the (field, key) of the selected tests, in the order of the profile.
+        """
+        if tests is None:
+            return tuple(PROFILE_TESTS)
+        tests = set(tests)
+        unknown = {test for test in tests if test not in PROFILE_TESTS and test not in FIELDS}
+        if unknown:
+            raise ValueError(f"Unknown profile tests: {sorted(map(str, unknown))}")
+        return tuple(test for test in PROFILE_TESTS if test in tests or test[0] in tests)
+
+    def __plan(self, selected: tuple):
+        """
+        :param selected: The (field, key) of the selected tests.
+        :return: List of the (name, test) of the selected tests and of the tests and shared values they depend on,
+         each after the ones it reads.
+        """
+        plan = self.plans.get(selected)
+        if plan is None:
+            plan = []
+            planned = set(RESPONSE_INPUTS)
+
+            def add(name):
+                if name in planned:
+                    return
+                planned.add(name)
+                test = PROFILE_TESTS[name] if name in PROFILE_TESTS else SHARED_VALUES[name]
+                for dependency in test.required + test.inputs:
+                    add(dependency)
+                plan.append((name, test))
+
+            for name in selected:
+                add(name)
+            self.plans[selected] = plan
+        return plan
+
+    def __response(self, name: str):
+        """
+        :param name: The name of the response or probe in RESPONSE_INPUTS.
+        :return: The response or probe, None if it is missing.
+        """
+        probe_type, position, index = RESPONSE_INPUTS[name]
+        entry = self.responses.get(probe_type)
+        value = entry[position] if entry and len(entry) > position else None
+        if index is not None:
+            value = value[index] if value and len(value) > index else None
+        return value
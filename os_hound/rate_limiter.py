@@ -0,0 +1,59 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket limiting how many packets per second are put on the wire."""
+    def __init__(self, pps: float = None, burst: int = 1):
+        """
+        :param pps: The packets per second ceiling, None for no limit.
+        :param burst: The number of packets that can be sent back to back before the ceiling applies.
+        """
+        if pps is not None and pps <= 0:
+            raise ValueError("The packets per second rate must be positive.")
+        if burst < 1:
+            raise ValueError("The burst size must be at least 1.")
+        self.pps = pps
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+        self.packets_sent = 0
+        self.first_send = None
+        self.last_send = None
+
+    def acquire(self, count: int = 1):
+        """
+        Block until `count` packets can be sent and account for them.
+        The limiter is thread safe so it can be shared by the port scanner and the probes.
+
+        :param count: The number of packets about to be sent.
+        """
+        with self.lock:
+            now = time.monotonic()
+            wait = 0
+            if self.pps is not None:
+                # Refill the bucket and reserve the tokens, going into debt if there are not enough of them
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.pps)
+                self.last_refill = now
+                self.tokens -= count
+                if self.tokens < 0:
+                    wait = -self.tokens / self.pps
+
+            self.packets_sent += count
+            if self.first_send is None:
+                self.first_send = now + wait
+            self.last_send = max(self.last_send or 0, now + wait)
+
+        if wait:
+            time.sleep(wait)
+
+    def achieved_pps(self):
+        """
+        Calculate the packets per second rate that was actually achieved.
+        :return: The achieved rate, or None if less than two packets were sent.
+        """
+        with self.lock:
+            if self.packets_sent < 2 or self.last_send == self.first_send:
+                return None
+            return (self.packets_sent - 1) / (self.last_send - self.first_send)
@@ -0,0 +1,266 @@
+import socket
+import struct
+import time
+from scapy.layers.inet import IP, TCP, ICMP, IPerror, UDPerror, UDP, TCPOptions, TCPAOValue
+from scapy.layers.l2 import CookedLinux, Ether
+from os_hound.response_record import ResponseRecord, IpFields, TcpFields, IcmpFields, UdpFields
+
+IP_HEADER = struct.Struct("!BBHHHBBH4s4s")
+TCP_HEADER = struct.Struct("!HHIIBBHHH")
+UDP_HEADER = struct.Struct("!HHHH")
+ID_SEQ = struct.Struct("!HH")
+ETHER_TYPE = struct.Struct("!H")
+
+# The ICMP types with an id and a seq field, and the ones quoting the header of the packet in error
+ICMP_ID_SEQ_TYPES = frozenset([0, 8, 13, 14, 15, 16, 17, 18, 37, 38])
+ICMP_ERROR_TYPES = frozenset([3, 4, 5, 11, 12])
+# The ICMP errors scapy reads an RFC 4884 extension at the end of, once they have 144 octets
+ICMP_EXTENSION_TYPES = frozenset([3, 11, 12])
+ICMP_EXTENSION_SIZE = 144
+# The Ethernet types of IPv4 and of the 802.1Q and 802.1ad VLAN tags
+ETH_P_IP = 0x0800
+ETH_P_VLAN = frozenset([0x8100, 0x88A8])
+
+
+class RawPacketParser:
+    """
+    Class to decode the bytes of IPv4 packets into ResponseRecord without scapy's dissection.
+
+    Only the fields of the IP, TCP, UDP and ICMP layers, and of the IP and UDP headers quoted by an ICMP error,
+    that OS Hound reads are decoded, with struct from the bytes, to the same values as scapy's. Packets scapy
+    dissects into more layers than these fields tell, such as IP in IP, UDP tunnels or malformed headers, are not
+    parsed: parse returns None for them and decode leaves them to scapy.
+    """
+    def __init__(self):
+        # The number of UDP bindings of scapy and the ports they dissect, None if one of them matches other fields
+        self.udp_ports = (None, frozenset())
+        # The compiled format of each TCP option
+        self.option_formats = {}
+
+    def receive(self, sock):
+        """
+        Receive a packet from a scapy socket without dissecting it with scapy.
+        :param sock: The scapy socket.
+        :return: The ResponseRecord of the packet, None if it is not an IPv4 packet.
+        """
+        link_type, data, received = sock.recv_raw()
+        if data is None:
+            return None
+        data = self.ip_data(link_type, data)
+        return None if data is None else self.decode(data, received)
+
+    def ip_data(self, link_type: type, data: bytes):
+        """
+        Skip the link layer header of a received frame.
+        :param link_type: The scapy class of the link layer of the socket, IP for a layer 3 socket.
+        :param data: The bytes of the frame.
+        :return: The bytes of its IPv4 packet, None if it is not an IPv4 packet.
+        """
+        if link_type is IP:
+            return data
+        if link_type is Ether and len(data) >= 14:
+            ether_type, offset = ETHER_TYPE.unpack_from(data, 12)[0], 14
+            if ether_type in ETH_P_VLAN and len(data) >= 18:
+                ether_type, offset = ETHER_TYPE.unpack_from(data, 16)[0], 18
+            return memoryview(data)[offset:] if ether_type == ETH_P_IP else None
+        if link_type is CookedLinux and len(data) >= 16:
+            return memoryview(data)[16:] if ETHER_TYPE.unpack_from(data, 14)[0] == ETH_P_IP else None
+        # Another link layer, dissected by scapy
+        try:
+            frame = link_type(data)
+        except Exception:
+            return None
+        return bytes(frame[IP]) if frame.haslayer(IP) else None
+
+    def decode(self, data: bytes, received: float = None):
+        """
+        Decode an IPv4 packet, with scapy when parse does not decode it.
+        :param data: The bytes of the packet, bytes or a memoryview.
+        :param received: The receive time of the packet, now by default.
+        :return: The ResponseRecord of the packet, None if scapy can not dissect it either.
+        """
+        received = received or time.time()
+        record = self.parse(data, received)
+        if record is None:
+            try:
+                packet = IP(bytes(data))
+            except Exception:
+                return None
+            packet.time = received
+            record = ResponseRecord(packet)
+        return record
+
+    def parse(self, data: bytes, received: float = None):
+        """
+        Parse an IPv4 packet into the same ResponseRecord as the one of the packet dissected by scapy.
+        :param data: The bytes of the packet, bytes or a memoryview.
+        :param received: The receive time of the packet, now by default.
+        :return: The ResponseRecord of the packet, None if it is not decoded without scapy.
+        """
+        ip = self.__ip(data, 0, len(data))
+        if ip is None:
+            return None
+        layers = {IP: ip[0]}
+        header_end, end, proto, fragment = ip[1:]
+        if fragment:
+            # Only the first fragment has the header of the transport layer
+            pass
+        elif proto == 6:
+            if not self.__tcp(data, header_end, end, layers):
+                return None
+        elif proto == 17:
+            if not self.__udp(data, header_end, end, UDP, layers):
+                return None
+        elif proto != 1 or not self.__icmp(data, header_end, end, layers):
+            return None
+        return ResponseRecord.from_layers(layers, received or time.time())
+
+    def __ip(self, data: bytes, start: int, end: int):
+        """
+        Parse an IP header.
+        :param data: The bytes of the packet.
+        :param start: The offset of the header.
+        :param end: The end of the bytes the header is dissected from.
+        :return: Tuple of the fields, the end of the header, the end of the payload as cut by the total length,
+         the protocol and whether the packet is a fragment after the first one, None if it is not parsed.
+        """
+        if end - start < 20:
+            return None
+        version_ihl, _, length, ip_id, flags_fragment, ttl, proto, chksum, src, dst = IP_HEADER.unpack_from(data, start)
+        header_end = start + (version_ihl & 0x0F) * 4
+        if version_ihl >> 4 != 4 or header_end < start + 20 or header_end > end:
+            return None
+        # Like scapy, the bytes past the total length are padding, and a total length shorter than the header is ignored
+        payload_end = end if length < header_end - start else min(end, start + length)
+        fields = IpFields.from_values(socket.inet_ntoa(src), socket.inet_ntoa(dst), proto, ttl, flags_fragment >> 13,
+                                      ip_id, length, chksum)
+        return fields, header_end, payload_end, proto, flags_fragment & 0x1FFF != 0
+
+    def __tcp(self, data: bytes, start: int, end: int, layers: dict):
+        """
+        Parse a TCP header.
+        :param data: The bytes of the packet.
+        :param start: The offset of the header.
+        :param end: The end of the segment.
+        :param layers: The fields of the layers of the packet, the TCP fields are added.
+        :return: True if the header is parsed.
+        """
+        if end - start < 20:
+            return False
+        sport, dport, seq, ack, offset, flags, window, _, urgptr = TCP_HEADER.unpack_from(data, start)
+        header_end = start + (offset >> 4) * 4
+        if header_end < start + 20 or header_end > end:
+            return False
+        options = self.__tcp_options(bytes(data[start + 20:header_end]))
+        # The payload runs to the end of the packet, as scapy appends the padding after it
+        layers[TCP] = TcpFields.from_values(sport, dport, seq, ack, ((offset & 0x01) << 8) | flags, window, options,
+                                            (offset >> 1) & 0x07, urgptr, bytes(data[header_end:]))
+        return True
+
+    def __tcp_options(self, options: bytes):
+        """
+        Decode the TCP options like scapy's TCPOptionsField.
+        :param options: The bytes of the options.
+        :return: List of the (name, value) of the options.
+        """
+        decoded = []
+        position = 0
+        while position < len(options):
+            kind = options[position]
+            if kind == 0:
+                decoded.append(("EOL", None))
+                break
+            if kind == 1:
+                decoded.append(("NOP", None))
+                position += 1
+                continue
+            length = max(options[position + 1] if position + 1 < len(options) else 0, 2)
+            value = options[position + 2:position + length]
+            if kind in TCPOptions[0]:
+                name, option_format = TCPOptions[0][kind]
+                if kind == 5:
+                    option_format += "%iI" % (len(value) // 4)
+                if kind == 29:
+                    value = TCPAOValue(value)
+                if option_format:
+                    compiled = self.option_formats.get(option_format)
+                    if compiled is None:
+                        compiled = self.option_formats[option_format] = struct.Struct(option_format)
+                    if compiled.size == len(value):
+                        value = compiled.unpack(value)
+                        if len(value) == 1:
+                            value = value[0]
+                decoded.append((name, value))
+            else:
+                decoded.append((kind, value))
+            position += length
+        return decoded
+
+    def __udp(self, data: bytes, start: int, end: int, layer_type: type, layers: dict):
+        """
+        Parse a UDP header.
+        :param data: The bytes of the packet.
+        :param start: The offset of the header.
+        :param end: The end of the datagram.
+        :param layer_type: UDP, or UDPerror for the header quoted by an ICMP error.
+        :param layers: The fields of the layers of the packet, the UDP fields are added.
+        :return: True if the header is parsed.
+        """
+        if end - start < 8:
+            return False
+        sport, dport, _, chksum = UDP_HEADER.unpack_from(data, start)
+        ports = self.__udp_ports()
+        if ports is None or sport in ports or dport in ports:
+            # scapy dissects the payload, maybe into more layers
+            return False
+        # The payload runs to the end of the packet, as scapy appends the padding after it
+        layers[layer_type] = UdpFields.from_values(sport, dport, chksum, bytes(data[start + 8:]))
+        return True
+
+    def __udp_ports(self):
+        """
+        :return: The UDP ports whose payload scapy dissects with the layers loaded now, None if one of the layers
+         is bound to other fields than the ports.
+        """
+        count, ports = self.udp_ports
+        if count != len(UDP.payload_guess):
+            ports = set()
+            for fields, _ in UDP.payload_guess:
+                if not set(fields) <= {"sport", "dport"}:
+                    ports = None
+                    break
+                ports.update(fields.values())
+            self.udp_ports = (len(UDP.payload_guess), ports if ports is None else frozenset(ports))
+        return self.udp_ports[1]
+
+    def __icmp(self, data: bytes, start: int, end: int, layers: dict):
+        """
+        Parse an ICMP header and the IP and UDP headers an ICMP error quotes.
+        :param data: The bytes of the packet.
+        :param start: The offset of the header.
+        :param end: The end of the message.
+        :param layers: The fields of the layers of the packet, the ICMP fields and the quoted ones are added.
+        :return: True if the message is parsed.
+        """
+        if end - start < 4:
+            return False
+        icmp_type, code = data[start], data[start + 1]
+        header_end = start + (20 if icmp_type in (13, 14) else 12 if icmp_type in (17, 18) else 8)
+        if header_end > end:
+            return False
+        icmp_id, seq = ID_SEQ.unpack_from(data, start + 4) if icmp_type in ICMP_ID_SEQ_TYPES else (None, None)
+        layers[ICMP] = IcmpFields.from_values(icmp_type, code, icmp_id, seq, bytes(data[start:]))
+        if icmp_type not in ICMP_ERROR_TYPES:
+            return True
+
+        if icmp_type in ICMP_EXTENSION_TYPES and end - start >= ICMP_EXTENSION_SIZE:
+            # scapy dissects the end of the message as an extension and moves the padding of the packet around
+            return False
+        quoted = self.__ip(data, header_end, end)
+        if quoted is None:
+            return False
+        layers[IPerror], quoted_header_end, quoted_payload_end, proto, fragment = quoted
+        if fragment or proto == 6:
+            # The quoted TCP header is not read
+            return True
+        return proto == 17 and self.__udp(data, quoted_header_end, quoted_payload_end, UDPerror, layers)
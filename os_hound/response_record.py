@@ -0,0 +1,150 @@
+from scapy.layers.inet import IP, TCP, ICMP, IPerror, UDPerror, UDP
+from scapy.packet import Packet
+
+
+class LayerFields:
+    """
+    The fields of a layer of a packet the tests read, copied once from the scapy layer.
+    Each subclass lists the fields of its layer in names, which are also its slots.
+    """
+    __slots__ = ()
+    names = ()
+
+    def __init__(self, layer: Packet):
+        """
+        :param layer: The scapy layer.
+        """
+        # The dissected values are read from the fields of the layer, the ones left to their default from scapy
+        fields = layer.fields
+        for name in self.names:
+            setattr(self, name, fields[name] if name in fields else getattr(layer, name))
+
+    @classmethod
+    def from_values(cls, *values):
+        """
+        Create the fields from their values, such as the ones the raw packet parser reads from the bytes of a layer.
+        :param values: The value of each field, in the order of names.
+        :return: The fields.
+        """
+        fields = cls.__new__(cls)
+        for name, value in zip(cls.names, values):
+            setattr(fields, name, value)
+        return fields
+
+
+class IpFields(LayerFields):
+    """The fields of an IP layer, or of the IP header quoted by an ICMP error."""
+    __slots__ = names = ('src', 'dst', 'proto', 'ttl', 'flags', 'id', 'len', 'chksum')
+
+    def __init__(self, layer: Packet):
+        super().__init__(layer)
+        self.flags = int(self.flags)
+
+
+class TcpFields(LayerFields):
+    """The fields of a TCP layer, the flags as an integer and the payload as bytes."""
+    __slots__ = names = ('sport', 'dport', 'seq', 'ack', 'flags', 'window', 'options', 'reserved', 'urgptr', 'payload')
+
+    def __init__(self, layer: Packet):
+        super().__init__(layer)
+        self.flags = int(self.flags)
+        self.payload = bytes(self.payload)
+
+
+class IcmpFields(LayerFields):
+    """
+    The fields of an ICMP layer, the id and seq None for the types without them. Its bytes, only read by the test of
+    its unused field, are built from the layer when they are read, building them is slower than all the other fields.
+    """
+    __slots__ = names = ('type', 'code', 'id', 'seq', 'layer')
+
+    def __init__(self, layer: Packet):
+        self.type = layer.type
+        self.code = layer.code
+        self.id = layer.id
+        self.seq = layer.seq
+        # The scapy layer, or the bytes of the layer when the fields are read from them
+        self.layer = layer
+
+    def __bytes__(self):
+        return bytes(self.layer)
+
+
+class UdpFields(LayerFields):
+    """The fields of a UDP layer, or of the UDP header quoted by an ICMP error, the payload as bytes."""
+    __slots__ = names = ('sport', 'dport', 'chksum', 'payload')
+
+    def __init__(self, layer: Packet):
+        super().__init__(layer)
+        self.payload = bytes(self.payload)
+
+
+class ResponseRecord:
+    """
+    A response, or a probe, decoded once into the fields its tests read.
+
+    Looking up a layer of a scapy packet walks its layers, and testing a packet for truth builds its bytes,
+    for every one of the tests of ProfileBuilder. A record copies the fields of each layer when the packet is
+    decoded and answers haslayer and record[layer] like the packet, so TestMethods scores records and packets
+    the same way. The TCP and IP flags are integers.
+    """
+    __slots__ = ('layers', 'time')
+    # The class of the decoded fields of each layer the tests read
+    layer_fields = {IP: IpFields, IPerror: IpFields, TCP: TcpFields, ICMP: IcmpFields, UDP: UdpFields,
+                    UDPerror: UdpFields}
+
+    def __init__(self, packet: Packet):
+        """
+        :param packet: The scapy packet.
+        """
+        self.time = packet.time
+        self.layers = {}
+        for layer in packet.iterpayloads():
+            layer_type = type(layer)
+            # Like scapy, the first layer of a type is the one looked up
+            if layer_type in self.layer_fields and layer_type not in self.layers:
+                self.layers[layer_type] = self.layer_fields[layer_type](layer)
+
+    @classmethod
+    def decode(cls, value):
+        """
+        Decode the packets of the responses of Probes.probe_all.
+        :param value: A packet, or a list, tuple or dictionary of packets and other values.
+        :return: The value with each packet replaced by its ResponseRecord.
+        """
+        if isinstance(value, Packet):
+            return cls(value)
+        if isinstance(value, (list, tuple)):
+            return type(value)(cls.decode(item) for item in value)
+        if isinstance(value, dict):
+            return {key: cls.decode(item) for key, item in value.items()}
+        return value
+
+    @classmethod
+    def from_layers(cls, layers: dict, time: float):
+        """
+        Create a record from fields already decoded, such as the ones of the raw packet parser.
+        :param layers: Dictionary of the scapy class of each layer to its fields.
+        :param time: The receive time of the packet.
+        :return: The record.
+        """
+        record = cls.__new__(cls)
+        record.layers = layers
+        record.time = time
+        return record
+
+    def haslayer(self, layer_type: type):
+        """
+        :param layer_type: The scapy class of the layer.
+        :return: True if the packet has the layer.
+        """
+        return layer_type in self.layers
+
+    def __getitem__(self, layer_type: type):
+        try:
+            return self.layers[layer_type]
+        except KeyError:
+            raise IndexError(f"Layer [{layer_type.__name__}] not found") from None
+
+    def __repr__(self):
+        return f"ResponseRecord({'/'.join(layer_type.__name__ for layer_type in self.layers)})"
@@ -0,0 +1,56 @@
+import threading
+
+
+class RttEstimator:
+    """
+    Class estimating the round trip time of a target to derive the wait time of the packets sent to it.
+
+    Works like the TCP retransmission timer (RFC 6298): the first reply seeds the smoothed RTT and
+    its variance, every later reply updates them and the timeout is the smoothed RTT plus four times
+    the variance, clamped between a floor and a ceiling.
+    """
+    def __init__(self, min_timeout: float = 0.1, max_timeout: float = 2, initial_timeout: float = 1):
+        """
+        :param min_timeout: The floor of the timeout in seconds.
+        :param max_timeout: The ceiling of the timeout in seconds.
+        :param initial_timeout: The timeout used until the first reply is received.
+        """
+        if not 0 < min_timeout <= max_timeout:
+            raise ValueError("The timeout floor must be positive and not greater than the ceiling.")
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.initial_timeout = initial_timeout
+        self.srtt = None
+        self.rttvar = None
+        self.lock = threading.Lock()
+
+    def update(self, rtt: float):
+        """
+        Update the estimation with a new RTT sample.
+        Samples must only be taken from replies to packets that were not retransmitted (Karn's algorithm).
+
+        :param rtt: The measured round trip time in seconds.
+        """
+        rtt = max(rtt, 0)
+        with self.lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+                self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def timeout(self, attempt: int = 0):
+        """
+        Calculate how long to wait for a reply.
+
+        :param attempt: The retransmission number, the timeout doubles with each one.
+        :return: The timeout in seconds.
+        """
+        with self.lock:
+            if self.srtt is None:
+                timeout = self.initial_timeout
+            else:
+                timeout = self.srtt + 4 * self.rttvar
+
+        return min(self.max_timeout, max(self.min_timeout, timeout * 2 ** attempt))
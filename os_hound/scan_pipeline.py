@@ -0,0 +1,61 @@
+import threading
+from os_hound.port_scanner import PortScanner
+
+
+class ScanPipeline:
+    """
+    Class running the port scan in the background so the probes can start
+    as soon as an open and a closed port are known.
+    """
+    def __init__(self, scanner: PortScanner, target_ip: str, start_port: int = None, end_port: int = None, ports_list: list = None):
+        """
+        :param scanner: The port scanner.
+        :param target_ip: The target IP address.
+        :param start_port: The start port to scan.
+        :param end_port:  The end port to scan.
+        :param ports_list: A list of ports to scan.
+        """
+        self.scanner = scanner
+        self.target_ip = target_ip
+        self.start_port = start_port
+        self.end_port = end_port
+        self.ports_list = ports_list
+        self.open_ports = []
+        self.closed_ports = []
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self):
+        """Start the port scan in the background."""
+        self.thread.start()
+        return self
+
+    def wait_ready(self, timeout: float = None):
+        """
+        Wait until an open and a closed port are known or the scan is over.
+        :param timeout: Seconds to wait, None to wait as long as needed.
+        :return: True if there is at least one open port to probe.
+        """
+        self.ready.wait(timeout)
+        return bool(self.open_ports)
+
+    def join(self):
+        """
+        Wait for the port enumeration to finish.
+        :return: The list of open ports.
+        """
+        self.thread.join()
+        return self.open_ports
+
+    def __run(self):
+        """Consume the streaming scan and signal when the probes can start."""
+        try:
+            for port, state in self.scanner.iter_syn_scan(self.target_ip, self.start_port, self.end_port, self.ports_list):
+                if state == 'open':
+                    self.open_ports.append(port)
+                elif state == 'closed':
+                    self.closed_ports.append(port)
+                if self.open_ports and self.closed_ports:
+                    self.ready.set()
+        finally:
+            self.ready.set()
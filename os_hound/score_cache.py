@@ -0,0 +1,190 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from os_hound.matchers import CompiledFingerprint
+from os_hound.scoring import OsMatch, Scoring
+
+
+def profile_hash(profile: dict, scoring: Scoring = None):
+    """
+    Canonical hash of a profile, equal for profiles that score the same whatever the order of their fields.
+    The profile is hashed in the form Scoring.profile_checks prepares: the fields in the scoring order, the keys
+    of a field in their order, which the unconventional values ending a field depend on, and the values that
+    are never scored left out. The weights of the scoring are part of it.
+    :param profile: The profile OS.
+    :param scoring: The scoring, the default weights otherwise.
+    :return: The hexadecimal SHA-256 of the profile.
+    """
+    scoring = scoring or Scoring()
+    checks_key = scoring.checks_key(scoring.profile_checks(profile))
+    return hashlib.sha256(repr(checks_key).encode()).hexdigest()
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of the results of Scoring.score and Scoring.top_k, for the many hosts with the same profile.
+
+    Results are keyed by the hash of the profile and the version of the database, so the results of another
+    database are never returned, and kept as the positions of the matches in the database. The cache can be
+    saved to a file and loaded again by the next run. hits and misses count the lookups.
+    """
+    # Bump when the format of the saved cache changes so older files are ignored
+    FILE_VERSION = 1
+
+    def __init__(self, db_version: str, maxsize: int = 4096, path: str = None):
+        """
+        :param db_version: The version of the database scored, such as DbParser.db_version.
+        :param maxsize: The number of results kept, the least recently used ones are dropped first.
+        :param path: Optional file the cache is loaded from, and saved to by save.
+        """
+        self.db_version = db_version
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # The position of each OS dictionary of the last database scored
+        self.positions = (None, {})
+        if path:
+            self.__load()
+
+    def score(self, scoring: Scoring, profile: dict, os_dicts: list, index=None):
+        """
+        Score the profile like Scoring.score, or return the cached result.
+        :param scoring: The scoring.
+        :param profile: The profile OS to score against.
+        :param os_dicts: The list of all OS dictionaries in the DataBase, of the version of the cache.
+        :param index: Optional index of the compiled os_dicts from DbParser.build_index.
+        :return: The best match OS, the same list of (os_dict, score) as Scoring.score.
+        """
+        key = self.__key(scoring, profile, "score")
+        cached = self.__get(key, len(os_dicts), 2)
+        if cached is None:
+            positions = self.__positions(os_dicts)
+            cached = self.__put(key, [(positions[id(os_dict)], score)
+                                      for os_dict, score in scoring.score(profile, os_dicts, index)])
+        return [(self.__os_dict(os_dicts, position), score) for position, score in cached]
+
+    def top_k(self, scoring: Scoring, profile: dict, os_dicts: list, k: int = 10):
+        """
+        Return the k closest OS like Scoring.top_k, or the cached result.
+        :param scoring: The scoring.
+        :param profile: The profile OS to score against.
+        :param os_dicts: The list of all OS dictionaries in the DataBase, of the version of the cache.
+        :param k: The number of OS to return.
+        :return: List of OsMatch, the same as Scoring.top_k.
+        """
+        key = self.__key(scoring, profile, "top_k", k)
+        cached = self.__get(key, len(os_dicts), 3)
+        if cached is None:
+            positions = self.__positions(os_dicts)
+            cached = self.__put(key, [(positions[id(match.os_dict)], match.score, match.possible)
+                                      for match in scoring.top_k(profile, os_dicts, k)])
+        return [OsMatch(self.__os_dict(os_dicts, position), score, possible) for position, score, possible in cached]
+
+    def clear(self):
+        """Drop every result and reset the counters."""
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def save(self):
+        """
+        Write the cache to its file, replacing the previous one at once. A file that can not be written is ignored.
+        """
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), suffix=".tmp")
+            with os.fdopen(fd, "wb") as cache_file:
+                pickle.dump({"version": self.FILE_VERSION, "db_version": self.db_version,
+                             "entries": list(self.entries.items())}, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+    def __load(self):
+        """
+        Load the results of the cache file, unless it is missing, unreadable or of another database version.
+        """
+        try:
+            with open(self.path, "rb") as cache_file:
+                saved = pickle.load(cache_file)
+            if not isinstance(saved, dict) or saved.get("version") != self.FILE_VERSION or \
+                    saved.get("db_version") != self.db_version:
+                return
+            # The most recently used results are last, the first ones are dropped when the cache is smaller now
+            entries = OrderedDict()
+            for key, value in saved["entries"][-self.maxsize:] if self.maxsize > 0 else []:
+                if not isinstance(key, tuple) or not isinstance(value, list):
+                    return
+                entries[key] = value
+        except Exception:
+            # A damaged pickle raises about any exception, the cache starts empty
+            return
+        self.entries = entries
+
+    def __key(self, scoring: Scoring, profile: dict, *query):
+        """
+        :param scoring: The scoring.
+        :param profile: The profile OS.
+        :param query: The method and its arguments.
+        :return: The key of the result.
+        """
+        return (self.db_version, profile_hash(profile, scoring)) + query
+
+    def __get(self, key: tuple, db_size: int, width: int):
+        """
+        :param key: The key of the result.
+        :param db_size: The number of fingerprints of the database.
+        :param width: The number of values of each match of the result.
+        :return: The cached result, None if it is not cached or is not a valid result for the database.
+        """
+        cached = self.entries.get(key)
+        if cached is not None and not all(
+                isinstance(result, tuple) and len(result) == width and isinstance(result[0], int) and
+                0 <= result[0] < db_size and isinstance(result[1], (int, float)) for result in cached):
+            # Only a damaged cache file has results of another form
+            del self.entries[key]
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return cached
+
+    def __put(self, key: tuple, value: list):
+        """
+        Cache a result, dropping the least recently used one when the cache is full.
+        :param key: The key of the result.
+        :param value: The result.
+        :return: The result.
+        """
+        if self.maxsize > 0:
+            self.entries[key] = value
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def __positions(self, os_dicts: list):
+        """
+        :param os_dicts: The database.
+        :return: Dictionary of the id of each OS dictionary of the database to its position.
+        """
+        if self.positions[0] is not os_dicts:
+            self.positions = (os_dicts, {id(self.__os_dict(os_dicts, position)): position
+                                         for position in range(len(os_dicts))})
+        return self.positions[1]
+
+    @staticmethod
+    def __os_dict(os_dicts: list, position: int):
+        """
+        :param os_dicts: The database, parsed or compiled.
+        :param position: The position of a fingerprint.
+        :return: Its OS dictionary.
+        """
+        os_dict = os_dicts[position]
+        return os_dict.os_dict if isinstance(os_dict, CompiledFingerprint) else os_dict
@@ -1,5 +1,44 @@
+import heapq
+from os_hound.fingerprint_index import FingerprintIndex
+from os_hound.matchers import CompiledFingerprint
+
+
+class OsMatch:
+    """
+    One of the best matching OS of a profile, with its score and its confidence.
+
+    Like nmap's accuracy, the confidence is the percentage of the points the OS could have earned that
+    it earned: the weights of the values of the profile the fingerprint has a test for.
+    """
+    __slots__ = ('os_dict', 'score', 'possible', 'confidence')
+
+    def __init__(self, os_dict: dict, score: int, possible: int):
+        """
+        :param os_dict: The OS dictionary.
+        :param score: The score of the OS.
+        :param possible: The points the OS could have earned.
+        """
+        self.os_dict = os_dict
+        self.score = score
+        self.possible = possible
+        self.confidence = 100 * score / possible if possible else 0.0
+
+    def __repr__(self):
+        return f"OsMatch({self.os_dict.get('os_title')!r}, {self.score}/{self.possible}, {self.confidence:.1f}%)"
+
+
 class Scoring:
     """Class to score the profile against the database and return the most likely OS."""
+    filed_names = ["SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE"]
+    # Counters score and top_k add to the stats dictionary they are given: the fingerprint bodies scored, the ones
+    # abandoned by the pruning, the comparisons of a field of the profile with a body, done and left undone, and
+    # the candidates of the index
+    stats_names = ["fingerprints", "pruned_fingerprints", "comparisons", "pruned_comparisons", "candidates"]
+    # The values of a profile in the postings of more than this share of the database do not select candidates
+    candidate_share = 0.25
+    # The points the best match of a profile can miss for the first candidates of the index to be enough
+    candidate_margin = 100
+
     def __init__(self):
         self.scoring_dict = {
             'SEQ': {'SP': 25, 'GCD': 75, 'ISR': 25, 'TI': 100, 'CI': 50, 'II': 100, 'SS': 80, 'TS': 100},
@@ -17,84 +56,573 @@ class Scoring:
             'IE': {'R': 50, 'DFI': 40, 'T': 15, 'TG': 15, 'CD': 100}
         }
 
-    def score(self, profile: dict, os_dicts: list[dict]):
+    def score(self, profile: dict, os_dicts: list, index: FingerprintIndex = None, stats: dict = None):
         """
         Score the profile against the  all database and return the best match OS.
         :param profile: The profile OS to score against.
-        :param os_dicts: The list of all OS dictionaries in the DataBase.
+        :param os_dicts: The list of all OS dictionaries in the DataBase, parsed or compiled by DbParser.compile_db.
+        :param index: Optional index of the compiled os_dicts from DbParser.build_index, to only score the candidates
+         of the index that can be best matches. All the database is scored when the candidates are not enough.
+        :param stats: Optional dictionary from new_stats the counters of this call are added to.
         :return: The best match OS.
         """
-        filed_names = ["SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE"]
         best_matches = []
+        matchers = {}
+        checks = self.profile_checks(profile)
+        order = self.__weight_order(checks)
+        line_scores = {}
+        stats = self.new_stats() if stats is None else stats
+        if index is not None:
+            if index.count != len(os_dicts):
+                raise ValueError("The index was not built from the fingerprints scored")
+            best_matches = self.__score_candidates(checks, order, os_dicts, index, line_scores, stats)
+            if best_matches is not None:
+                return best_matches
+            best_matches = []
+        body_scores = {}
         # iterating through all OS dictionaries
         for os_dict in os_dicts:
-            score = 0
-            # iterating through all fields
-            for field in filed_names:
-                # checking if the current field is in the profile and the current OS dictionary
-                if field in os_dict.keys() and field in profile.keys():
-                    # iterating through all keys in the current field
-                    for key in profile[field].keys():
-                        # checking if the current key is in the profile and the current OS dictionary
-                        if key in os_dict[field].keys():
-                            # STRING
-                            if isinstance(profile[field][key], str):
-                                # Checking for symbols in the current value
-                                if "|" in os_dict[field][key]:
-                                    temp = os_dict[field][key].split("|")
-                                    if profile[field][key] in temp:
-                                        score += self.__check_score(field, key)
-                                elif profile[field][key] == os_dict[field][key]:
-                                    score += self.__check_score(field, key)
-                            # INTEGER
-                            elif isinstance(profile[field][key], int):
-                                # Checking for unconventional symbols in the current value
-                                if "|" in os_dict[field][key]:
-                                    temp = os_dict[field][key].split("|")
-                                    for t in temp:
-                                        if "-" in t:
-                                            temp_2 = t.split("-")
-                                            if profile[field][key] in range(int(temp_2[0], 16), int(temp_2[1], 16)):
-                                                score += self.__check_score(field, key)
-                                                break
-                                            continue
-                                        elif ">" in t:
-                                            temp_2 = t.strip(">")
-                                            if profile[field][key] > int(temp_2, 16):
-                                                score += self.__check_score(field, key)
-                                                break
-                                        elif profile[field][key] == int(t, 16):
-                                            score += self.__check_score(field, key)
-                                            break
-                                elif "-" in os_dict[field][key]:
-                                    temp = os_dict[field][key].split("-")
-                                    if profile[field][key] in range(int(temp[0], 16), int(temp[1], 16)):
-                                        score += self.__check_score(field, key)
-                                elif ">" in os_dict[field][key]:
-                                    temp = os_dict[field][key].lstrip(">")
-                                    if profile[field][key] > int(temp, 16):
-                                        score += self.__check_score(field, key)
-                                elif "<" in os_dict[field][key]:
-                                    temp = os_dict[field][key].lstrip("<")
-                                    if profile[field][key] < int(temp, 16):
-                                        score += self.__check_score(field, key)
-                                elif os_dict[field][key] in ['G', 'U', 'I', 'BI', 'RI', 'RD', 'Z']:
-                                    break
-                                elif profile[field][key] == int(os_dict[field][key], 16):
-                                    score += self.__check_score(field, key)
-                            else:
-                                continue
+            if not isinstance(os_dict, CompiledFingerprint):
+                os_dict = CompiledFingerprint(os_dict, matchers)
+            # Fingerprints with the same body are scored once, the best score only grows so an abandoned body
+            # is abandoned again
+            score = body_scores.get(id(os_dict.tests), body_scores)
+            if score is body_scores:
+                # Equal scores are all kept, only an OS that can not reach the best score is abandoned
+                floor = best_matches[0][1] if best_matches else 0
+                score = body_scores[id(os_dict.tests)] = self.__bounded_score(checks, order, os_dict, line_scores, floor,
+                                                                              stats)
+            if score is None:
+                continue
             if not best_matches:
-                best_matches.append((os_dict, score))
+                best_matches.append((os_dict.os_dict, score))
             else:
                 if score == best_matches[0][1]:
-                    best_matches.append((os_dict, score))
+                    best_matches.append((os_dict.os_dict, score))
                 elif score > best_matches[0][1]:
                     best_matches.clear()
-                    best_matches.append((os_dict, score))
+                    best_matches.append((os_dict.os_dict, score))
 
         return best_matches
 
+    def top_k(self, profile: dict, os_dicts: list, k: int = 10, stats: dict = None):
+        """
+        Score the profile against the  all database and return the k OS with the highest confidence.
+        Only the k best OS are kept while scoring, in a heap.
+        :param profile: The profile OS to score against.
+        :param os_dicts: The list of all OS dictionaries in the DataBase, parsed or compiled by DbParser.compile_db.
+        :param k: The number of OS to return.
+        :param stats: Optional dictionary from new_stats the counters of this call are added to.
+        :return: List of OsMatch, from the highest confidence to the lowest, then from the highest score,
+         then in the order of the database.
+        """
+        if k < 1:
+            return []
+        heap = []
+        matchers = {}
+        checks = self.profile_checks(profile)
+        order = self.__weight_order(checks)
+        line_scores = {}
+        line_points = {}
+        stats = self.new_stats() if stats is None else stats
+        body_scores = {}
+        for index, os_dict in enumerate(os_dicts):
+            if not isinstance(os_dict, CompiledFingerprint):
+                os_dict = CompiledFingerprint(os_dict, matchers)
+            # Fingerprints with the same body are scored once, like in score
+            scored = body_scores.get(id(os_dict.tests), body_scores)
+            if scored is body_scores:
+                # The OS must still be able to take the place of the worst of the k best
+                worst = heap[0][0] if len(heap) == k else -1.0
+                scored = body_scores[id(os_dict.tests)] = self.__bounded_confidence(checks, order, os_dict, line_scores,
+                                                                                    line_points, worst, stats)
+            if scored is None:
+                continue
+            score, possible = scored
+            # The index keeps the order of the database between equal entries and is never equal itself
+            entry = (score / possible if possible else 0.0, score, -index, possible, os_dict.os_dict)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        return [OsMatch(os_dict, score, possible) for _, score, _, possible, os_dict in sorted(heap, reverse=True)]
+
+    def score_many(self, profiles: list, os_dicts: list):
+        """
+        Score many profiles against the database, with the same results as calling score for each of them.
+        The database is walked once for the whole batch: identical profiles are scored once, and each distinct
+        test line of a field is scored once for each distinct set of values the profiles have in that field.
+        :param profiles: The profiles OS to score.
+        :param os_dicts: The list of all OS dictionaries in the DataBase, parsed or compiled by DbParser.compile_db.
+        :return: List of the best match OS of each profile, in the order of the profiles.
+        """
+        matchers = {}
+        fingerprints = [os_dict if isinstance(os_dict, CompiledFingerprint) else CompiledFingerprint(os_dict, matchers)
+                        for os_dict in os_dicts]
+        lines = self.__field_lines(fingerprints)
+        field_scores = {}
+        best_matches = {}
+        field_checks = {}
+        results = []
+        for profile in profiles:
+            checks = self.profile_checks(profile, field_checks)
+            profile_key = self.checks_key(checks)
+            if profile_key not in best_matches:
+                columns = []
+                for field_key in profile_key:
+                    if field_key not in field_scores:
+                        field_scores[field_key] = self.__line_scores(*field_key, lines[field_key[0]][0])
+                    columns.append((lines[field_key[0]][1], *field_scores[field_key]))
+                self.__raise_first_error(columns, len(fingerprints))
+                if columns:
+                    totals = list(map(sum, zip(*(map(scores.__getitem__, indexes) for indexes, scores, _ in columns))))
+                else:
+                    totals = [0] * len(fingerprints)
+                best = max(totals, default=None)
+                best_matches[profile_key] = [(fingerprint.os_dict, best)
+                                             for fingerprint, score in zip(fingerprints, totals) if score == best]
+            results.append(list(best_matches[profile_key]))
+
+        return results
+
+    def new_stats(self):
+        """
+        :return: Dictionary of the counters of stats_names at zero, for the stats argument of score and top_k.
+        """
+        return dict.fromkeys(self.stats_names, 0)
+
+    def candidates(self, checks: list, index: FingerprintIndex, floor: int):
+        """
+        Select the candidates of a profile with the index of the database: the union of the postings of the values
+        of the profile that the fewest fingerprints have, with the highest score each candidate can earn.
+        A fingerprint out of the candidates matches none of these values, it can not earn more than the weights
+        of the other values. Values are selected until these weights are below the floor.
+        :param checks: The profile prepared by profile_checks.
+        :param index: The index of the compiled database.
+        :param floor: The score the fingerprints out of the candidates should not reach.
+        :return: Tuple of the dictionary of the position of each candidate to its highest score, and of the highest
+         score of the fingerprints out of the candidates, not below the floor when the values selective enough
+         are not enough. None when the scoring can raise: a value has no weight, or an integer value meets values
+         of the database with an invalid part.
+        """
+        others = 0
+        selective = []
+        limit = index.count * self.candidate_share
+        for field, field_checks in checks:
+            for key, value, is_str, weight in field_checks:
+                if weight is None or (not is_str and index.can_raise(field, key)):
+                    return None
+                others += weight
+                postings = index.lookup(field, key, value, is_str)
+                size = sum(map(len, postings))
+                if size <= limit and weight:
+                    selective.append((size / weight, weight, postings))
+
+        selected = []
+        for _, weight, postings in sorted(selective, key=lambda option: option[0]):
+            if others < floor:
+                break
+            others -= weight
+            selected.append((weight, postings))
+        bounds = {}
+        for weight, postings in selected:
+            # A fingerprint in two postings of a value only makes its bound higher than needed
+            for posting in postings:
+                for position in posting:
+                    bounds[position] = bounds.get(position, others) + weight
+        return bounds, others
+
+    def checks_key(self, checks: list):
+        """
+        Hashable form of a profile prepared by profile_checks, equal for profiles that score the same.
+        :param checks: The profile prepared by profile_checks.
+        :return: Tuple of (field, tuple of the checks of the field).
+        """
+        return tuple((field, tuple(field_checks)) for field, field_checks in checks)
+
+    def profile_checks(self, profile: dict, field_checks: dict = None):
+        """
+        Prepare the values of the profile once for scoring it against every fingerprint.
+        Values that are neither strings nor integers are never scored and are left out.
+        :param profile: The profile OS to score.
+        :param field_checks: Optional dictionary of the fields already prepared, for preparing many profiles
+         with fields in common. The checks of the fields found in it are tuples.
+        :return: List of (field, list of (key, value, is string, weight)) in the scoring order.
+        """
+        checks = []
+        for field in self.filed_names:
+            if field in profile:
+                values = profile[field]
+                if field_checks is not None:
+                    try:
+                        # The types tell apart equal values that are not scored the same, like 1 and 1.0
+                        field_key = (field, tuple(values.items()), tuple(map(type, values.values())))
+                        if field_key in field_checks:
+                            checks.append((field, field_checks[field_key]))
+                            continue
+                    except TypeError:
+                        field_key = None
+                weights = self.scoring_dict.get(field, {})
+                checks.append((field, [(key, value, isinstance(value, str), weights.get(key))
+                                       for key, value in values.items() if isinstance(value, (str, int))]))
+                if field_checks is not None and field_key is not None:
+                    field_checks[field_key] = tuple(checks[-1][1])
+        return checks
+
+    def score_fingerprint(self, checks: list, fingerprint: CompiledFingerprint, line_scores: dict = None):
+        """
+        Score the profile against one compiled fingerprint of the database.
+        :param checks: The profile prepared by profile_checks.
+        :param fingerprint: The compiled fingerprint.
+        :param line_scores: Optional dictionary of the scores of the test lines already scored against
+         the same profile, lines shared by several fingerprints are then scored once.
+        :return: The score.
+        """
+        score = 0
+        tests_by_field = fingerprint.tests
+        # iterating through all fields
+        for field, field_checks in checks:
+            tests = tests_by_field.get(field)
+            if tests is None:
+                continue
+            if line_scores is None:
+                score += self.__score_line(field, field_checks, tests)
+                continue
+            line_score = line_scores.get(id(tests))
+            if line_score is None:
+                line_score = line_scores[id(tests)] = self.__score_line(field, field_checks, tests)
+            score += line_score
+
+        return score
+
+    def possible_points(self, checks: list, fingerprint: CompiledFingerprint, line_points: dict = None):
+        """
+        The points the profile could earn against one compiled fingerprint: the weights of the values of the
+        profile the fingerprint has a test for, up to the unconventional value ending a field.
+        :param checks: The profile prepared by profile_checks.
+        :param fingerprint: The compiled fingerprint.
+        :param line_points: Optional dictionary of the points of the test lines already counted for the same
+         profile, like the line_scores of score_fingerprint.
+        :return: The points.
+        """
+        points = 0
+        for field, field_checks in checks:
+            tests = fingerprint.tests.get(field)
+            if tests is None:
+                continue
+            if line_points is not None and id(tests) in line_points:
+                points += line_points[id(tests)]
+                continue
+            line = self.__line_points(field_checks, tests)
+            if line_points is not None:
+                line_points[id(tests)] = line
+            points += line
+
+        return points
+
+    def __score_candidates(self, checks: list, order: tuple, fingerprints: list, index: FingerprintIndex,
+                           line_scores: dict, stats: dict):
+        """
+        Score the candidates of the index from the highest bound, until the bound of the next ones is below the
+        best score.
+        :param checks: The profile prepared by profile_checks.
+        :param order: The fields of the profile from __weight_order.
+        :param fingerprints: The compiled fingerprints of the index.
+        :param index: The index of the compiled fingerprints.
+        :param line_scores: Dictionary of the scores of the test lines already scored, like for score_fingerprint.
+        :param stats: The counters of the call.
+        :return: The best match OS, like score. None when a fingerprint out of the candidates can be a best match.
+        """
+        # The best match is first looked for among the candidates of the most selective values, more values are
+        # selected while the best score found is not enough to leave out the fingerprints out of the candidates
+        floor = order[0][0][2] - self.candidate_margin if order[0] else 0
+        best = None
+        body_scores = {}
+        while True:
+            found = self.candidates(checks, index, floor)
+            if found is None:
+                return None
+            bounds, others = found
+            stats["candidates"] += len(bounds)
+            if len(bounds) > index.count * self.candidate_share:
+                # Scoring all the database costs about the same
+                return None
+            matches = []
+            scored = 0
+            for bound, position in sorted(((bound, position) for position, bound in bounds.items()), reverse=True):
+                if (best is not None and bound < best) or (bound <= others and (best is None or best <= others)):
+                    # The candidates left can not be best matches, or can not score above the other fingerprints
+                    break
+                scored += 1
+                fingerprint = fingerprints[position]
+                score = body_scores.get(id(fingerprint.tests), body_scores)
+                if score is body_scores:
+                    score = body_scores[id(fingerprint.tests)] = self.__bounded_score(checks, order, fingerprint,
+                                                                                      line_scores, best or 0, stats)
+                if score is None:
+                    continue
+                if best is None or score > best:
+                    best = score
+                matches.append((position, score))
+            if best is not None and best > others:
+                break
+            if others >= floor:
+                # No more values to select
+                return None
+            floor = best if best is not None else floor - self.candidate_margin
+
+        skipped = index.count - scored
+        stats["pruned_fingerprints"] += skipped
+        stats["pruned_comparisons"] += skipped * len(order[0])
+        return [(fingerprints[position].os_dict, score) for position, score in sorted(matches) if score == best]
+
+    def __bounded_score(self, checks: list, order: tuple, fingerprint: CompiledFingerprint, line_scores: dict,
+                        floor: float, stats: dict):
+        """
+        Score the profile against one compiled fingerprint, the fields with the highest weights first, and abandon
+        the fingerprint as soon as its score plus the weights of the fields left can not reach the floor.
+        Counts the fingerprints and the comparisons, of one field of the profile with one fingerprint, in stats.
+        :param checks: The profile prepared by profile_checks.
+        :param order: The fields of the profile from __weight_order.
+        :param fingerprint: The compiled fingerprint.
+        :param line_scores: Dictionary of the scores of the test lines already scored, like for score_fingerprint.
+        :param floor: The lowest score that can make the fingerprint a best match.
+        :param stats: The counters of the call.
+        :return: The score, None when the fingerprint was abandoned.
+        """
+        stats["fingerprints"] += 1
+        fields = order[0]
+        if fields is None or self.__can_raise(order, fingerprint):
+            # Scored in the scoring order, to raise the same exception as score_fingerprint
+            stats["comparisons"] += len(checks)
+            return self.score_fingerprint(checks, fingerprint, line_scores)
+
+        score = 0
+        tests_by_field = fingerprint.tests
+        for field, field_checks, points, left in fields:
+            # points are the weights of this field and of the fields after it
+            if score + points < floor:
+                stats["pruned_fingerprints"] += 1
+                stats["pruned_comparisons"] += left
+                stats["comparisons"] += len(fields) - left
+                return None
+            tests = tests_by_field.get(field)
+            if tests is None:
+                continue
+            line_score = line_scores.get(id(tests))
+            if line_score is None:
+                line_score = line_scores[id(tests)] = self.__score_line(field, field_checks, tests)
+            score += line_score
+        stats["comparisons"] += len(fields)
+
+        return score
+
+    def __bounded_confidence(self, checks: list, order: tuple, fingerprint: CompiledFingerprint, line_scores: dict,
+                             line_points: dict, worst: float, stats: dict):
+        """
+        Score the profile against one compiled fingerprint like __bounded_score, and abandon the fingerprint as soon
+        as its highest possible confidence is below the worst confidence of the k best of top_k.
+        The points of the fields left are counted as earned, the confidence can not be higher.
+        :param checks: The profile prepared by profile_checks.
+        :param order: The fields of the profile from __weight_order.
+        :param fingerprint: The compiled fingerprint.
+        :param line_scores: Dictionary of the scores of the test lines already scored, like for score_fingerprint.
+        :param line_points: Dictionary of the points of the test lines already counted, like for possible_points.
+        :param worst: The confidence, as a ratio, of the worst of the k best, -1 while there are less than k.
+        :param stats: The counters of the call.
+        :return: Tuple of the score and the possible points, None when the fingerprint was abandoned.
+        """
+        stats["fingerprints"] += 1
+        fields = order[0]
+        if fields is None or self.__can_raise(order, fingerprint):
+            stats["comparisons"] += len(checks)
+            return (self.score_fingerprint(checks, fingerprint, line_scores),
+                    self.possible_points(checks, fingerprint, line_points))
+
+        score = 0
+        possible = 0
+        tests_by_field = fingerprint.tests
+        for field, field_checks, points, left in fields:
+            # Rounding keeps the order of the real ratios, the confidence of the entry is never above this one
+            if possible + points and (score + points) / (possible + points) < worst:
+                stats["pruned_fingerprints"] += 1
+                stats["pruned_comparisons"] += left
+                stats["comparisons"] += len(fields) - left
+                return None
+            tests = tests_by_field.get(field)
+            if tests is None:
+                continue
+            line_score = line_scores.get(id(tests))
+            if line_score is None:
+                line_score = line_scores[id(tests)] = self.__score_line(field, field_checks, tests)
+            line_point = line_points.get(id(tests))
+            if line_point is None:
+                line_point = line_points[id(tests)] = self.__line_points(field_checks, tests)
+            score += line_score
+            possible += line_point
+        stats["comparisons"] += len(fields)
+
+        return score, possible
+
+    @staticmethod
+    def __can_raise(order: tuple, fingerprint: CompiledFingerprint):
+        """
+        Whether the integer values of the profile meet values of the fingerprint with an invalid part.
+        :param order: The fields of the profile from __weight_order.
+        :param fingerprint: The compiled fingerprint.
+        :return: True if scoring the fingerprint can raise.
+        """
+        _, int_keys, raising = order
+        can_raise = raising.get(id(fingerprint.errors))
+        if can_raise is None:
+            can_raise = raising[id(fingerprint.errors)] = not fingerprint.errors.isdisjoint(int_keys)
+        return can_raise
+
+    @staticmethod
+    def __weight_order(checks: list):
+        """
+        The order in which __bounded_score scores the fields of a profile, with the highest score the
+        fingerprints can still earn before each field.
+        :param checks: The profile prepared by profile_checks.
+        :return: Tuple of the list of (field, field checks, total weight of the values of the field and of the fields
+         after it, number of fields from this one) from the field with the highest total weight, of the (field, key)
+         of the integer values, which raise against the values of the database with an invalid part, and of an empty
+         dictionary for the fingerprint errors already checked against them. The list is None when a value has
+         no weight, its scoring raises.
+        """
+        fields = []
+        int_keys = frozenset((field, key) for field, field_checks in checks
+                             for key, _, is_str, _ in field_checks if not is_str)
+        for field, field_checks in checks:
+            weights = [weight for _, _, _, weight in field_checks]
+            if None in weights:
+                return None, int_keys, {}
+            fields.append((field, field_checks, sum(weights)))
+        fields.sort(key=lambda field: -field[2])
+        remaining = 0
+        for position in reversed(range(len(fields))):
+            remaining += fields[position][2]
+            fields[position] = fields[position][:2] + (remaining, len(fields) - position)
+
+        return fields, int_keys, {}
+
+    @staticmethod
+    def __line_points(field_checks: list, tests: dict):
+        """
+        The points the values of the profile of one field could earn against the matchers of a fingerprint.
+        :param field_checks: The values of the field prepared by profile_checks.
+        :param tests: Dictionary of key to Matcher of the field of the fingerprint.
+        :return: The points of the field.
+        """
+        points = 0
+        for key, value, is_str, weight in field_checks:
+            matcher = tests.get(key)
+            if matcher is None or weight is None:
+                continue
+            if not is_str and matcher.stop:
+                break
+            points += weight
+
+        return points
+
+    def __score_line(self, field: str, field_checks: list, tests: dict):
+        """
+        Score the values of the profile of one field against the matchers of the same field of a fingerprint.
+        :param field: The field.
+        :param field_checks: The values of the field prepared by profile_checks.
+        :param tests: Dictionary of key to Matcher of the field of the fingerprint.
+        :return: The score of the field.
+        """
+        score = 0
+        # iterating through all keys in the current field
+        for key, value, is_str, weight in field_checks:
+            matcher = tests.get(key)
+            if matcher is None:
+                continue
+            # STRING
+            if is_str:
+                if value in matcher.strings:
+                    score += weight if weight is not None else self.__check_score(field, key)
+            # INTEGER
+            else:
+                # Matcher.match_int inlined, this runs for every integer test of every fingerprint
+                # Unconventional values end the scoring of the field
+                if matcher.stop:
+                    break
+                for low, high in matcher.intervals:
+                    if low <= value < high:
+                        score += weight if weight is not None else self.__check_score(field, key)
+                        break
+                else:
+                    if matcher.error:
+                        raise ValueError(matcher.error)
+
+        return score
+
+    def __field_lines(self, fingerprints: list):
+        """
+        Group the test lines of the compiled fingerprints by field.
+        :param fingerprints: The compiled fingerprints.
+        :return: Dictionary of field to the list of its distinct test lines and the index of the line of each
+         fingerprint, in the order of the fingerprints. Fingerprints without the field have the index len(lines).
+        """
+        field_lines = {}
+        for field in self.filed_names:
+            lines = []
+            positions = {}
+            indexes = []
+            for fingerprint in fingerprints:
+                tests = fingerprint.tests.get(field)
+                if tests is None:
+                    indexes.append(-1)
+                    continue
+                if id(tests) not in positions:
+                    positions[id(tests)] = len(lines)
+                    lines.append(tests)
+                indexes.append(positions[id(tests)])
+            field_lines[field] = (lines, [len(lines) if index < 0 else index for index in indexes])
+
+        return field_lines
+
+    def __line_scores(self, field: str, field_checks: tuple, lines: list):
+        """
+        Score the values of the profile of one field against test lines of the same field.
+        :param field: The field.
+        :param field_checks: The values of the field prepared by profile_checks.
+        :param lines: The test lines, dictionaries of key to Matcher.
+        :return: Tuple of the list of the score of each line, with one more 0 for the fingerprints without the
+         field, and the dictionary of the index of the lines that raise to the exception they raise.
+        """
+        scores = []
+        errors = {}
+        for index, tests in enumerate(lines):
+            try:
+                scores.append(self.__score_line(field, field_checks, tests))
+            except (ValueError, KeyError) as error:
+                scores.append(0)
+                errors[index] = error
+        scores.append(0)
+
+        return scores, errors
+
+    @staticmethod
+    def __raise_first_error(columns: list, count: int):
+        """
+        Raise the exception score would raise for a profile scored by lines, if any.
+        :param columns: List of (line index of each fingerprint, line scores, line errors) of each field of the
+         profile, in the scoring order.
+        :param count: The number of fingerprints.
+        """
+        failing = [(indexes, errors) for indexes, _, errors in columns if errors]
+        if not failing:
+            return
+        # score raises at the first fingerprint with an error, in its first field with an error
+        for position in range(count):
+            for indexes, errors in failing:
+                if indexes[position] in errors:
+                    raise errors[indexes[position]]
+
     def __check_score(self, field: str, key: str):
         """
         Return the score of the current field and key.
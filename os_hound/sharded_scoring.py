@@ -0,0 +1,178 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os_hound.db_parser import DbParser
+from os_hound.matchers import CompiledFingerprint
+from os_hound.scoring import OsMatch, Scoring
+
+# The shard of the database of a worker process: the position of its first fingerprint in the database, its
+# compiled fingerprints, the position of each OS dictionary in the shard and the scoring, set once by warm
+shard = None
+
+
+def warm(os_dicts: list, start: int, scoring: Scoring):
+    """
+    Compile the shard of the worker process, once when the process starts.
+    :param os_dicts: The OS dictionaries of the shard.
+    :param start: The position of the first one in the database.
+    :param scoring: The scoring.
+    """
+    global shard
+    fingerprints = DbParser().compile_db(os_dicts)
+    shard = (start, fingerprints, {id(fingerprint.os_dict): position for position, fingerprint in enumerate(fingerprints)},
+             scoring)
+
+
+def ready():
+    """Nothing, run once in each worker process so it is started and warm before the first profile."""
+
+
+def shard_score(profile: dict):
+    """
+    Score a profile against the shard of the worker process.
+    :param profile: The profile OS to score against.
+    :return: Tuple of the best score of the shard, None when it is empty, and of the positions in the database
+     of its best matches, or the exception the scoring raised.
+    """
+    start, fingerprints, positions, scoring = shard
+    try:
+        matches = scoring.score(profile, fingerprints)
+    except Exception as error:
+        return error
+    return matches[0][1] if matches else None, [start + positions[id(os_dict)] for os_dict, _ in matches]
+
+
+def shard_top_k(profile: dict, k: int):
+    """
+    The k closest OS of the shard of the worker process.
+    :param profile: The profile OS to score against.
+    :param k: The number of OS.
+    :return: List of the (score, possible points, position in the database) of the k closest OS, or the exception
+     the scoring raised.
+    """
+    start, fingerprints, positions, scoring = shard
+    try:
+        matches = scoring.top_k(profile, fingerprints, k)
+    except Exception as error:
+        return error
+    return [(match.score, match.possible, start + positions[id(match.os_dict)]) for match in matches]
+
+
+def shard_score_many(profiles: list):
+    """
+    Score many profiles against the shard of the worker process.
+    :param profiles: The profiles OS to score.
+    :return: List of the shard_score result of each profile, or tuple of the position of the first profile whose
+     scoring raises and of its exception.
+    """
+    start, fingerprints, positions, scoring = shard
+    try:
+        results = scoring.score_many(profiles, fingerprints)
+    except Exception:
+        # Only the first profile that raises matters, it is found by scoring the profiles one by one
+        for position, profile in enumerate(profiles):
+            result = shard_score(profile)
+            if isinstance(result, Exception):
+                return position, result
+        raise
+    return [(matches[0][1] if matches else None, [start + positions[id(os_dict)] for os_dict, _ in matches])
+            for matches in results]
+
+
+class ShardedScoring:
+    """
+    Class to score profiles against a large database split into shards, each one scored by its own worker process.
+
+    Every shard is a contiguous part of the database, sent once to a worker process that compiles it and keeps it
+    for all the profiles, so only the profiles and the positions of the matches are sent between the processes.
+    The best matches and the k closest OS of the shards are merged with the same ties, order and exceptions as
+    Scoring.score, Scoring.top_k and Scoring.score_many on the whole database.
+    """
+    def __init__(self, os_dicts: list, shards: int = None, scoring: Scoring = None, mp_context=None):
+        """
+        :param os_dicts: The list of all OS dictionaries in the DataBase, parsed or compiled by DbParser.compile_db.
+        :param shards: The number of shards and worker processes, the number of CPUs by default.
+        :param scoring: The scoring whose weights are used, the default weights otherwise.
+        :param mp_context: The multiprocessing context of the worker processes, the default one otherwise.
+        """
+        self.os_dicts = [os_dict.os_dict if isinstance(os_dict, CompiledFingerprint) else os_dict for os_dict in os_dicts]
+        scoring = scoring or Scoring()
+        count = len(self.os_dicts)
+        shards = max(min(shards or os.cpu_count() or 1, count), 1)
+        self.executors = []
+        for shard_number in range(shards):
+            start, end = count * shard_number // shards, count * (shard_number + 1) // shards
+            self.executors.append(ProcessPoolExecutor(max_workers=1, mp_context=mp_context, initializer=warm,
+                                                      initargs=(self.os_dicts[start:end], start, scoring)))
+        for future in [executor.submit(ready) for executor in self.executors]:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes."""
+        for executor in self.executors:
+            executor.shutdown()
+
+    def score(self, profile: dict):
+        """
+        Score the profile against the shards and return the best match OS.
+        :param profile: The profile OS to score against.
+        :return: The best match OS, the same list of (os_dict, score) as Scoring.score.
+        """
+        return self.__merge_best(self.__map(shard_score, profile))
+
+    def top_k(self, profile: dict, k: int = 10):
+        """
+        Score the profile against the shards and return the k closest OS.
+        :param profile: The profile OS to score against.
+        :param k: The number of OS to return.
+        :return: List of OsMatch, the same as Scoring.top_k.
+        """
+        if k <= 0:
+            return []
+        entries = [(score / possible if possible else 0.0, score, -position, possible)
+                   for shard_matches in self.__map(shard_top_k, profile, k) for score, possible, position in shard_matches]
+        return [OsMatch(self.os_dicts[-position], score, possible)
+                for _, score, position, possible in sorted(entries, reverse=True)[:k]]
+
+    def score_many(self, profiles: list):
+        """
+        Score many profiles against the shards, with the same results as calling score for each of them.
+        :param profiles: The profiles OS to score.
+        :return: List of the best match OS of each profile, in the order of the profiles.
+        """
+        shard_results = [future.result() for future in
+                         [executor.submit(shard_score_many, profiles) for executor in self.executors]]
+        failures = [results for results in shard_results if isinstance(results, tuple)]
+        if failures:
+            # The first profile that raises raises the exception of its first shard that raises
+            raise min(failures, key=lambda failure: failure[0])[1]
+        return [self.__merge_best(results) for results in zip(*shard_results)]
+
+    def __map(self, function, *args):
+        """
+        Run a function in every worker process.
+        :param function: The function, returning an exception instead of raising it.
+        :param args: Its arguments.
+        :return: List of the results of the shards, in the order of the database.
+        """
+        results = [future.result() for future in [executor.submit(function, *args) for executor in self.executors]]
+        for result in results:
+            if isinstance(result, Exception):
+                # The scoring raises the exception of the first fingerprint that raises
+                raise result
+        return results
+
+    def __merge_best(self, results):
+        """
+        Merge the best matches of the shards.
+        :param results: The shard_score result of each shard.
+        :return: List of (os_dict, score) of the best matches of all the shards.
+        """
+        best = max((score for score, _ in results if score is not None), default=None)
+        return [(self.os_dicts[position], best) for score, positions in results if score == best and best is not None
+                for position in positions]
@@ -0,0 +1,198 @@
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from collections import OrderedDict
+from collections.abc import Sequence
+from os_hound.db_parser import DbParser
+from os_hound.matchers import Matcher
+from os_hound.scoring import Scoring
+from os_hound.vector_scoring import Column, VectorScoring, np
+
+# Start of a shared database file, followed by the size of its header
+MAGIC = b"OSHOUND\x01"
+HEADER_SIZE = struct.Struct("<Q")
+
+
+def aligned(offset: int):
+    """
+    :param offset: An offset in the file.
+    :return: The offset rounded up to a multiple of 8, so the arrays are aligned.
+    """
+    return (offset + 7) & ~7
+
+
+class SharedRecords(Sequence):
+    """
+    Read-only sequence of the OS dictionaries of a SharedDb, each one unpickled from the file when it is read.
+    Scoring only reads the dictionaries of the best matches, so a worker decodes a few of them, and the most
+    recently read ones are kept so a worker scoring many profiles does not end up with a copy of the database.
+    """
+    __slots__ = ('data', 'offsets', 'maxsize', 'decoded')
+
+    def __init__(self, data: memoryview, offsets, maxsize: int = 1024):
+        """
+        :param data: The pickles of the dictionaries, one after the other.
+        :param offsets: Array of the start of each pickle in data, and of the end of the last one.
+        :param maxsize: The number of unpickled dictionaries kept, the least recently read ones are dropped first.
+        """
+        self.data = data
+        self.offsets = offsets
+        self.maxsize = maxsize
+        self.decoded = OrderedDict()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        index = range(len(self))[index]
+        os_dict = self.decoded.get(index)
+        if os_dict is not None:
+            self.decoded.move_to_end(index)
+            return os_dict
+        os_dict = pickle.loads(self.data[int(self.offsets[index]):int(self.offsets[index + 1])])
+        if self.maxsize > 0:
+            self.decoded[index] = os_dict
+            if len(self.decoded) > self.maxsize:
+                self.decoded.popitem(last=False)
+        return os_dict
+
+    def release(self):
+        """Drop the views of the file, the dictionaries can not be read after."""
+        self.data.release()
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.decoded.clear()
+
+
+class SharedDb:
+    """
+    Columnar database of VectorScoring in a file that worker processes memory map read-only.
+
+    SharedDb.write compiles the database once and writes the codes of every column, the values of the
+    distinct matchers of the columns and the pickled OS dictionaries. Attaching maps the file and scores
+    straight from it: the codes arrays are views of the mapping, shared by every process through the page
+    cache, only the few distinct matchers of each column are compiled again and the OS dictionaries are
+    unpickled when they are returned. A worker neither parses the database nor holds a copy of it.
+    close unmaps the file, a SharedDb is also a context manager that closes it.
+    Needs numpy, installed with the vector extra.
+    """
+    VERSION = 1
+
+    def __init__(self, path: str, scoring: Scoring = None, maxsize: int = 1024):
+        """
+        Attach to a shared database file.
+        :param path: The path of the file written by SharedDb.write.
+        :param scoring: The scoring whose weights are used, the default weights otherwise.
+        :param maxsize: The number of unpickled OS dictionaries kept, see SharedRecords.
+        """
+        if np is None:
+            raise ImportError("SharedDb needs numpy, install os-hound with the vector extra")
+        self.path = path
+        with open(path, "rb") as db_file:
+            self.mmap = mmap.mmap(db_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = buffer = memoryview(self.mmap)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a shared fingerprint database")
+        header_end = len(MAGIC) + HEADER_SIZE.size + HEADER_SIZE.unpack_from(buffer, len(MAGIC))[0]
+        header = pickle.loads(buffer[len(MAGIC) + HEADER_SIZE.size:header_end])
+        if header["version"] != self.VERSION:
+            raise ValueError(f"{path} is a shared fingerprint database of version {header['version']}")
+        start = aligned(header_end)
+
+        count = header["count"]
+        matchers = {}
+        error_ids = {}
+        columns = {}
+        # The columns are built in the order of the writer, so the error indexes are the same
+        for field, key, values, offset in header["columns"]:
+            codes = np.frombuffer(self.mmap, dtype=np.int32, count=count, offset=start + offset)
+            columns[field, key] = Column(codes, [matchers.get(value) or matchers.setdefault(value, Matcher(value))
+                                                 for value in values], error_ids)
+        offsets = np.frombuffer(self.mmap, dtype=np.int64, count=count + 1, offset=start + header["offsets"])
+        self.os_dicts = SharedRecords(buffer[start + header["records"]:], offsets, maxsize)
+        self.vector_scoring = VectorScoring.from_columns(self.os_dicts, columns, list(error_ids), scoring)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Unmap the file. The OS dictionaries already returned are kept, the SharedDb can not score anymore.
+        """
+        if self.mmap.closed:
+            return
+        # The mapping can only be closed once no array nor memoryview of it is left
+        self.vector_scoring = None
+        self.os_dicts.release()
+        self.buffer.release()
+        self.mmap.close()
+
+    def score(self, profile: dict):
+        """
+        Score the profile against the database, like VectorScoring.score.
+        :param profile: The profile OS to score against.
+        :return: The best match OS, the same list of (os_dict, score) as Scoring.score.
+        """
+        self.__check_open()
+        return self.vector_scoring.score(profile)
+
+    def score_many(self, profiles: list):
+        """
+        Score many profiles against the database, like VectorScoring.score_many.
+        :param profiles: The profiles OS to score.
+        :return: List of the best match OS of each profile, in the order of the profiles.
+        """
+        self.__check_open()
+        return self.vector_scoring.score_many(profiles)
+
+    def __check_open(self):
+        if self.mmap.closed:
+            raise ValueError(f"{self.path} is closed")
+
+    @classmethod
+    def write(cls, path: str, os_dicts: list = None):
+        """
+        Write the shared database file, replacing the previous one at once so a worker never maps half of it.
+        :param path: The path of the file.
+        :param os_dicts: The parsed or compiled fingerprints, the database is parsed and compiled when they are not given.
+        """
+        if os_dicts is None:
+            os_dicts = DbParser().compile_db()
+        vector_scoring = VectorScoring(os_dicts)
+        count = len(vector_scoring.os_dicts)
+
+        sections = []
+        size = 0
+
+        def add(data: bytes):
+            nonlocal size
+            offset = size
+            sections.append(data + bytes(aligned(len(data)) - len(data)))
+            size += aligned(len(data))
+            return offset
+
+        columns = [(field, key, [matcher.value for matcher in column.matchers], add(column.codes.tobytes()))
+                   for (field, key), column in vector_scoring.columns.items()]
+        records = [pickle.dumps(os_dict, protocol=pickle.HIGHEST_PROTOCOL) for os_dict in vector_scoring.os_dicts]
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(record) for record in records])
+        header = pickle.dumps({"version": cls.VERSION, "count": count, "columns": columns,
+                               "offsets": add(offsets.tobytes()), "records": add(b"".join(records))},
+                              protocol=pickle.HIGHEST_PROTOCOL)
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as db_file:
+                db_file.write(MAGIC + HEADER_SIZE.pack(len(header)) + header)
+                db_file.write(bytes(aligned(db_file.tell()) - db_file.tell()))
+                db_file.writelines(sections)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
@@ -7,6 +7,10 @@ from functools import reduce
 
 
 class TestMethods:
+    """
+    The tests of the nmap OS detection, each computing one value of the profile from the responses.
+    A response is a scapy packet or the ResponseRecord ProfileBuilder decodes it to once for all the tests.
+    """
     def __init__(self):
         pass
 
@@ -45,16 +49,32 @@ class TestMethods:
 
         return diff1, isn_gcd
 
-    def tcp_isn_isr(self, diff1: list[int]):
+    def send_intervals(self, responses: list[IP], sent_times: list[float]):
+        """
+        Calculate the time between the sends of the probes of each two consecutive responses used by the GCD test.
+
+        :param responses: List of SYN ACK responses from the tcp_syn_probe.
+        :param sent_times: List of the send time in seconds of the probe of each response.
+        :return: List of intervals in seconds, one for each difference of the GCD test.
+        """
+        times = [sent_time for response, sent_time in zip(responses, sent_times) if response and response.haslayer(TCP)]
+        return [times[i + 1] - times[i] for i in range(len(times) - 1)]
+
+    def tcp_isn_isr(self, diff1: list[int], intervals: list[float] = None):
         """
         The ISR test.
         Calculate the ISR based on the given diff array and the time_intervals.
 
         :param diff1: List of seq differences between each two consecutive probe responses.
+        :param intervals: List of seconds between the sends of the probes of each two consecutive responses,
+         when the send times are unknown a fixed interval is used.
         :return: ISR value
         """
         if diff1:
-            seq_rates = [diff / 0.000012 for diff in diff1]
+            if intervals:
+                seq_rates = [diff / interval for diff, interval in zip(diff1, intervals)]
+            else:
+                seq_rates = [diff / 0.000012 for diff in diff1]
 
             # Calculate the average rate
             avg_rate = sum(seq_rates) / len(seq_rates)
@@ -206,20 +226,22 @@ class TestMethods:
         else:
             return "None"
 
-    def calculate_ts(self, responses: list[IP]):
+    def calculate_ts(self, responses: list[IP], sent_times: list[float] = None):
         """
         The TS test.
         Calculate the TCP timestamp option algorithm (TS).
 
         :param responses: List of TCP response objects containing the 'timestamp' field.
+        :param sent_times: Optional list of the send time in seconds of the probe of each response,
+         the receive time of the responses is used otherwise.
         :return: Calculated TS value.
         """
         if responses:
             # Extract TSvals from the responses
             tsvals = []
             tssents = []
-            for response in responses:
-                tssents.append(response.time)
+            for i, response in enumerate(responses):
+                tssents.append(sent_times[i] if sent_times else response.time)
                 if response and response.haslayer(TCP):
                     for option in response[TCP].options:
                         if option[0] == "Timestamp":
@@ -419,9 +441,8 @@ class TestMethods:
         """
         if response and u1_response:
             # Determine hop count
-            if u1_response.haslayer(IP) and u1_response.haslayer(IPerror):
-                hop_count = u1_response[IP].ttl - u1_response[IPerror].ttl
-
+            hop_count = self.hop_count(u1_response)
+            if hop_count is not None:
                 # Compute initial TTL of the target's response
                 initial_ttl = 64 + hop_count
 
@@ -429,6 +450,17 @@ class TestMethods:
         else:
             return "None"
 
+    def hop_count(self, u1_response: IP):
+        """
+        Compute the hop count to the target, from the TTL of the U1 response and the one of the probe it quotes.
+
+        :param u1_response: A response object from the udp_probe.
+        :return: The hop count, None if the response does not quote the IP header of the probe.
+        """
+        if u1_response and u1_response.haslayer(IP) and u1_response.haslayer(IPerror):
+            return u1_response[IP].ttl - u1_response[IPerror].ttl
+        return None
+
     def ttl_guess_test(self, response: IP):
         """
         The TG test.
@@ -498,7 +530,7 @@ class TestMethods:
                     q_string += "R"
 
                 # Check if the URG flag is not set but urgent pointer field is non-zero
-                if not response[TCP].flags.URG and response[TCP].urgptr != 0:
+                if not response[TCP].flags & 0x20 and response[TCP].urgptr != 0:
                     q_string += "U"
 
         return q_string
@@ -606,7 +638,7 @@ class TestMethods:
         if response:
             # Check if the response is a TCP RST response with data
             if response.haslayer(TCP):
-                if response[TCP].flags == 'R' and response[TCP].payload:
+                if response[TCP].flags == 0x04 and response[TCP].payload:
                     data = bytes(response[TCP].payload)
                     return zlib.crc32(data)
                 else:
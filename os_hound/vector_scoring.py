@@ -0,0 +1,483 @@
+from itertools import islice
+from os_hound.matchers import CompiledFingerprint
+from os_hound.scoring import Scoring
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Column:
+    """
+    The values of one (field, key) test of every fingerprint of the database.
+
+    Each fingerprint has the index of its matcher in codes, -1 when it does not have the test. The
+    arrays of the matchers have one more entry at the end for the fingerprints without the test, so
+    indexing them with codes gives the result of every fingerprint at once.
+    """
+    __slots__ = ('codes', 'matchers', 'strings', 'stop', 'errors', 'low', 'high', 'owners')
+
+    def __init__(self, codes, matchers: list, error_ids: dict):
+        """
+        :param codes: Array of the matcher index of each fingerprint.
+        :param matchers: List of the distinct matchers of the column.
+        :param error_ids: Dictionary of the error messages already seen to their index, shared by the columns.
+        """
+        self.codes = codes
+        self.matchers = matchers
+        # The matchers each string alternative matches
+        self.strings = {}
+        for index, matcher in enumerate(matchers):
+            for string in matcher.strings:
+                self.strings.setdefault(string, []).append(index)
+        self.stop = np.array([matcher.stop for matcher in matchers] + [False])
+        self.errors = np.array([error_ids.setdefault(matcher.error, len(error_ids)) if matcher.error else -1
+                                for matcher in matchers] + [-1], dtype=np.int64)
+
+        # The intervals of all the matchers, flattened, with the index of the matcher they belong to
+        bounds = [(low, high, index) for index, matcher in enumerate(matchers) for low, high in matcher.intervals]
+        limits = np.iinfo(np.int64)
+        finite = [bound for low, high, _ in bounds for bound in (low, high) if abs(bound) != float("inf")]
+        if all(limits.min < bound < limits.max for bound in finite):
+            self.low = np.array([limits.min if low == -float("inf") else low for low, _, _ in bounds], dtype=np.int64)
+            self.high = np.array([limits.max if high == float("inf") else high for _, high, _ in bounds], dtype=np.int64)
+            self.owners = np.array([index for _, _, index in bounds], dtype=np.int64)
+        else:
+            # Bounds numpy can not hold are matched one matcher at a time
+            self.low = self.high = self.owners = None
+
+    def match_str(self, value: str):
+        """
+        Match a string profile value against every fingerprint.
+        :param value: The value of the profile.
+        :return: Boolean array of the fingerprints the value matches.
+        """
+        return self.matchers_str(value)[self.codes]
+
+    def match_int(self, value: int):
+        """
+        Match an integer profile value against every fingerprint, like Matcher.match_int.
+        :param value: The value of the profile.
+        :return: Tuple of the boolean arrays of the fingerprints the value matches and of the fingerprints
+         that stop the field, and the array of the error index of each fingerprint, -1 without error.
+        """
+        matched, stop, errors = self.matchers_int(value)
+        return matched[self.codes], stop[self.codes], errors[self.codes]
+
+    def matchers_str(self, value: str):
+        """
+        Match a string profile value against the distinct matchers of the column.
+        :param value: The value of the profile.
+        :return: Boolean array of the matchers the value matches, indexed like codes.
+        """
+        matched = np.zeros(len(self.matchers) + 1, dtype=bool)
+        matched[self.strings.get(value, [])] = True
+        return matched
+
+    def matchers_int(self, value: int):
+        """
+        Match an integer profile value against the distinct matchers of the column.
+        :param value: The value of the profile.
+        :return: Tuple of the boolean arrays of the matchers the value matches and of the matchers that stop
+         the field, and the array of the error index of each matcher, -1 without error, indexed like codes.
+        """
+        matched = np.zeros(len(self.matchers) + 1, dtype=bool)
+        limits = np.iinfo(np.int64)
+        if self.owners is not None and limits.min < value < limits.max:
+            hits = (self.low <= value) & (value < self.high)
+            matched[self.owners[hits]] = True
+        else:
+            for index, matcher in enumerate(self.matchers):
+                matched[index] = any(low <= value < high for low, high in matcher.intervals)
+        # A stop value never matches and never raises
+        matched &= ~self.stop
+        errors = np.where(matched | self.stop, -1, self.errors)
+        return matched, self.stop, errors
+
+
+class VectorScoring:
+    """
+    Class to score profiles against a columnar copy of the database with NumPy.
+
+    Every (field, key) test is a column, and a profile is scored against all the fingerprints at once
+    with boolean masks multiplied by the weights of Scoring. The results are the same as Scoring.score,
+    ties, unconventional values ending a field and invalid values raising ValueError included.
+    Needs numpy, installed with the vector extra.
+    """
+    def __init__(self, os_dicts: list, scoring: Scoring = None):
+        """
+        :param os_dicts: The list of all OS dictionaries in the DataBase, parsed or compiled by DbParser.compile_db.
+        :param scoring: The scoring whose weights are used, the default weights otherwise.
+        """
+        if np is None:
+            raise ImportError("VectorScoring needs numpy, install os-hound with the vector extra")
+        self.scoring = scoring or Scoring()
+        matchers = {}
+        fingerprints = [os_dict if isinstance(os_dict, CompiledFingerprint) else CompiledFingerprint(os_dict, matchers)
+                        for os_dict in os_dicts]
+        self.os_dicts = [fingerprint.os_dict for fingerprint in fingerprints]
+        self.error_messages = []
+        self.columns = self.__build_columns(fingerprints)
+
+    @classmethod
+    def from_columns(cls, os_dicts, columns: dict, error_messages: list, scoring: Scoring = None):
+        """
+        A VectorScoring of columns already built, such as the columns of a SharedDb.
+        :param os_dicts: The sequence of the OS dictionaries, in the order of the codes of the columns.
+        :param columns: Dictionary of (field, key) to Column.
+        :param error_messages: The error messages of the invalid values, in the order of the error indexes of the columns.
+        :param scoring: The scoring whose weights are used, the default weights otherwise.
+        :return: The VectorScoring.
+        """
+        vector_scoring = cls.__new__(cls)
+        vector_scoring.scoring = scoring or Scoring()
+        vector_scoring.os_dicts = os_dicts
+        vector_scoring.error_messages = error_messages
+        vector_scoring.columns = columns
+        return vector_scoring
+
+    def score(self, profile: dict):
+        """
+        Score the profile against the  all database and return the best match OS.
+        :param profile: The profile OS to score against.
+        :return: The best match OS, the same list of (os_dict, score) as Scoring.score.
+        """
+        scores = self.scores(profile)
+        if not len(scores):
+            return []
+        best = scores.max()
+        return [(self.os_dicts[index], int(best)) for index in np.flatnonzero(scores == best)]
+
+    def scores(self, profile: dict):
+        """
+        Score the profile against every fingerprint.
+        :param profile: The profile OS to score against.
+        :return: Array of the score of each fingerprint, in the order of the database.
+        """
+        count = len(self.os_dicts)
+        scores = np.zeros(count, dtype=np.int64)
+        # The first exception each fingerprint raises, in the order the scoring loop would reach it: the index
+        # of an error message of the database, or of a KeyError after them
+        raised = np.full(count, -1, dtype=np.int64)
+        key_errors = []
+
+        for field, field_checks in self.scoring.profile_checks(profile):
+            field_scores, field_raised = self.__field_scores(field, field_checks, key_errors)
+            scores += field_scores
+            first = (field_raised >= 0) & (raised < 0)
+            raised[first] = field_raised[first]
+        self.__raise_first(raised, key_errors)
+
+        return scores
+
+    def score_many(self, profiles: list, chunk_size: int = 1024):
+        """
+        Score many profiles against the database, with the same results as calling score for each of them.
+        Identical profiles are scored once, and the others chunk_size at a time by a ScoreBatch.
+        :param profiles: The profiles OS to score.
+        :param chunk_size: The number of distinct profiles scored together.
+        :return: List of the best match OS of each profile, in the order of the profiles.
+        """
+        if not self.os_dicts:
+            return [[] for _ in profiles]
+        distinct = {}
+        field_checks = {}
+        profile_keys = []
+        order = []
+        for profile in profiles:
+            profile_key = self.scoring.checks_key(self.scoring.profile_checks(profile, field_checks))
+            if profile_key not in distinct:
+                distinct[profile_key] = len(profile_keys)
+                profile_keys.append(profile_key)
+            order.append(distinct[profile_key])
+
+        batch = ScoreBatch(self)
+        best_matches = []
+        for chunk_start in range(0, len(profile_keys), chunk_size):
+            totals, failed = batch.chunk_scores(profile_keys[chunk_start:chunk_start + chunk_size])
+            if failed.any():
+                # Scoring the first failing profile alone raises its exception
+                self.scores(profiles[order.index(chunk_start + int(np.flatnonzero(failed)[0]))])
+            best = totals.max(axis=1)
+            positions, indexes = np.nonzero(totals == best[:, None])
+            matches = [[] for _ in range(len(totals))]
+            for position, index in zip(positions.tolist(), indexes.tolist()):
+                matches[position].append(index)
+            best_matches.extend([(self.os_dicts[index], profile_best) for index in profile_matches]
+                                for profile_matches, profile_best in zip(matches, best.tolist()))
+
+        return [list(best_matches[index]) for index in order]
+
+    def __field_scores(self, field: str, field_checks, key_errors: list):
+        """
+        Score the values of the profile of one field against every fingerprint.
+        :param field: The field.
+        :param field_checks: The values of the field prepared by Scoring.profile_checks.
+        :param key_errors: List of the KeyError of the tests without weight, shared by the fields of the profile.
+        :return: Tuple of the array of the scores of the field and the array of the first exception of each
+         fingerprint in the field, -1 without exception.
+        """
+        count = len(self.os_dicts)
+        scores = np.zeros(count, dtype=np.int64)
+        raised = np.full(count, -1, dtype=np.int64)
+        # Fingerprints whose field was not ended by an unconventional value
+        alive = np.ones(count, dtype=bool)
+        for key, value, is_str, weight in field_checks:
+            column = self.columns.get((field, key))
+            if column is None:
+                continue
+            if is_str:
+                matched = alive & column.match_str(value)
+            else:
+                matched, stop, errors = column.match_int(value)
+                matched &= alive
+                errors = np.where(alive, errors, -1)
+                alive &= ~stop
+                first = (errors >= 0) & (raised < 0)
+                raised[first] = errors[first]
+
+            if weight is None:
+                # Scoring raises a KeyError when a test without weight matches
+                first = matched & (raised < 0)
+                if first.any():
+                    raised[first] = len(self.error_messages) + len(key_errors)
+                    key_errors.append(self.__weight_error(field, key))
+                continue
+            scores += np.where(matched, weight, 0)
+
+        return scores, raised
+
+    def __raise_first(self, raised, key_errors: list):
+        """
+        Raise the exception of the first fingerprint that raises, like the scoring loop.
+        :param raised: Array of the first exception of each fingerprint, -1 without exception.
+        :param key_errors: The KeyError of the tests without weight.
+        """
+        failed = np.flatnonzero(raised >= 0)
+        if len(failed):
+            error = raised[failed[0]]
+            if error < len(self.error_messages):
+                raise ValueError(self.error_messages[error])
+            raise key_errors[error - len(self.error_messages)]
+
+    def __build_columns(self, fingerprints: list):
+        """
+        Build the column of every (field, key) test of the database.
+        :param fingerprints: The compiled fingerprints.
+        :return: Dictionary of (field, key) to Column.
+        """
+        codes = {}
+        distinct = {}
+        for index, fingerprint in enumerate(fingerprints):
+            for field, tests in fingerprint.tests.items():
+                for key, matcher in tests.items():
+                    if (field, key) not in distinct:
+                        distinct[field, key] = {}
+                        codes[field, key] = np.full(len(fingerprints), -1, dtype=np.int32)
+                    column_matchers = distinct[field, key]
+                    codes[field, key][index] = column_matchers.setdefault(id(matcher), (len(column_matchers), matcher))[0]
+
+        error_ids = {}
+        columns = {}
+        for column_key, column_matchers in distinct.items():
+            matchers = [matcher for _, matcher in sorted(column_matchers.values(), key=lambda item: item[0])]
+            columns[column_key] = Column(codes[column_key], matchers, error_ids)
+        self.error_messages = list(error_ids)
+
+        return columns
+
+    def __weight_error(self, field: str, key: str):
+        """
+        The KeyError Scoring raises when a matched test has no weight.
+        :param field: The field.
+        :param key: The key.
+        :return: The exception.
+        """
+        try:
+            self.scoring.scoring_dict[field][key]
+        except KeyError as ke:
+            return ke
+
+
+class ScoreBatch:
+    """
+    Scoring of many profiles against a VectorScoring database, a chunk of distinct profiles at a time.
+
+    Each profile is split into units: one for each key of a field, or for the rest of a field from the first
+    integer value that can end it, whose keys depend on each other. A slot is the place of a unit in the
+    profiles, the field and the key it starts at. The units in the same slot of the chunk are scored together,
+    each distinct value matched once. Profiles of the same kind of hosts only differ in a few slots, so the
+    slots are summed from the one with the fewest distinct units in the chunk to the one with the most, and
+    the profiles with the same units in the first slots share the sum of them, kept for the next chunks.
+    """
+    def __init__(self, vector_scoring: VectorScoring, cache_size: int = 1024):
+        """
+        :param vector_scoring: The database.
+        :param cache_size: The number of sums of first slots kept for the next chunks.
+        """
+        self.vector_scoring = vector_scoring
+        self.count = len(vector_scoring.os_dicts)
+        self.cache_size = cache_size
+        # Matchers results of the profile values already matched
+        self.outcomes = {}
+        # Field values already split, to the numbers of their slots and units
+        self.units = {}
+        self.unit_numbers = {}
+        self.unit_list = []
+        self.slot_numbers = {}
+        # Sums of first slots already computed
+        self.sums = {}
+
+    def chunk_scores(self, profile_keys: list):
+        """
+        Score a chunk of distinct profiles against every fingerprint.
+        :param profile_keys: The profiles, prepared by Scoring.checks_key.
+        :return: Tuple of the profile x fingerprint matrix of the scores and the boolean array of the profiles
+         that raise.
+        """
+        profile_units = []
+        for profile_key in profile_keys:
+            numbers = {}
+            for field_key in profile_key:
+                if field_key not in self.units:
+                    self.units[field_key] = [(self.slot_numbers.setdefault(slot, len(self.slot_numbers)),
+                                              self.unit_numbers.setdefault(unit, len(self.unit_numbers)))
+                                             for slot, unit in self.__split_units(*field_key)]
+                numbers.update(self.units[field_key])
+            profile_units.append(numbers)
+        self.unit_list.extend(islice(self.unit_numbers, len(self.unit_list), None))
+        # The number of the unit of each profile in each slot, -1 for the profiles without the slot
+        paths = np.full((len(profile_keys), len(self.slot_numbers)), -1, dtype=np.int64)
+        for position, numbers in enumerate(profile_units):
+            paths[position, list(numbers)] = list(numbers.values())
+        slots = np.argsort([len(np.unique(slot_units)) for slot_units in paths.T], kind="stable")
+        paths = paths[:, slots]
+
+        # The groups of the profiles with the same units in the first slots, for each number of first slots,
+        # sharing the first slots that make the least additions
+        profiles_count, slots_count = paths.shape
+        groups = np.zeros(profiles_count, dtype=np.int64)
+        shared, shared_groups = 0, groups
+        best_work = profiles_count * slots_count
+        for length in range(1, slots_count + 1):
+            _, groups = np.unique(groups * (len(self.unit_list) + 1) + paths[:, length - 1] + 1, return_inverse=True)
+            work = (groups.max() + 1) * length + profiles_count * (slots_count - length)
+            if work < best_work:
+                shared, shared_groups, best_work = length, groups, work
+
+        # The first profile of each group stands for its group in the shared slots
+        _, first = np.unique(shared_groups, return_index=True)
+        sums = np.zeros((len(first), self.count), dtype=np.int32)
+        sums_failed = np.zeros(len(first), dtype=bool)
+        keys = [(tuple(slots[:shared].tolist()), tuple(units)) for units in paths[first, :shared].tolist()]
+        missing = [group for group, key in enumerate(keys) if key not in self.sums]
+        if missing:
+            for slot in range(shared):
+                scores, failed = self.__units_scores(paths[first[missing], slot])
+                sums[missing] += scores
+                sums_failed[missing] |= failed
+            if len(self.sums) + len(missing) > self.cache_size:
+                self.sums.clear()
+            for group in missing:
+                self.sums[keys[group]] = (sums[group], sums_failed[group])
+        for group, key in enumerate(keys):
+            sums[group], sums_failed[group] = self.sums[key]
+
+        totals = sums[shared_groups]
+        totals_failed = sums_failed[shared_groups]
+        for slot in range(shared, slots_count):
+            scores, failed = self.__units_scores(paths[:, slot])
+            totals += scores
+            totals_failed |= failed
+
+        return totals, totals_failed
+
+    def __split_units(self, field: str, field_checks: tuple):
+        """
+        Split the values of a field of a profile into units. Keys no fingerprint has never score and are left out.
+        :param field: The field.
+        :param field_checks: The values of the field prepared by Scoring.profile_checks.
+        :return: List of the (field, first key) slot and the (field, checks) of each unit.
+        """
+        units = []
+        for position, (key, value, is_str, weight) in enumerate(field_checks):
+            column = self.vector_scoring.columns.get((field, key))
+            if column is None:
+                continue
+            if not is_str and column.stop.any():
+                units.append(((field, key), (field, tuple(field_checks[position:]))))
+                break
+            units.append(((field, key), (field, (field_checks[position],))))
+
+        return units
+
+    def __units_scores(self, numbers):
+        """
+        Score units against every fingerprint.
+        :param numbers: Array of the numbers of the units, -1 for no unit.
+        :return: Tuple of the unit x fingerprint matrix of the scores and the boolean array of the units that raise.
+        """
+        distinct, inverse = np.unique(numbers, return_inverse=True)
+        # The last row is the row of no unit
+        scores = np.zeros((len(distinct) + 1, self.count), dtype=np.int32)
+        failed = np.zeros(len(distinct) + 1, dtype=bool)
+        shapes = {}
+        for row, number in enumerate(distinct.tolist()):
+            if number < 0:
+                inverse[inverse == row] = len(distinct)
+                continue
+            field, checks = self.unit_list[number]
+            shape = (field, tuple((key, is_str, weight) for key, _, is_str, weight in checks))
+            shapes.setdefault(shape, []).append((row, tuple(value for _, value, _, _ in checks)))
+        for (field, shape), rows in shapes.items():
+            shape_rows = [row for row, _ in rows]
+            scores[shape_rows], failed[shape_rows] = self.__rows_scores(field, shape, [values for _, values in rows])
+
+        return scores[inverse], failed[inverse]
+
+    def __rows_scores(self, field: str, shape: tuple, rows: list):
+        """
+        Score several sets of values of the same keys of a field against every fingerprint.
+        :param field: The field.
+        :param shape: The (key, is string, weight) of each value, as prepared by Scoring.profile_checks.
+        :param rows: The values of each row.
+        :return: Tuple of the row x fingerprint matrix of the scores and the boolean array of the rows that raise.
+        """
+        scores = np.zeros((len(rows), self.count), dtype=np.int32)
+        failed = np.zeros(len(rows), dtype=bool)
+        # Fingerprints whose field was not ended by an unconventional value
+        alive = None
+        for position, (key, is_str, weight) in enumerate(shape):
+            column = self.vector_scoring.columns.get((field, key))
+            if column is None:
+                continue
+            # The results of the distinct matchers of the column for each distinct value of the rows
+            values = {}
+            indexes = [values.setdefault(row[position], len(values)) for row in rows]
+            results = []
+            for value in values:
+                if (field, key, value, is_str) not in self.outcomes:
+                    self.outcomes[field, key, value, is_str] = (column.matchers_str(value), None, None) if is_str \
+                        else column.matchers_int(value)
+                results.append(self.outcomes[field, key, value, is_str])
+
+            if not is_str:
+                # The fingerprints a value stops never match nor raise on it, so alive can be updated first
+                if column.stop.any():
+                    stop = np.stack([result[1] for result in results])[:, column.codes][indexes]
+                    alive = ~stop if alive is None else alive & ~stop
+                if (column.errors >= 0).any():
+                    errors = np.stack([result[2] >= 0 for result in results])[:, column.codes][indexes]
+                    failed |= (errors if alive is None else errors & alive).any(axis=1)
+
+            if weight is None:
+                # Scoring raises a KeyError when a test without weight matches
+                matched = np.stack([result[0] for result in results])[:, column.codes][indexes]
+                failed |= (matched if alive is None else matched & alive).any(axis=1)
+                continue
+            # The weight of each matcher, the fingerprints get the weight of their matcher
+            weights = (np.stack([result[0] for result in results]) * np.int32(weight))[:, column.codes][indexes]
+            scores += weights if alive is None else np.where(alive, weights, 0)
+
+        return scores, failed
@@ -0,0 +1,295 @@
+"""
+Fixtures shared by the tests and the benchmarks: random fingerprint databases and profiles, the reference
+scoring they are checked against, random responses of hosts to the probes and random received packets.
+"""
+import random
+from scapy.layers.inet import IP, TCP, ICMP, UDP, IPOption_NOP
+from scapy.packet import Raw
+from os_hound.scoring import Scoring
+
+
+def reference_score(scoring_dict: dict, profile: dict, os_dicts: list[dict]):
+    """The scoring loop as it was before the values were compiled, parsing the values for every profile."""
+    filed_names = ["SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE"]
+    best_matches = []
+    for os_dict in os_dicts:
+        score = 0
+        for field in filed_names:
+            if field in os_dict.keys() and field in profile.keys():
+                for key in profile[field].keys():
+                    if key in os_dict[field].keys():
+                        if isinstance(profile[field][key], str):
+                            if "|" in os_dict[field][key]:
+                                temp = os_dict[field][key].split("|")
+                                if profile[field][key] in temp:
+                                    score += scoring_dict[field][key]
+                            elif profile[field][key] == os_dict[field][key]:
+                                score += scoring_dict[field][key]
+                        elif isinstance(profile[field][key], int):
+                            if "|" in os_dict[field][key]:
+                                temp = os_dict[field][key].split("|")
+                                for t in temp:
+                                    if "-" in t:
+                                        temp_2 = t.split("-")
+                                        if profile[field][key] in range(int(temp_2[0], 16), int(temp_2[1], 16)):
+                                            score += scoring_dict[field][key]
+                                            break
+                                        continue
+                                    elif ">" in t:
+                                        temp_2 = t.strip(">")
+                                        if profile[field][key] > int(temp_2, 16):
+                                            score += scoring_dict[field][key]
+                                            break
+                                    elif profile[field][key] == int(t, 16):
+                                        score += scoring_dict[field][key]
+                                        break
+                            elif "-" in os_dict[field][key]:
+                                temp = os_dict[field][key].split("-")
+                                if profile[field][key] in range(int(temp[0], 16), int(temp[1], 16)):
+                                    score += scoring_dict[field][key]
+                            elif ">" in os_dict[field][key]:
+                                temp = os_dict[field][key].lstrip(">")
+                                if profile[field][key] > int(temp, 16):
+                                    score += scoring_dict[field][key]
+                            elif "<" in os_dict[field][key]:
+                                temp = os_dict[field][key].lstrip("<")
+                                if profile[field][key] < int(temp, 16):
+                                    score += scoring_dict[field][key]
+                            elif os_dict[field][key] in ['G', 'U', 'I', 'BI', 'RI', 'RD', 'Z']:
+                                break
+                            elif profile[field][key] == int(os_dict[field][key], 16):
+                                score += scoring_dict[field][key]
+        if not best_matches:
+            best_matches.append((os_dict, score))
+        elif score == best_matches[0][1]:
+            best_matches.append((os_dict, score))
+        elif score > best_matches[0][1]:
+            best_matches.clear()
+            best_matches.append((os_dict, score))
+
+    return best_matches
+
+
+NUMERIC_KEYS = ['SP', 'GCD', 'ISR', 'TS', 'W1', 'W2', 'W3', 'W4', 'W5', 'W6', 'T', 'TG', 'W', 'IPL', 'UN', 'RD']
+NUMERIC_PARTS = ['0', '1', '5', 'A', '10', 'FF', '40', '80', '3B-45', '7B-85', '0-5', '5-3', '>A', '>FF']
+# Only found as whole values
+SINGLE_NUMERIC_PARTS = ['<40', 'G', 'Z', 'U']
+STRING_PARTS = ['Y', 'N', 'S', 'O', 'S+', 'AR', 'M5B4', '', 'G', 'Z', 'I', 'RI', 'BI', 'RD', 'U']
+INVALID_PARTS = ['1-', 'K-5', 'Y']
+
+
+def random_value(rng: random.Random, key: str):
+    count = rng.randint(2, 4) if rng.random() < 0.3 else 1
+    parts = STRING_PARTS
+    if key in NUMERIC_KEYS:
+        parts = NUMERIC_PARTS + SINGLE_NUMERIC_PARTS if count == 1 else NUMERIC_PARTS
+    values = [rng.choice(INVALID_PARTS) if rng.random() < 0.0002 else rng.choice(parts) for _ in range(count)]
+    return "|".join(values)
+
+
+def random_profile_value(rng: random.Random, key: str):
+    if rng.random() < 0.0005:
+        return rng.choice([True, None, 'Z'])
+    if key in NUMERIC_KEYS:
+        return rng.randint(0, 300)
+    return rng.choice(STRING_PARTS)
+
+
+def random_db(rng: random.Random, scoring: Scoring, count: int):
+    os_dicts = []
+    for i in range(count):
+        os_dict = {field: {key: random_value(rng, key) for key in keys if rng.random() < 0.9} for field, keys in scoring.scoring_dict.items()}
+        if os_dicts and rng.random() < 0.3:
+            # Fingerprints often share some of their lines with another one
+            other = rng.choice(os_dicts)
+            os_dict.update({field: dict(other[field]) for field in rng.sample(list(scoring.scoring_dict), 6)})
+        os_dict["os_title"] = f"OS {i}"
+        os_dicts.append(os_dict)
+    return os_dicts
+
+
+def random_profile(rng: random.Random, scoring: Scoring):
+    return {field: {key: random_profile_value(rng, key) for key in keys} for field, keys in scoring.scoring_dict.items()}
+
+
+def twin_fingerprint(profile: dict):
+    """A fingerprint of the database with the values of the profile."""
+    twin = {field: {key: value if isinstance(value, str) else f"{value:X}" for key, value in values.items()
+                    if isinstance(value, (str, int)) and not isinstance(value, bool)}
+            for field, values in profile.items()}
+    return dict(twin, os_title="twin")
+
+
+def record_dict(os_dict: dict):
+    """A fingerprint of random_db with the other keys of a parsed fingerprint."""
+    return dict(os_dict, os_info="Class Vendor | OS | 1.X | general purpose", os_cpe="", os_description="",
+                description=[f"# {os_dict['os_title']}"])
+
+
+def brute_force_ranking(scoring: Scoring, profile: dict, compiled: list):
+    """
+    Score the profile against every compiled fingerprint, without pruning, index nor shared bodies.
+    :return: Tuple of the best matches like Scoring.score and of the (os_dict, score, possible points) of all the
+     fingerprints in the order of Scoring.top_k.
+    """
+    checks = scoring.profile_checks(profile)
+    scores = [scoring.score_fingerprint(checks, fingerprint) for fingerprint in compiled]
+    possible = [scoring.possible_points(checks, fingerprint) for fingerprint in compiled]
+    ranked = sorted(range(len(compiled)), reverse=True,
+                    key=lambda i: (scores[i] / possible[i] if possible[i] else 0.0, scores[i], -i))
+    return [(fingerprint.os_dict, score) for fingerprint, score in zip(compiled, scores) if score == max(scores)], \
+        [(compiled[i].os_dict, scores[i], possible[i]) for i in ranked]
+
+
+def reference_or_error(score, *args):
+    try:
+        return score(*args)
+    except ValueError as ve:
+        return f"ValueError: {ve}"
+
+
+def random_batch(rng: random.Random, scoring: Scoring, count: int):
+    """Random profiles, with repeated profiles and fields like the hosts of a network."""
+    profiles = []
+    for _ in range(count):
+        profile = random_profile(rng, scoring)
+        if profiles and rng.random() < 0.5:
+            other = rng.choice(profiles)
+            profile.update({field: other[field] for field in rng.sample(list(scoring.scoring_dict), rng.randint(1, 13))})
+        profiles.append(profile)
+    return profiles
+
+
+def expected_batch(score, profiles: list, *args):
+    """The results of scoring the profiles one by one, or the first error."""
+    results = [reference_or_error(score, profile, *args) for profile in profiles]
+    return next((result for result in results if isinstance(result, str)), results)
+
+
+TARGET = "192.0.2.10"
+
+
+def received(packet, rng: random.Random):
+    """The packet as it is dissected from the wire, with its receive time."""
+    response = IP(bytes(packet))
+    response.time = 1000 + rng.random()
+    return response
+
+
+def host_responses(rng: random.Random):
+    """Random responses of Probes.probe_all of one host, the packets dissected like the received ones."""
+    ttl = rng.choice([64, 128, 255]) - rng.randint(1, 20)
+    df = rng.choice(["DF", 0])
+    ip_id = rng.randrange(65536)
+    id_step = rng.choice([0, 1, 256, rng.randrange(65536)])
+    isn = rng.getrandbits(32)
+    window = rng.choice([5840, 8192, 29200, 65535])
+    tsval = rng.getrandbits(31)
+    options = rng.choice([[("MSS", 1460), ("SAckOK", b""), ("Timestamp", (tsval, 0)), ("NOP", None), ("WScale", 7)],
+                          [("MSS", 1380), ("NOP", None), ("WScale", 8), ("SAckOK", b""), ("EOL", None)],
+                          [("MSS", 536)], []])
+
+    def reply(number: int, sent, flags: str, **fields):
+        tcp = TCP(sport=sent[TCP].dport, dport=sent[TCP].sport, flags=flags, seq=fields.pop("seq", isn + number * 12345),
+                  ack=fields.pop("ack", sent[TCP].seq + 1), window=fields.pop("window", window), **fields)
+        return received(IP(src=TARGET, ttl=ttl, flags=df, id=(ip_id + number * id_step) % 65536) / tcp, rng)
+
+    syn_pkts = [IP(dst=TARGET) / TCP(sport=40000 + i, dport=80, flags="S", seq=rng.getrandbits(32),
+                                     ack=rng.getrandbits(32), options=[("WScale", 10), ("MSS", 1460)]) for i in range(6)]
+    syn_responses = [reply(i, pkt, "SA", options=[(name, (tsval + i * 10, 0)) if name == "Timestamp" else (name, value)
+                                                   for name, value in options]) for i, pkt in enumerate(syn_pkts)]
+    syn_times = [(i * 100_000_000, i * 100_000_000 + 500_000) for i in range(6)]
+    responses = {"SYN": [syn_responses, syn_pkts, syn_times]}
+
+    ecn = IP(dst=TARGET) / TCP(sport=40010, dport=80, flags="SEC", seq=rng.getrandbits(32), urgptr=0xF7F5)
+    responses["ECN"] = [reply(6, ecn, rng.choice(["SA", "SAE", "SAEC"]), options=options,
+                              reserved=rng.choice([0, 0, 4])), ecn, (0, 1000)]
+    for number, (probe_type, flags) in enumerate([("T2", ""), ("T3", "SFUP"), ("T4", "A"), ("T5", "S"), ("T6", "A"),
+                                                  ("T7", "FPU")]):
+        pkt = IP(dst=TARGET) / TCP(sport=40020 + number, dport=80 if number < 3 else 113, flags=flags,
+                                   seq=rng.getrandbits(32), ack=rng.getrandbits(32))
+        if rng.random() < 0.3:
+            response = None
+        elif number < 2 and rng.random() < 0.5:
+            response = reply(7 + number, pkt, "SA", options=options)
+        else:
+            rst = rng.choice(["R", "RA"])
+            response = reply(7 + number, pkt, rst, window=0, seq=rng.choice([0, pkt[TCP].ack]),
+                             ack=rng.choice([0, pkt[TCP].seq, pkt[TCP].seq + 1]),
+                             urgptr=rng.choice([0, 0, 7]))
+            if rst == "R" and rng.random() < 0.3:
+                response = received(response / Raw(b"connection refused"), rng)
+        responses[probe_type] = [response, pkt, (0, None if response is None else 1000)]
+
+    u1 = IP(dst=TARGET, id=0x1042) / UDP(sport=40030, dport=113) / Raw(b"C" * 300)
+    quoted = IP(bytes(u1))
+    if rng.random() < 0.3:
+        quoted[IP].id = 0x2042
+    if rng.random() < 0.3:
+        quoted[UDP].chksum = 0x1234
+    if rng.random() < 0.3:
+        quoted = quoted.__class__(bytes(quoted)[:28] + b"D" * 300)
+    u1_response = received(IP(src=TARGET, ttl=ttl, flags=df, id=ip_id) / ICMP(type=3, code=3, unused=rng.choice([0, 0, 5]))
+                           / bytes(quoted)[:rng.choice([28, 328])], rng)
+    responses["U1"] = [u1_response if rng.random() < 0.9 else None, u1, (0, 1000)]
+
+    ie_pkts = [IP(dst=TARGET, flags="DF", tos=0) / ICMP(type=8, code=9, id=0x1000, seq=295),
+               IP(dst=TARGET, tos=4) / ICMP(type=8, code=0, id=0x1001, seq=296)]
+    code = rng.choice([0, 9, 5])
+    ie_responses = [received(IP(src=TARGET, ttl=ttl, flags=rng.choice(["DF", 0]), id=(ip_id + 7 + i) % 65536) /
+                             ICMP(type=0, code=code if i == 0 else rng.choice([0, code]), id=pkt[ICMP].id, seq=pkt[ICMP].seq),
+                             rng)
+                    for i, pkt in enumerate(ie_pkts)]
+    responses["IE"] = [ie_responses, ie_pkts, [(0, 1000), (0, 1000)]]
+    return responses
+
+
+PORTS = [22, 53, 80, 113, 123, 443, 4789]
+
+
+def random_options(rng: random.Random):
+    return [rng.choice([("MSS", rng.randrange(65536)), ("NOP", None), ("WScale", rng.randrange(15)), ("SAckOK", b""),
+                        ("Timestamp", (rng.getrandbits(32), rng.getrandbits(32))), ("EOL", None), ("UTO", 5),
+                        ("SAck", tuple(rng.getrandbits(32) for _ in range(rng.randint(1, 3))))])
+            for _ in range(rng.randint(0, 5))]
+
+
+def random_packet(rng: random.Random):
+    """
+    The bytes of a random IPv4 packet: TCP, UDP, ICMP or an ICMP error quoting a UDP or TCP header, sometimes
+    padded like a short Ethernet frame, truncated or with a few bytes corrupted.
+    """
+    ip = IP(src=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}", dst="192.0.2.1",
+            ttl=rng.randrange(256), id=rng.randrange(65536), flags=rng.randrange(8), tos=rng.randrange(256),
+            frag=0 if rng.random() < 0.9 else rng.randrange(8192))
+    if rng.random() < 0.1:
+        ip.options = [IPOption_NOP()] * rng.choice([4, 8])
+    port = lambda: rng.choice(PORTS + [rng.randrange(65536)])
+    payload = bytes(rng.getrandbits(8) for _ in range(rng.choice([0, 0, 3, 18, 200])))
+    kind = rng.choice(["tcp", "tcp", "udp", "icmp", "error", "error"])
+    if kind == "tcp":
+        packet = ip / TCP(sport=port(), dport=port(), seq=rng.getrandbits(32), ack=rng.getrandbits(32),
+                          flags=rng.randrange(512), window=rng.randrange(65536), urgptr=rng.randrange(65536),
+                          reserved=rng.randrange(8), options=random_options(rng)) / payload
+    elif kind == "udp":
+        packet = ip / UDP(sport=port(), dport=port()) / payload
+    elif kind == "icmp":
+        packet = ip / ICMP(type=rng.choice([0, 8, 13, 14, 17, 18, 9]), code=rng.randrange(16), id=rng.randrange(65536),
+                           seq=rng.randrange(65536)) / payload
+    else:
+        transport = UDP(sport=port(), dport=port(), len=rng.choice([None, None, rng.randrange(400)])) \
+            if rng.random() < 0.7 else TCP(sport=port(), dport=port())
+        quoted = IP(src="192.0.2.1", id=rng.randrange(65536), len=rng.choice([None, None, rng.randrange(65536)])) / \
+            transport / (b"C" * rng.choice([0, 8, 100, 300]))
+        packet = ip / ICMP(type=rng.choice([3, 3, 4, 5, 11, 12]), code=rng.randrange(16)) / \
+            bytes(quoted)[:rng.choice([28, 48, 128, 1000])]
+    data = bytearray(bytes(packet))
+    change = rng.random()
+    if change < 0.2:
+        data += bytes(rng.randrange(20))
+    elif change < 0.35:
+        for _ in range(rng.randint(1, 3)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+    elif change < 0.45:
+        data = data[:rng.randrange(len(data) + 1)]
+    return bytes(data)
@@ -0,0 +1,95 @@
+import queue
+import pytest
+import unittest
+from unittest.mock import patch
+from scapy.layers.inet import IP, TCP
+
+from os_hound.batch_scanner import BatchScanner
+from os_hound.rtt_estimator import RttEstimator
+
+
+class FakeL3Socket:
+    """Fake L3 socket answering SYN packets like a host with ports 22 and 80 open."""
+    sent = []
+
+    def __init__(self, filter=None):
+        self.replies = queue.Queue()
+
+    def send(self, pkt):
+        FakeL3Socket.sent.append(pkt)
+        port = pkt[TCP].dport
+        if port in [22, 80]:
+            flags = 'SA'
+        elif port == 443:
+            # Filtered port
+            return
+        else:
+            flags = 'RA'
+        self.replies.put(IP(src=pkt[IP].dst) / TCP(sport=port, dport=pkt[TCP].sport, flags=flags, ack=pkt[TCP].seq + 1))
+        # Unrelated traffic from the same host
+        self.replies.put(IP(src=pkt[IP].dst) / TCP(sport=port, dport=pkt[TCP].sport + 1, flags='SA', ack=1))
+
+    def select(self, sockets, remain=None):
+        try:
+            self.replies.put(self.replies.get(timeout=remain))
+        except queue.Empty:
+            return []
+        return sockets
+
+    def recv(self):
+        return self.replies.get()
+
+    def recv_raw(self):
+        return IP, bytes(self.replies.get()), None
+
+    def close(self):
+        pass
+
+
+class TestBatchScanner(unittest.TestCase):
+    def setUp(self):
+        FakeL3Socket.sent = []
+
+    @patch('os_hound.batch_scanner.conf')
+    def test_scan(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        rtt_estimator = RttEstimator(min_timeout=0.1, max_timeout=0.1)
+        states = BatchScanner(rtt_estimator=rtt_estimator).scan("192.168.1.1", [21, 22, 80, 443])
+
+        assert states == {21: 'closed', 22: 'open', 80: 'open'}
+        assert rtt_estimator.srtt is not None
+
+    @patch('os_hound.batch_scanner.conf')
+    def test_scan_host_name(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        rtt_estimator = RttEstimator(min_timeout=0.1, max_timeout=0.1)
+        states = BatchScanner(rtt_estimator=rtt_estimator).scan("localhost", [21, 22])
+
+        # The replies come from 127.0.0.1
+        assert states == {21: 'closed', 22: 'open'}
+
+    @patch('os_hound.batch_scanner.conf')
+    def test_scan_retries_unanswered_ports(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        rtt_estimator = RttEstimator(min_timeout=0.1, max_timeout=0.1)
+        BatchScanner(retries=2, rtt_estimator=rtt_estimator).scan("192.168.1.1", [22, 443])
+
+        sent_ports = [pkt[TCP].dport for pkt in FakeL3Socket.sent]
+        assert sent_ports == [22, 443, 443, 443]
+
+    @patch('os_hound.batch_scanner.conf')
+    def test_scan_range(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        rtt_estimator = RttEstimator(min_timeout=0.1, max_timeout=0.1)
+        states = BatchScanner(retries=1, rtt_estimator=rtt_estimator).scan("192.168.1.1", range(440, 445))
+
+        assert states == {440: 'closed', 441: 'closed', 442: 'closed', 444: 'closed'}
+        assert [pkt[TCP].dport for pkt in FakeL3Socket.sent] == [440, 441, 442, 443, 444, 443]
+
+
+if __name__ == '__main__':
+    pytest.main()
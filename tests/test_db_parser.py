@@ -1,7 +1,52 @@
+import os
+import pickle
+import random
+import shutil
+import tempfile
 import pytest
 import unittest
+from unittest.mock import patch
 from os_hound.db_parser import DbParser
 
+DB_TEXT = """# Test database
+
+# Two fingerprints
+
+# Device one
+Fingerprint First OS
+Class Vendor | OS | 1.X | general purpose
+CPE cpe:/o:vendor:os:1
+SEQ(SP=0-5%GCD=1-6%ISR=C8-D2%TI=I%CI=I%II=RI%SS=S%TS=U)
+OPS(O1=M5B4%O2=M5B4%O3=M5B4%O4=M5B4%O5=M5B4%O6=M5B4)
+WIN(W1=8000%W2=8000%W3=8000%W4=8000%W5=8000%W6=8000)
+ECN(R=Y%DF=N%T=FA-104%TG=FF%W=8000%O=M5B4%CC=N%Q=)
+T1(R=Y%DF=N%T=FA-104%TG=FF%S=O%A=S+%F=AS%RD=0%Q=)
+T2(R=N)
+T3(R=N)
+T4(R=N)
+T5(R=N)
+T6(R=N)
+T7(R=N)
+U1(DF=N%T=FA-104%TG=FF%IPL=38%UN=0%RIPL=G%RID=G%RIPCK=G%RUCK=G%RUD=G)
+IE(DFI=S%T=FA-104%TG=FF%CD=S)
+
+# Device two
+Fingerprint Second OS
+Class Vendor | OS | 2.X | general purpose
+SEQ(SP=5A-A0%GCD=1-6%ISR=C8-D2%TI=Z%CI=Z%II=I%TS=7)
+OPS(O1=M5B4%O2=M5B4%O3=M5B4%O4=M5B4%O5=M5B4%O6=M5B4)
+WIN(W1=FFFF%W2=FFFF%W3=FFFF%W4=FFFF%W5=FFFF%W6=FFFF)
+ECN(R=Y%DF=Y%T=3B-45%TG=40%W=FFFF%O=M5B4NNSW0N%CC=Y%Q=)
+T1(R=Y%DF=Y%T=3B-45%TG=40%S=O%A=S+%F=AS%RD=0%Q=)
+T2(R=N)
+T3(R=N)
+T4(R=N)
+T5(R=N)
+T6(R=N)
+T7(R=N)
+U1(DF=N%T=3B-45%TG=40%IPL=164%UN=0%RIPL=G%RID=G%RIPCK=G%RUCK=G%RUD=G)
+IE(DFI=N%T=3B-45%TG=40%CD=S)"""
+
 
 class TestDbParser(unittest.TestCase):
     def test_parse_db(self):
@@ -29,5 +74,94 @@ class TestDbParser(unittest.TestCase):
         assert res[3]["ECN"]["O"] == 'M5B4NNSW0N'
 
 
+class TestDbParserCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "nmap-db.txt")
+        with open(self.db_path, "w", encoding="utf8") as db_file:
+            db_file.write(DB_TEXT)
+        self.parser = DbParser(self.db_path, cache_dir=os.path.join(self.temp_dir, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_cache_load(self):
+        os_dicts = self.parser.parse_db()
+
+        assert os_dicts == self.parser.parse_text()
+        assert [os_dict["os_title"] for os_dict in os_dicts] == ["Fingerprint First OS", "Fingerprint Second OS"]
+        assert os.path.exists(self.parser.cache_path())
+
+        with patch.object(DbParser, 'parse_text') as mock_parse_text:
+            assert DbParser(self.db_path, cache_dir=self.parser.cache_dir).parse_db() == os_dicts
+            mock_parse_text.assert_not_called()
+
+    def test_cache_invalidated_by_content(self):
+        self.parser.parse_db()
+
+        with open(self.db_path, "w", encoding="utf8") as db_file:
+            db_file.write(DB_TEXT.replace("Second OS", "Third OS"))
+
+        assert self.parser.parse_db()[1]["os_title"] == "Fingerprint Third OS"
+
+    def test_cache_kept_when_only_mtime_changes(self):
+        os_dicts = self.parser.parse_db()
+        stat = os.stat(self.db_path)
+        os.utime(self.db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        with patch.object(DbParser, 'parse_text') as mock_parse_text:
+            assert self.parser.parse_db() == os_dicts
+            mock_parse_text.assert_not_called()
+
+    def test_equal_lines_shared(self):
+        with open(self.db_path, "a", encoding="utf8") as db_file:
+            db_file.write("\n\n" + DB_TEXT.split("\n\n")[2].replace("First OS", "Third OS"))
+
+        for os_dicts in [self.parser.parse_text(), self.parser.parse_db(), self.parser.parse_db()]:
+            first, second, third = os_dicts
+            assert first["T2"] is second["T2"]
+            assert first["T1"] is not second["T1"]
+            # The third fingerprint only differs from the first one in its title
+            assert third["os_title"] == "Fingerprint Third OS"
+            assert all(first[field] is third[field] for field in ["SEQ", "OPS", "WIN", "ECN", "T1", "T2", "T3", "T4", "T5", "T6", "T7", "U1", "IE"])
+
+    def test_db_version(self):
+        version = self.parser.db_version()
+
+        assert DbParser(self.db_path).db_version() == version
+        with open(self.db_path, "w", encoding="utf8") as db_file:
+            db_file.write(DB_TEXT.replace("Second OS", "Third OS"))
+        assert self.parser.db_version() != version
+
+    def test_corrupt_cache(self):
+        os_dicts = self.parser.parse_db()
+        with open(self.parser.cache_path(), "wb") as cache_file:
+            cache_file.write(b"not a pickle")
+
+        assert self.parser.parse_db() == os_dicts
+
+    def test_damaged_cache(self):
+        os_dicts = self.parser.parse_db()
+        with open(self.parser.cache_path(), "rb") as cache_file:
+            valid = cache_file.read()
+        rng = random.Random(11)
+        for _ in range(300):
+            damaged = bytearray(valid)
+            for _ in range(rng.randint(1, 4)):
+                damaged[rng.randrange(len(damaged))] = rng.randrange(256)
+            with open(self.parser.cache_path(), "wb") as cache_file:
+                cache_file.write(damaged)
+
+            assert [os_dict["os_title"] for os_dict in self.parser.parse_db()] == \
+                   [os_dict["os_title"] for os_dict in os_dicts]
+
+    def test_cache_without_keys(self):
+        os_dicts = self.parser.parse_db()
+        with open(self.parser.cache_path(), "wb") as cache_file:
+            pickle.dump({"version": DbParser.CACHE_VERSION, "os_dicts": []}, cache_file)
+
+        assert self.parser.parse_db() == os_dicts
+
+
 if __name__ == '__main__':
     pytest.main()
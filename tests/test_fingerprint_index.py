@@ -0,0 +1,84 @@
+import random
+import pytest
+import unittest
+from os_hound.db_parser import DbParser
+from os_hound.fingerprint_index import FingerprintIndex
+from os_hound.scoring import Scoring
+from tests.helpers import random_db, random_profile, random_profile_value, twin_fingerprint
+
+
+class TestFingerprintIndex(unittest.TestCase):
+    def test_lookup(self):
+        compiled = DbParser().compile_db([{"T1": {"R": "Y|N", "T": "3B-45"}, "os_title": "first"},
+                                          {"T1": {"R": "Y", "T": ">40"}, "os_title": "second"},
+                                          {"T1": {"R": "N", "T": "U"}, "os_title": "third"}])
+        index = FingerprintIndex(compiled)
+
+        def positions(key, value):
+            return sorted(position for posting in index.lookup("T1", key, value, isinstance(value, str))
+                          for position in posting)
+
+        assert positions("R", "Y") == [0, 1]
+        assert positions("R", "N") == [0, 2]
+        assert positions("R", "S") == []
+        # The range of the first is in buckets, the threshold of the second in the wide posting
+        assert positions("T", 0x3C) == [0, 1]
+        assert positions("T", 0x100) == [1]
+        assert not index.can_raise("T1", "T")
+
+    def test_lookup_finds_every_match(self):
+        rng = random.Random(8)
+        scoring = Scoring()
+        os_dicts = random_db(rng, scoring, 200)
+        compiled = DbParser().compile_db(os_dicts)
+        index = DbParser().build_index(compiled)
+        for _ in range(2000):
+            field = rng.choice(scoring.filed_names)
+            key = rng.choice(list(scoring.scoring_dict[field]))
+            value = random_profile_value(rng, key)
+            if not isinstance(value, (str, int)):
+                continue
+            found = {position for posting in index.lookup(field, key, value, isinstance(value, str))
+                     for position in posting}
+            for position, fingerprint in enumerate(compiled):
+                matcher = fingerprint.tests[field].get(key)
+                if matcher is None:
+                    continue
+                if isinstance(value, str):
+                    matches = matcher.match_str(value)
+                else:
+                    try:
+                        matches = matcher.match_int(value) is True
+                    except ValueError:
+                        assert index.can_raise(field, key)
+                        continue
+                if matches:
+                    assert position in found
+
+    def test_score_with_index_scores_candidates(self):
+        rng = random.Random(9)
+        scoring = Scoring()
+        selected = 0
+        for _ in range(30):
+            profile = random_profile(rng, scoring)
+            os_dicts = random_db(rng, scoring, 40)
+            os_dicts.insert(rng.randint(0, len(os_dicts)), twin_fingerprint(profile))
+            compiled = DbParser().compile_db(os_dicts)
+            stats = scoring.new_stats()
+            try:
+                scoring.score(profile, compiled, DbParser().build_index(compiled), stats)
+            except ValueError:
+                continue
+
+            assert stats["candidates"] <= len(compiled)
+            selected += stats["fingerprints"] < len(compiled)
+        assert selected
+
+    def test_score_with_index_of_other_db(self):
+        compiled = DbParser().compile_db([{"T1": {"R": "Y"}, "os_title": "first"}])
+        with pytest.raises(ValueError):
+            Scoring().score({"T1": {"R": "Y"}}, compiled + compiled, FingerprintIndex(compiled))
+
+
+if __name__ == '__main__':
+    pytest.main()
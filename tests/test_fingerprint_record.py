@@ -0,0 +1,64 @@
+import pickle
+import random
+import pytest
+import unittest
+from os_hound.fingerprint_record import FingerprintLine, FingerprintRecord, TEST_FIELDS
+from os_hound.scoring import Scoring
+from tests.helpers import random_db, record_dict
+
+
+class TestFingerprintRecord(unittest.TestCase):
+    def test_line(self):
+        line = FingerprintLine.from_dict({"R": "Y", "DF": "N", "Q": ""})
+
+        assert line["DF"] == "N"
+        assert list(line) == ["R", "DF", "Q"]
+        assert dict(line.items()) == {"R": "Y", "DF": "N", "Q": ""}
+        # The items are a view, sized and iterated again
+        items = line.items()
+        assert len(items) == 3 and list(items) == list(items) == [("R", "Y"), ("DF", "N"), ("Q", "")]
+        assert ("DF", "N") in items and ("DF", "Y") not in items
+        assert items == {"R": "Y", "DF": "N", "Q": ""}.items()
+        assert line == {"R": "Y", "DF": "N", "Q": ""}
+        assert "Q" in line and "T" not in line
+        assert line.get("T") is None
+        with pytest.raises(KeyError):
+            line["T"]
+        with pytest.raises(TypeError):
+            line["R"] = "N"
+
+    def test_lines_share_keys(self):
+        first = FingerprintLine.from_dict({"R": "Y", "DF": "N"})
+        second = FingerprintLine.from_dict({"R": "N", "DF": "Y"})
+
+        assert first.names is second.names
+        assert first.positions is second.positions
+
+    def test_record(self):
+        os_dict = record_dict(random_db(random.Random(1), Scoring(), 1)[0])
+        record = FingerprintRecord(os_dict)
+
+        assert record == os_dict
+        assert record.to_dict() == os_dict
+        assert len(record.items()) == len(os_dict)
+        assert list(record.items()) == list(record.items()) == list(os_dict.items())
+        assert type(record.to_dict()["T1"]) is dict
+        assert isinstance(record["T1"], FingerprintLine)
+        assert record.get("os_title") == "OS 0"
+        assert len(record) == len(os_dict)
+        with pytest.raises(KeyError):
+            record["row"]
+
+    def test_pickle_keeps_shared_lines(self):
+        line = FingerprintLine.from_dict({"R": "N"})
+        records = [FingerprintRecord(record_dict(dict({field: line for field in TEST_FIELDS}, os_title=title)))
+                   for title in ["first", "second"]]
+
+        first, second = pickle.loads(pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL))
+        assert [first, second] == records
+        assert first["T2"] is first["T3"] is second["T2"]
+        assert first["T2"].names is line.names
+
+
+if __name__ == '__main__':
+    pytest.main()
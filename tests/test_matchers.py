@@ -0,0 +1,87 @@
+import random
+import pytest
+import unittest
+from os_hound.db_parser import DbParser
+from os_hound.matchers import Matcher, CompiledFingerprint, STOP
+from os_hound.scoring import Scoring
+from tests.helpers import reference_score, random_db, random_profile, reference_or_error, random_batch, expected_batch
+
+
+class TestMatcher(unittest.TestCase):
+    def test_alternatives(self):
+        matcher = Matcher("1-5|7|>A")
+
+        assert matcher.match_str("7")
+        assert not matcher.match_str("2")
+        assert [matcher.match_int(value) for value in [0, 1, 4, 5, 7, 10, 11]] == [False, True, True, False, True, False, True]
+
+    def test_thresholds(self):
+        assert Matcher("<40").match_int(0x3F)
+        assert not Matcher("<40").match_int(0x40)
+        assert Matcher(">40").match_int(0x41)
+        assert not Matcher(">40").match_int(0x40)
+        assert Matcher("FF").match_int(255)
+
+    def test_stop_values(self):
+        assert Matcher("Z").match_int(0) is STOP
+        assert Matcher("Z").match_str("Z")
+        # Only a whole value stops the field, not an alternative
+        with pytest.raises(ValueError):
+            Matcher("5|Z").match_int(6)
+
+    def test_invalid_hex(self):
+        matcher = Matcher("5|K|7")
+
+        assert matcher.match_int(5)
+        with pytest.raises(ValueError, match="invalid literal for int"):
+            matcher.match_int(7)
+        with pytest.raises(ValueError):
+            Matcher("Y").match_int(1)
+
+    def test_shared_matchers(self):
+        matchers = {}
+        first = CompiledFingerprint({"T1": {"R": "Y", "DF": "N"}, "T2": {"R": "N"}, "os_title": "first"}, matchers)
+        second = CompiledFingerprint({"T1": {"R": "Y"}, "T2": {"R": "N"}, "os_title": "second"}, matchers)
+
+        assert first.tests["T1"]["R"] is second.tests["T1"]["R"]
+        assert first.tests["T1"] is not second.tests["T1"]
+        # Equal lines share one dictionary of matchers
+        assert first.tests["T2"] is second.tests["T2"]
+
+    def test_shared_bodies(self):
+        matchers = {}
+        first = CompiledFingerprint({"T1": {"R": "Y"}, "T2": {"R": "N"}, "os_title": "first"}, matchers)
+        second = CompiledFingerprint({"T1": {"R": "Y"}, "T2": {"R": "N"}, "os_title": "second"}, matchers)
+        third = CompiledFingerprint({"T1": {"R": "Y"}, "T2": {"R": "Y"}, "os_title": "third"}, matchers)
+
+        assert first.tests is second.tests
+        assert first.tests is not third.tests
+        assert first.errors is third.errors
+
+    def test_same_results_as_reference(self):
+        rng = random.Random(1)
+        scoring = Scoring()
+        for _ in range(200):
+            os_dicts = random_db(rng, scoring, 20)
+            profile = random_profile(rng, scoring)
+            compiled = DbParser().compile_db(os_dicts)
+
+            expected = reference_or_error(reference_score, scoring.scoring_dict, profile, os_dicts)
+            assert reference_or_error(scoring.score, profile, os_dicts) == expected
+            assert reference_or_error(scoring.score, profile, compiled) == expected
+
+    def test_score_many_same_results_as_score(self):
+        rng = random.Random(3)
+        scoring = Scoring()
+        for _ in range(100):
+            os_dicts = random_db(rng, scoring, 20)
+            profiles = random_batch(rng, scoring, 5)
+            compiled = DbParser().compile_db(os_dicts)
+
+            expected = expected_batch(scoring.score, profiles, compiled)
+            assert reference_or_error(scoring.score_many, profiles, os_dicts) == expected
+            assert reference_or_error(scoring.score_many, profiles, compiled) == expected
+
+
+if __name__ == '__main__':
+    pytest.main()
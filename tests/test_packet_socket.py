@@ -0,0 +1,202 @@
+import queue
+import random
+import threading
+import pytest
+import unittest
+from unittest.mock import patch
+from scapy.layers.inet import IP, TCP, ICMP, UDP
+
+from os_hound.batch_scanner import BatchScanner
+from os_hound.packet_socket import PacketSocket
+from os_hound.port_scanner import PortScanner
+from os_hound.raw_packet import RawPacketParser
+from os_hound.response_record import ResponseRecord
+from os_hound.rtt_estimator import RttEstimator
+
+
+class FakeL3Socket:
+    """Fake L3 socket answering like a host with ports 22 and 80 open and port 443 filtered."""
+    def __init__(self, filter=None):
+        self.replies = queue.Queue()
+        self.sent = []
+
+    def send(self, pkt):
+        self.sent.append(pkt)
+        # Unrelated traffic from another host
+        self.replies.put(IP(src="10.0.0.1") / ICMP(type=0))
+        if pkt.haslayer(ICMP):
+            self.replies.put(IP(src=pkt[IP].dst, dst=pkt[IP].src) / ICMP(type=0, id=pkt[ICMP].id, seq=pkt[ICMP].seq))
+            return
+        if pkt.haslayer(UDP) or pkt[TCP].dport == 444:
+            # Port unreachable for UDP, administratively prohibited for port 444
+            code = 3 if pkt.haslayer(UDP) else 13
+            self.replies.put(IP(src=pkt[IP].dst, dst=pkt[IP].src) / ICMP(type=3, code=code) / bytes(pkt)[:28])
+            return
+        port = pkt[TCP].dport
+        if port == 443:
+            return
+        flags = 'SA' if port in [22, 80] else 'RA'
+        self.replies.put(IP(src=pkt[IP].dst, dst=pkt[IP].src) / TCP(sport=port, dport=pkt[TCP].sport, flags=flags,
+                                                                    seq=1000, ack=pkt[TCP].seq + 1))
+
+    def select(self, sockets, remain=None):
+        try:
+            self.replies.put(self.replies.get(timeout=remain))
+        except queue.Empty:
+            return []
+        return sockets
+
+    def recv(self):
+        return self.replies.get()
+
+    def recv_raw(self):
+        return IP, bytes(self.replies.get()), None
+
+    def close(self):
+        pass
+
+
+@patch('os_hound.packet_socket.conf')
+class TestPacketSocket(unittest.TestCase):
+    def test_sr1(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        with PacketSocket("192.168.1.1") as packet_socket:
+            resp = packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=22, flags='S'), 1)
+            assert resp[TCP].sport == 22
+            assert resp[TCP].flags == 0x12
+
+            resp = packet_socket.sr1(IP(dst="192.168.1.1") / ICMP(id=7), 1)
+            assert resp[ICMP].id == 7
+
+            assert packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=443, flags='S'), 0.1) is None
+
+            resp, sent_ns, received_ns = packet_socket.sr1_timed(IP(dst="192.168.1.1") / TCP(dport=80, flags='S'), 1)
+            assert resp[TCP].sport == 80
+            assert received_ns >= sent_ns
+            assert packet_socket.pending == []
+
+    def test_answers_matched_on_records(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        with PacketSocket("192.168.1.1") as packet_socket:
+            # The TCP and ICMP answers and the port unreachable quoting a UDP header are matched without scapy
+            with patch.object(IP, 'answers', side_effect=AssertionError):
+                resp = packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=22, flags='S'), 1)
+                assert isinstance(resp, ResponseRecord) and resp[TCP].sport == 22
+                assert packet_socket.sr1(IP(dst="192.168.1.1") / ICMP(id=7), 1)[ICMP].id == 7
+                resp = packet_socket.sr1(IP(dst="192.168.1.1") / UDP(sport=40000, dport=33434) / (b"C" * 300), 1)
+                assert resp[ICMP].code == 3
+            # The records do not read the TCP header an ICMP error quotes, scapy matches it
+            resp = packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=444, flags='S'), 1)
+            assert isinstance(resp, ResponseRecord) and resp[ICMP].code == 13
+
+    def test_answers_like_scapy(self, mock_conf):
+        rng = random.Random(3)
+        parser = RawPacketParser()
+        answers = PacketSocket._PacketSocket__answers
+        matched = told = 0
+        for _ in range(3000):
+            request = random_request(rng)
+            reply = random_reply(rng, request)
+            expected = bool(IP(bytes(reply)).answers(IP(bytes(request))))
+            result = answers(parser.decode(bytes(reply)), parser.decode(bytes(request)))
+            if result is not None:
+                assert result == expected, (request.summary(), reply.summary())
+                told += 1
+                matched += result
+        # Only UDP replies and errors quoting TCP go to scapy, hundreds of the others answering their request
+        assert told > 1800 and matched > 400
+
+    def test_host_name(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+
+        # The answers come from the address of the name
+        with PacketSocket("localhost") as packet_socket:
+            assert packet_socket.target_ip == "127.0.0.1"
+            assert packet_socket.sr1(IP(dst="localhost") / TCP(dport=22, flags='S'), 1)[TCP].sport == 22
+
+    def test_concurrent_sr1(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+        results = {}
+
+        def probe(packet_socket, port):
+            results[port] = packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=port, flags='S'), 1)
+
+        with PacketSocket("192.168.1.1") as packet_socket:
+            threads = [threading.Thread(target=probe, args=(packet_socket, port)) for port in [21, 22, 80, 8080]]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert {port: resp[TCP].sport for port, resp in results.items()} == {21: 21, 22: 22, 80: 80, 8080: 8080}
+        assert results[22][TCP].flags == 0x12
+        assert results[21][TCP].flags == 0x14
+
+    def test_listeners(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+        received = []
+
+        with PacketSocket("192.168.1.1") as packet_socket:
+            packet_socket.add_listener(received.append)
+            packet_socket.send(IP(dst="192.168.1.1") / TCP(dport=80, flags='S'))
+            packet_socket.sr1(IP(dst="192.168.1.1") / TCP(dport=22, flags='S'), 1)
+            packet_socket.remove_listener(received.append)
+
+        # The answer of sr1 and the packets of the other host are not passed to the listeners
+        assert [resp[TCP].sport for resp in received] == [80]
+
+    def test_shared_with_scanners(self, mock_conf):
+        mock_conf.L3socket = FakeL3Socket
+        rtt_estimator = RttEstimator(min_timeout=0.1, max_timeout=0.1)
+
+        with PacketSocket("192.168.1.1") as packet_socket:
+            states = BatchScanner(rtt_estimator=rtt_estimator, packet_socket=packet_socket).scan("192.168.1.1", [21, 22, 80, 443])
+            assert states == {21: 'closed', 22: 'open', 80: 'open'}
+            assert packet_socket.listeners == []
+
+            scanner = PortScanner(rtt_estimator=rtt_estimator, retries=0, packet_socket=packet_socket)
+            with patch('os_hound.port_scanner.sr1') as mock_sr1:
+                assert scanner.syn_scan("192.168.1.1", 20, 23, None) == [22]
+                mock_sr1.assert_not_called()
+            assert scanner.port_states == {20: 'closed', 21: 'closed', 22: 'open', 23: 'closed'}
+
+
+def random_request(rng: random.Random):
+    """A random probe like the ones of the scanners: TCP with any flags, UDP or an ICMP query."""
+    ip = IP(src="192.0.2.1", dst="192.0.2.10", id=rng.randrange(65536))
+    kind = rng.choice(["tcp", "tcp", "tcp", "udp", "icmp"])
+    if kind == "tcp":
+        return ip / TCP(sport=rng.randrange(1024, 65536), dport=rng.choice([22, 80, 443]), seq=rng.getrandbits(32),
+                        ack=rng.getrandbits(32), flags=rng.choice(["S", "SA", "A", "R", "RA", "FPU", "SEC", ""])) / \
+            (b"C" * rng.choice([0, 0, 5]))
+    if kind == "udp":
+        return ip / UDP(sport=rng.randrange(1024, 65536), dport=rng.randrange(30000, 40000)) / (b"C" * 300)
+    return ip / ICMP(type=rng.choice([8, 13, 17]), id=rng.randrange(65536), seq=rng.randrange(65536))
+
+
+def random_reply(rng: random.Random, request: IP):
+    """A random reply to the request, or to a request close to it: other addresses, ports, sequence numbers or ids."""
+    nudge = lambda value, size: value if rng.random() < 0.7 else (value + rng.randint(-4, 4)) % size
+    src, dst = (request.dst, request.src) if rng.random() < 0.9 else (request.dst, "192.0.2.99")
+    ip = IP(src=src, dst=dst)
+    if rng.random() < 0.25:
+        quoted = bytes(request)[:28]
+        if rng.random() < 0.3:
+            quoted = bytes(IP(quoted[:20])) if rng.random() < 0.5 else bytes(request.copy() / b"")[:20] + \
+                bytes(UDP(sport=rng.randrange(65536), dport=rng.randrange(65536)))
+        return ip / ICMP(type=rng.choice([3, 11]), code=rng.randrange(16)) / quoted
+    if request.haslayer(TCP):
+        sent = request[TCP]
+        return ip / TCP(sport=nudge(sent.dport, 65536), dport=nudge(sent.sport, 65536),
+                        seq=nudge(sent.ack, 2 ** 32), ack=nudge((sent.seq + 1) % 2 ** 32, 2 ** 32),
+                        flags=rng.choice(["SA", "S", "R", "RA", "A", "FA", "PA"]))
+    if request.haslayer(ICMP):
+        sent = request[ICMP]
+        return ip / ICMP(type=rng.choice([0, 14, 18, 8]), id=nudge(sent.id, 65536), seq=nudge(sent.seq, 65536))
+    return ip / UDP(sport=request[UDP].dport, dport=request[UDP].sport) / b"reply"
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -1,22 +1,25 @@
+import time
 import pytest
 import unittest
 from unittest.mock import patch, MagicMock
-from scapy.layers.inet import TCP
+from scapy.layers.inet import IP, TCP, ICMP
 
 from os_hound.port_scanner import PortScanner
+from os_hound.port_states import PortStateMap
 
 
 class TestPortScanner(unittest.TestCase):
-    # Mocking the __scan method
-    @patch.object(PortScanner, '_PortScanner__scan')
+    # Mocking the __scan_state method
+    @patch.object(PortScanner, '_PortScanner__scan_state')
     def test_syn_scan_with_port_range(self, mock_scan):
         scanner = PortScanner()
 
         # Setting mock responses
-        mock_scan.side_effect = lambda ip, port: port if port == 80 else None
+        mock_scan.side_effect = lambda ip, port: 'open' if port == 80 else 'closed'
 
         result = scanner.syn_scan("192.168.1.1", start_port=79, end_port=81)
         assert result == [80]
+        assert scanner.port_states == {79: 'closed', 80: 'open', 81: 'closed'}
 
     @patch('os_hound.port_scanner.sr1')
     def test_syn_scan_with_port_list(self, mock_scan):
@@ -40,16 +43,100 @@ class TestPortScanner(unittest.TestCase):
         result = scanner.syn_scan("192.168.1.1", ports_list=common_ports)
         assert result.sort() == [5432, 445, 135].sort()
 
-    @patch.object(PortScanner, '_PortScanner__scan')
+    @patch.object(PortScanner, '_PortScanner__scan_state')
     def test_syn_scan_with_no_open_ports(self, mock_scan):
         scanner = PortScanner()
 
-        # Setting mock to always return None (no open ports)
-        mock_scan.return_value = None
+        # Setting mock to always return filtered (no open ports)
+        mock_scan.return_value = 'filtered'
 
         result = scanner.syn_scan("192.168.1.1", start_port=1000, end_port=1005)
         assert result == []
 
+    @patch.object(PortScanner, '_PortScanner__scan_state')
+    def test_iter_syn_scan(self, mock_scan_state):
+        scanner = PortScanner()
+
+        mock_scan_state.side_effect = lambda ip, port: {80: 'open', 81: 'closed'}.get(port, 'filtered')
+
+        result = dict(scanner.iter_syn_scan("192.168.1.1", start_port=79, end_port=81))
+        assert result == {79: 'filtered', 80: 'open', 81: 'closed'}
+
+    @patch('os_hound.port_scanner.sr1')
+    def test_iter_syn_scan_port_states(self, mock_scan):
+        scanner = PortScanner(retries=0)
+
+        def side_effect(pkt, timeout=2, verbose=0):
+            if pkt[TCP].dport == 22:
+                return IP() / TCP(flags="SA")
+            elif pkt[TCP].dport == 23:
+                return IP() / TCP(flags="R")
+            elif pkt[TCP].dport == 24:
+                return IP() / ICMP(type=3, code=13)
+            return None
+
+        mock_scan.side_effect = side_effect
+
+        result = dict(scanner.iter_syn_scan("192.168.1.1", ports_list=[22, 23, 24, 25]))
+        assert result == {22: 'open', 23: 'closed', 24: 'filtered', 25: 'filtered'}
+
+    @patch('os_hound.port_scanner.sr1')
+    def test_syn_scan_fingerprint_only(self, mock_scan):
+        scanner = PortScanner(retries=0)
+
+        def side_effect(pkt, timeout=2, verbose=0):
+            if pkt[TCP].dport == 80:
+                return IP() / TCP(flags="SA")
+            elif pkt[TCP].dport == 22:
+                return IP() / TCP(flags="RA")
+            time.sleep(0.01)
+            return None
+
+        mock_scan.side_effect = side_effect
+
+        result = scanner.syn_scan("192.168.1.1", start_port=1, end_port=65535, fingerprint_only=True, priority_ports=[22, 80])
+        assert result == [80]
+        # Only a window of ports was submitted past the ones scanned
+        assert len(scanner.port_states) <= scanner.packets_sent
+        assert scanner.port_states[22] == 'closed'
+        # The scan stops long before the end of the range
+        assert scanner.packets_sent < 1000
+        assert mock_scan.call_count == scanner.packets_sent
+        assert scanner.scan_time < 10
+
+    def test_syn_scan_fingerprint_only_batch_engine(self):
+        with pytest.raises(ValueError):
+            PortScanner().syn_scan("192.168.1.1", start_port=1, end_port=100, engine="batch", fingerprint_only=True)
+
+    @patch.object(PortScanner, '_PortScanner__scan_state')
+    def test_iter_syn_scan_priority_ports(self, mock_scan_state):
+        scanner = PortScanner()
+
+        mock_scan_state.return_value = 'filtered'
+
+        list(scanner.iter_syn_scan("192.168.1.1", start_port=1, end_port=100, priority_ports=[80, 22, 8080]))
+        scanned = [call.args[1] for call in mock_scan_state.call_args_list]
+        assert scanned[:2] == [80, 22]
+        assert sorted(scanned) == list(range(1, 101))
+
+    @patch('os_hound.port_scanner.BatchScanner')
+    def test_syn_scan_with_batch_engine(self, mock_batch):
+        scanner = PortScanner()
+
+        mock_batch.return_value.scan.return_value = PortStateMap({80: 'open', 22: 'open', 81: 'closed'})
+        mock_batch.return_value.packets_sent = 71
+
+        result = scanner.scan_port_states("192.168.1.1", start_port=20, end_port=90, engine="batch")
+        assert [port for port, state in result.items() if state == 'open'] == [22, 80]
+        assert result[81] == 'closed'
+        assert result[21] == 'filtered'
+        assert len(result) == 71
+        assert scanner.packets_sent == 71
+
+    def test_syn_scan_with_invalid_engine(self):
+        with pytest.raises(ValueError):
+            PortScanner().syn_scan("192.168.1.1", start_port=20, end_port=90, engine="fast")
+
 
 if __name__ == '__main__':
     pytest.main()
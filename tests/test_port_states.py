@@ -0,0 +1,76 @@
+import sys
+import pytest
+import unittest
+
+from os_hound.port_states import PortStateMap
+
+
+class TestPortStateMap(unittest.TestCase):
+    def test_set_and_get(self):
+        states = PortStateMap()
+
+        states[0] = 'open'
+        states[1] = 'closed'
+        states[2] = 'filtered'
+        states[65535] = 'open'
+
+        assert states[0] == 'open'
+        assert states[1] == 'closed'
+        assert states[2] == 'filtered'
+        assert states[65535] == 'open'
+        assert len(states) == 4
+
+    def test_overwrite(self):
+        states = PortStateMap()
+
+        states[80] = 'filtered'
+        states[80] = 'open'
+
+        assert states[80] == 'open'
+        assert len(states) == 1
+
+    def test_missing_port(self):
+        states = PortStateMap({80: 'open'})
+
+        assert 81 not in states
+        assert 80 in states
+        assert states.get(81) is None
+        with pytest.raises(KeyError):
+            states[81]
+        with pytest.raises(KeyError):
+            states[70000]
+
+    def test_invalid_state(self):
+        with pytest.raises(ValueError):
+            PortStateMap()[80] = 'unknown'
+
+    def test_delete(self):
+        states = PortStateMap({80: 'open', 22: 'closed'})
+
+        del states[80]
+
+        assert 80 not in states
+        assert len(states) == 1
+
+    def test_dict_interface(self):
+        states = PortStateMap({443: 'open', 22: 'closed', 80: 'open', 8080: 'filtered'})
+
+        assert states == {22: 'closed', 80: 'open', 443: 'open', 8080: 'filtered'}
+        assert list(states) == [22, 80, 443, 8080]
+        assert states.ports('open') == [80, 443]
+        assert states.ports('closed') == [22]
+
+    def test_constant_size(self):
+        states = PortStateMap()
+        size = sys.getsizeof(states.bits)
+
+        for port in range(65536):
+            states[port] = 'filtered'
+
+        assert sys.getsizeof(states.bits) == size
+        assert size < 17 * 1024
+        assert len(states) == 65536
+
+
+if __name__ == '__main__':
+    pytest.main()
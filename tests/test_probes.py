@@ -1,8 +1,47 @@
+import queue
+import time
 import unittest
-from scapy.layers.inet import IP, ICMP
+from scapy.layers.inet import IP, ICMP, TCP, UDP
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 from os_hound.probes import Probes
+from os_hound.rtt_estimator import RttEstimator
+
+
+class FakeTargetSocket:
+    """Fake L3 socket answering the probes like a host with ports 22, 80 and 443 open that drops T2 and T3."""
+    def __init__(self, filter=None):
+        self.replies = queue.Queue()
+
+    def send(self, pkt):
+        src, dst = pkt[IP].dst, pkt[IP].src
+        if pkt.haslayer(ICMP):
+            reply = IP(src=src, dst=dst) / ICMP(type=0, id=pkt[ICMP].id, seq=pkt[ICMP].seq)
+        elif pkt.haslayer(UDP):
+            reply = IP(src=src, dst=dst) / ICMP(type=3, code=3) / pkt
+        elif pkt[TCP].flags in ['', 'SFUP']:
+            return
+        elif pkt[TCP].flags.S and pkt[TCP].dport in [22, 80, 443]:
+            reply = IP(src=src, dst=dst) / TCP(sport=pkt[TCP].dport, dport=pkt[TCP].sport, flags='SA', seq=1000, ack=pkt[TCP].seq + 1)
+        else:
+            reply = IP(src=src, dst=dst) / TCP(sport=pkt[TCP].dport, dport=pkt[TCP].sport, flags='RA', seq=pkt[TCP].ack, ack=pkt[TCP].seq + 1)
+        self.replies.put(IP(bytes(reply)))
+
+    def select(self, sockets, remain=None):
+        try:
+            self.replies.put(self.replies.get(timeout=remain))
+        except queue.Empty:
+            return []
+        return sockets
+
+    def recv(self):
+        return self.replies.get()
+
+    def recv_raw(self):
+        return IP, bytes(self.replies.get()), None
+
+    def close(self):
+        pass
 
 
 class TestProbes(unittest.TestCase):
@@ -50,6 +89,26 @@ class TestProbes(unittest.TestCase):
             self.assertEqual(response, 'fake_response')
             self.assertEqual(resp_probe_type, probe_type)
 
+    @patch('os_hound.probes.sr1')
+    def test_tcp_probe_known_closed_port(self, mock_sr1):
+        mock_sr1.return_value = 'fake_response'
+        probes = Probes(self.target_ip, self.open_ports, closed_ports=[113])
+
+        for probe_type in ['T5', 'T6', 'T7']:
+            response, resp_probe_type, original_pkt = probes.tcp_probe(probe_type)
+            self.assertEqual(original_pkt[TCP].dport, 113)
+
+        mock_sr1.return_value = None
+        response, probe_type, original_pkt = probes.udp_probe()
+        self.assertEqual(original_pkt[UDP].dport, 113)
+
+    @patch('os_hound.probes.sr1')
+    def test_tcp_probe_random_closed_port(self, mock_sr1):
+        mock_sr1.return_value = 'fake_response'
+
+        response, resp_probe_type, original_pkt = self.probes.tcp_probe('T5')
+        self.assertNotIn(original_pkt[TCP].dport, self.open_ports)
+
     @patch('os_hound.probes.sr1')
     def test_udp_probe(self, mock_sr1):
         # Arrange
@@ -63,6 +122,49 @@ class TestProbes(unittest.TestCase):
         self.assertEqual(response[ICMP].type, 3)
         self.assertEqual(response[ICMP].code, 3)
 
+    @patch('os_hound.probes.sr1')
+    def test_probe_with_packet_socket(self, mock_sr1):
+        packet_socket = MagicMock()
+        packet_socket.sr1_timed.return_value = 'fake_response', 1000, 2000
+        probes = Probes(self.target_ip, self.open_ports, packet_socket=packet_socket)
+
+        response, probe_type, original_pkt = probes.tcp_ecn_probe()
+
+        self.assertEqual(response, 'fake_response')
+        packet_socket.sr1_timed.assert_called_once()
+        mock_sr1.assert_not_called()
+
+    @patch('os_hound.packet_socket.conf')
+    def test_probe_all(self, mock_conf):
+        mock_conf.L3socket = FakeTargetSocket
+        probes = Probes(self.target_ip, self.open_ports, [113], rtt_estimator=RttEstimator(min_timeout=0.5, max_timeout=0.5))
+
+        start = time.monotonic()
+        responses = probes.probe_all()
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(set(responses), {"SYN", "IE", "ECN", "T2", "T3", "T4", "T5", "T6", "T7", "U1"})
+        # Every SYN probe gets the answer to its own source port
+        syn_responses, syn_pkts, syn_times = responses["SYN"]
+        self.assertEqual([resp[TCP].dport for resp in syn_responses], [pkt[TCP].sport for pkt in syn_pkts])
+        self.assertEqual([resp[ICMP].id for resp in responses["IE"][0]], [pkt[ICMP].id for pkt in responses["IE"][1]])
+        self.assertEqual(responses["ECN"][0][TCP].flags, 0x12)
+        self.assertIsNone(responses["T2"][0])
+        self.assertIsNone(responses["T3"][0])
+        self.assertEqual(responses["T5"][0][TCP].sport, 113)
+        self.assertEqual(responses["U1"][0][ICMP].type, 3)
+        # The SYN probes are timed one SYN_INTERVAL apart and every answered probe has its receive time
+        sent_times = [sent_ns for sent_ns, received_ns in syn_times]
+        self.assertEqual(len(sent_times), 6)
+        for i in range(5):
+            self.assertAlmostEqual((sent_times[i + 1] - sent_times[i]) / 1e9, Probes.SYN_INTERVAL, delta=0.05)
+        sent_ns, received_ns = responses["ECN"][2]
+        self.assertGreaterEqual(received_ns, sent_ns)
+        self.assertIsNone(responses["T2"][2][1])
+        # The two dropped probes time out together while the SYN probes go out, not one after another
+        self.assertLess(elapsed, 1.2)
+        self.assertIsNone(probes.packet_socket)
+
 
 if __name__ == "__main__":
     pytest.main()
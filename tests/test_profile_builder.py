@@ -0,0 +1,85 @@
+import random
+import pytest
+import unittest
+from scapy.layers.inet import IP, IPerror
+
+from os_hound.profile_builder import ProfileBuilder, PROFILE_TESTS, SHARED_VALUES, RESPONSE_INPUTS, FIELDS
+from os_hound.test_methods import TestMethods
+from tests.helpers import host_responses
+
+
+class CountingMethods(TestMethods):
+    """TestMethods counting the calls of the shared values."""
+    def __init__(self):
+        super().__init__()
+        self.calls = {"hop_count": 0, "tcp_isn_gcd": 0}
+
+    def hop_count(self, u1_response):
+        self.calls["hop_count"] += 1
+        return super().hop_count(u1_response)
+
+    def tcp_isn_gcd(self, responses):
+        self.calls["tcp_isn_gcd"] += 1
+        return super().tcp_isn_gcd(responses)
+
+
+class TestProfileBuilder(unittest.TestCase):
+    def setUp(self):
+        self.responses = host_responses(random.Random(0))
+        self.responses["T2"][0] = None
+        self.builder = ProfileBuilder(self.responses)
+
+    def test_registry(self):
+        names = set(PROFILE_TESTS) | set(SHARED_VALUES) | set(RESPONSE_INPUTS)
+        for test in list(PROFILE_TESTS.values()) + list(SHARED_VALUES.values()):
+            assert set(test.inputs) <= names and set(test.required) <= names
+        assert {field for field, key in PROFILE_TESTS} == set(FIELDS)
+
+    def test_profile(self):
+        profile = self.builder.build_profile()
+
+        assert list(profile) == list(FIELDS)
+        # Only the R and Q tests are kept for a probe without a response
+        assert profile["T2"] == {"R": "N", "Q": ""}
+        assert all(("T2", key) in self.builder.skipped for key in ["DF", "T", "TG", "W", "S", "A", "F", "RD"])
+        assert profile["T1"]["R"] == "Y" and profile["T1"]["F"] == "AS"
+        assert list(profile["OPS"]) == ["O1", "O2", "O3", "O4", "O5", "O6"]
+        hop_count = self.responses["U1"][0][IP].ttl - self.responses["U1"][0][IPerror].ttl
+        assert profile["ECN"]["T"] == profile["IE"]["T"] == 64 + hop_count
+
+    def test_shared_values_once(self):
+        self.builder.methods = CountingMethods()
+        self.builder.build_profile()
+
+        assert self.builder.methods.calls == {"hop_count": 1, "tcp_isn_gcd": 1}
+        # Each test and shared value computed is timed once
+        assert ("SEQ", "GCD") in self.builder.timings and "isn_gcd" in self.builder.timings
+        assert ("T2", "DF") not in self.builder.timings
+
+    def test_select(self):
+        profile = self.builder.build_profile(["T3", ("SEQ", "SS"), ("U1", "R")])
+
+        assert set(profile) == {"SEQ", "T3", "U1"}
+        assert profile["T3"] == ProfileBuilder(self.responses).build_profile()["T3"]
+        # The TI and II tests SS depends on are computed but not in the profile
+        assert set(profile["SEQ"]) <= {"SS"} and ("SEQ", "TI") in self.builder.timings
+        assert list(profile["U1"]) == ["R"]
+        with pytest.raises(ValueError):
+            self.builder.build_profile(["T8"])
+
+    def test_missing_responses(self):
+        self.responses["SYN"][0][2] = None
+        self.responses["IE"][0][1] = None
+        profile = ProfileBuilder(self.responses).build_profile()
+
+        # Without all the SYN responses there are no O and W tests
+        assert profile["OPS"] == {} and profile["WIN"] == {}
+        assert "DFI" not in profile["IE"] and "CD" not in profile["IE"] and profile["IE"]["R"] == "N"
+        # Without any SYN response the SEQ tests are skipped
+        self.responses["SYN"] = [[], [], []]
+        profile = ProfileBuilder(self.responses).build_profile()
+        assert "ISR" not in profile["SEQ"] and "T1" in profile and profile["T1"]["R"] == "N"
+
+
+if __name__ == '__main__':
+    pytest.main()
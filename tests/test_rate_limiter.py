@@ -0,0 +1,59 @@
+import time
+import pytest
+import unittest
+from unittest.mock import patch
+
+from os_hound.rate_limiter import RateLimiter
+from os_hound.probes import Probes
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            RateLimiter(0)
+        with pytest.raises(ValueError):
+            RateLimiter(10, 0)
+
+    def test_burst_is_not_delayed(self):
+        limiter = RateLimiter(10, burst=5)
+
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+
+        assert time.monotonic() - start < 0.05
+        assert limiter.packets_sent == 5
+
+    def test_rate_ceiling(self):
+        limiter = RateLimiter(100, burst=1)
+
+        start = time.monotonic()
+        for _ in range(11):
+            limiter.acquire()
+        elapsed = time.monotonic() - start
+
+        assert elapsed >= 0.09
+        assert limiter.achieved_pps() == pytest.approx(100, rel=0.1)
+
+    def test_unlimited(self):
+        limiter = RateLimiter()
+
+        limiter.acquire()
+        assert limiter.achieved_pps() is None
+        limiter.acquire()
+        assert limiter.packets_sent == 2
+
+    @patch('os_hound.probes.sr1')
+    def test_shared_with_probes(self, mock_sr1):
+        mock_sr1.return_value = None
+        limiter = RateLimiter()
+
+        probes = Probes("192.168.0.1", [22, 80], rate_limiter=limiter)
+        probes.tcp_ecn_probe()
+        probes.icmp_echo_probe()
+
+        assert limiter.packets_sent == 3
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,115 @@
+import random
+import pytest
+import unittest
+from scapy.layers.inet import IP, TCP, ICMP, IPerror, UDPerror, UDP
+from scapy.layers.l2 import CookedLinux, Dot1Q, Ether
+from scapy.layers.vxlan import VXLAN
+
+from os_hound.raw_packet import RawPacketParser
+from os_hound.response_record import ResponseRecord
+from tests.helpers import random_packet
+
+
+def record_fields(record: ResponseRecord):
+    """The values of all the fields of all the layers of a record."""
+    return {layer_type: {name: bytes(fields) if name == "layer" else getattr(fields, name) for name in fields.names}
+            for layer_type, fields in record.layers.items()}
+
+
+def scapy_fields(data: bytes, received: float):
+    """The fields of the record of the packet dissected by scapy, None if scapy can not dissect it."""
+    try:
+        packet = IP(data)
+    except Exception:
+        return None
+    packet.time = received
+    return record_fields(ResponseRecord(packet))
+
+
+class FakeRawSocket:
+    """Fake scapy socket returning frames of a link layer."""
+    def __init__(self, link_type, frames):
+        self.link_type = link_type
+        self.frames = list(frames)
+
+    def recv_raw(self):
+        return self.link_type, self.frames.pop(0), 1.5
+
+
+class TestRawPacketParser(unittest.TestCase):
+    def setUp(self):
+        self.parser = RawPacketParser()
+
+    def test_same_fields_as_scapy(self):
+        rng = random.Random(0)
+        parsed = 0
+        for _ in range(3000):
+            data = random_packet(rng)
+            record = self.parser.parse(data, 1.0)
+            expected = scapy_fields(data, 1.0)
+            if record is not None and expected is not None:
+                assert record_fields(record) == expected, data.hex()
+                assert record.time == 1.0
+                parsed += 1
+        # Most packets are parsed, the others are left to scapy
+        assert parsed > 2000
+
+    def test_decode_same_as_scapy(self):
+        rng = random.Random(1)
+        for _ in range(500):
+            data = random_packet(rng)
+            record = self.parser.decode(memoryview(data), 1.0)
+            expected = scapy_fields(data, 1.0)
+            assert (record and record_fields(record)) == expected
+
+    def test_fields(self):
+        data = bytes(IP(src="192.0.2.10", dst="192.0.2.1", ttl=50, flags="DF", id=7) /
+                     TCP(sport=80, dport=40000, seq=5, ack=6, flags="SA", window=100,
+                         options=[("MSS", 1460), ("NOP", None), ("WScale", 7), ("Timestamp", (1, 2))])) + bytes(6)
+        record = self.parser.parse(data, 2.0)
+
+        assert (record[IP].src, record[IP].dst, record[IP].proto, record[IP].ttl) == ("192.0.2.10", "192.0.2.1", 6, 50)
+        assert (record[IP].flags, record[IP].id, record[IP].len) == (2, 7, 60)
+        assert (record[TCP].sport, record[TCP].dport, record[TCP].seq, record[TCP].ack) == (80, 40000, 5, 6)
+        assert record[TCP].flags == 0x12
+        # The options are padded with an end of options
+        assert record[TCP].options == [("MSS", 1460), ("NOP", None), ("WScale", 7), ("Timestamp", (1, 2)),
+                                       ("EOL", None)]
+        # The Ethernet padding is part of the payload, like with scapy
+        assert record[TCP].payload == bytes(6)
+        assert not record.haslayer(ICMP)
+
+    def test_quoted_headers(self):
+        udp = IP(src="192.0.2.1", dst="192.0.2.10", id=0x1042) / UDP(sport=40000, dport=113) / (b"C" * 40)
+        data = bytes(IP(src="192.0.2.10") / ICMP(type=3, code=3) / bytes(udp))
+        record = self.parser.parse(data)
+
+        assert record[ICMP].type == 3 and record[ICMP].id is None
+        assert bytes(record[ICMP]) == data[20:]
+        assert record[IPerror].id == 0x1042 and record[IPerror].len == 68
+        assert (record[UDPerror].sport, record[UDPerror].dport, record[UDPerror].payload) == (40000, 113, b"C" * 40)
+
+    def test_left_to_scapy(self):
+        # IP in IP, a VXLAN tunnel, and an ICMP error with an extension
+        inner = IP(src="10.0.0.1") / TCP(sport=80)
+        for packet in [IP(src="192.0.2.10") / inner, IP(src="192.0.2.10") / UDP(dport=4789) / VXLAN() / Ether() / inner,
+                       IP(src="192.0.2.10") / ICMP(type=3, code=3) / (b"E" + bytes(300))]:
+            data = bytes(packet)
+            assert self.parser.parse(data) is None
+            assert record_fields(self.parser.decode(data, 1.0)) == scapy_fields(data, 1.0)
+
+    def test_receive(self):
+        packet = IP(src="192.0.2.10") / TCP(sport=22, flags="RA")
+        sock = FakeRawSocket(Ether, [bytes(Ether() / packet), bytes(Ether() / Dot1Q(vlan=5) / packet),
+                                     bytes(Ether(type=0x86DD) / bytes(40))])
+
+        assert [self.parser.receive(sock)[TCP].sport for _ in range(2)] == [22, 22]
+        cooked = FakeRawSocket(CookedLinux, [bytes(CookedLinux(proto=0x0800) / packet)])
+        assert self.parser.receive(cooked)[TCP].flags == 0x14
+        # Not an IPv4 packet
+        assert self.parser.receive(sock) is None
+        assert self.parser.receive(FakeRawSocket(IP, [bytes(packet)])).time == 1.5
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,98 @@
+import random
+import pytest
+import unittest
+from scapy.layers.inet import IP, TCP, ICMP, IPerror, UDPerror, UDP
+from scapy.packet import Raw
+
+from os_hound.profile_builder import ProfileBuilder
+from os_hound.response_record import ResponseRecord
+from os_hound.test_methods import TestMethods
+from tests.helpers import TARGET, received, host_responses
+
+
+def result_or_error(function, *args):
+    try:
+        return function(*args)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+
+
+class TestResponseRecord(unittest.TestCase):
+    def test_fields(self):
+        packet = received(IP(src=TARGET, ttl=50, flags="DF", id=7) /
+                          TCP(seq=5, ack=6, flags="RA", window=100, urgptr=3, options=[("MSS", 1460)]) / Raw(b"data"),
+                          random.Random(1))
+        record = ResponseRecord(packet)
+
+        assert record.haslayer(IP) and record.haslayer(TCP) and not record.haslayer(ICMP)
+        assert (record[IP].ttl, record[IP].flags, record[IP].id, record[IP].len) == (50, 2, 7, packet[IP].len)
+        assert record[IP].chksum == packet[IP].chksum
+        assert (record[TCP].seq, record[TCP].ack, record[TCP].window, record[TCP].urgptr) == (5, 6, 100, 3)
+        assert record[TCP].flags == 0x14
+        assert record[TCP].options == [("MSS", 1460)]
+        assert record[TCP].payload == b"data"
+        assert record.time == packet.time
+        with pytest.raises(IndexError):
+            record[ICMP]
+
+    def test_quoted_layers(self):
+        u1 = IP(dst=TARGET, id=0x1042) / UDP(sport=40030, dport=113) / Raw(b"C" * 300)
+        packet = received(IP(src=TARGET, ttl=50) / ICMP(type=3, code=3) / bytes(u1), random.Random(2))
+        record = ResponseRecord(packet)
+
+        assert not record.haslayer(UDP)
+        assert record[IP].ttl == 50 and record[IPerror].id == 0x1042
+        assert record[UDPerror].chksum == packet[UDPerror].chksum
+        assert record[UDPerror].payload == bytes(packet[UDPerror].payload)
+        assert bytes(record[ICMP]) == bytes(packet[ICMP])
+
+    def test_decode(self):
+        responses = host_responses(random.Random(3))
+        decoded = ResponseRecord.decode(responses)
+
+        assert set(decoded) == set(responses)
+        assert isinstance(decoded["SYN"][0][0], ResponseRecord)
+        assert isinstance(decoded["SYN"][1][0], ResponseRecord)
+        assert decoded["SYN"][2] == responses["SYN"][2]
+        assert decoded["ECN"][2] == (0, 1000)
+        assert ResponseRecord.decode(None) is None
+
+    def test_methods_same_on_records(self):
+        rng = random.Random(4)
+        methods = TestMethods()
+        single = [methods.check_dont_fragment_bit, methods.ttl_guess_test, methods.congestion_control_test,
+                  methods.check_tcp_quirks, methods.extract_tcp_flags, methods.get_rst_data_checksum,
+                  methods.get_ip_total_length, methods.check_icmp_unused_field, methods.check_returned_ip_length,
+                  methods.check_returned_ip_id, methods.check_returned_ip_checksum,
+                  methods.check_returned_udp_data_integrity, methods.extract_tcp_options,
+                  methods.extract_tcp_window_size]
+        for _ in range(20):
+            responses = host_responses(rng)
+            decoded = ResponseRecord.decode(responses)
+            for probe_type in ["ECN", "T2", "T3", "T4", "T5", "T6", "T7", "U1"]:
+                for method in single:
+                    assert result_or_error(method, decoded[probe_type][0]) == \
+                           result_or_error(method, responses[probe_type][0])
+                for method in [methods.sequence_test, methods.ack_test]:
+                    assert result_or_error(method, *decoded[probe_type][:2]) == \
+                           result_or_error(method, *responses[probe_type][:2])
+            assert result_or_error(methods.check_returned_udp_checksum, *decoded["U1"][:2]) == \
+                   result_or_error(methods.check_returned_udp_checksum, *responses["U1"][:2])
+            for method in [methods.extract_tcp_options, methods.extract_tcp_window_size, methods.calculate_ts]:
+                assert result_or_error(method, decoded["SYN"][0]) == result_or_error(method, responses["SYN"][0])
+            for method in [methods.dfi_test_value, methods.icmp_response_code]:
+                assert result_or_error(method, decoded["IE"][0]) == result_or_error(method, responses["IE"][0])
+
+    def test_same_profile_as_packets(self):
+        rng = random.Random(5)
+        for _ in range(20):
+            responses = host_responses(rng)
+            builder = ProfileBuilder(responses)
+            packets_builder = ProfileBuilder(responses)
+            packets_builder.responses = responses
+
+            assert result_or_error(builder.build_profile) == result_or_error(packets_builder.build_profile)
+
+
+if __name__ == '__main__':
+    pytest.main()
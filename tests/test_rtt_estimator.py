@@ -0,0 +1,62 @@
+import pytest
+import unittest
+from unittest.mock import patch
+
+from os_hound.rtt_estimator import RttEstimator
+from os_hound.port_scanner import PortScanner
+
+
+class TestRttEstimator(unittest.TestCase):
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            RttEstimator(min_timeout=2, max_timeout=1)
+
+    def test_initial_timeout(self):
+        assert RttEstimator(initial_timeout=1).timeout() == 1
+
+    def test_seeded_from_first_sample(self):
+        estimator = RttEstimator(min_timeout=0.001, max_timeout=10)
+
+        estimator.update(0.2)
+
+        assert estimator.srtt == 0.2
+        assert estimator.rttvar == 0.1
+        assert estimator.timeout() == pytest.approx(0.6)
+
+    def test_smoothing(self):
+        estimator = RttEstimator(min_timeout=0.001, max_timeout=10)
+
+        estimator.update(0.2)
+        estimator.update(0.4)
+
+        assert estimator.srtt == pytest.approx(0.225)
+        assert estimator.rttvar == pytest.approx(0.125)
+
+    def test_floor_and_ceiling(self):
+        estimator = RttEstimator(min_timeout=0.05, max_timeout=0.5)
+
+        estimator.update(0.0003)
+        assert estimator.timeout() == 0.05
+        assert estimator.timeout(attempt=20) == 0.5
+
+    def test_backoff(self):
+        estimator = RttEstimator(min_timeout=0.01, max_timeout=10)
+
+        estimator.update(0.1)
+
+        assert estimator.timeout(1) == pytest.approx(2 * estimator.timeout())
+
+    @patch('os_hound.port_scanner.sr1')
+    def test_drives_port_scanner_timeouts(self, mock_sr1):
+        mock_sr1.return_value = None
+        estimator = RttEstimator(min_timeout=0.1, max_timeout=10)
+        estimator.update(0.1)
+
+        PortScanner(rtt_estimator=estimator, retries=2).syn_scan("192.168.1.1", ports_list=[80])
+
+        timeouts = [call.kwargs["timeout"] for call in mock_sr1.call_args_list]
+        assert timeouts == pytest.approx([0.3, 0.6, 1.2])
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,44 @@
+import threading
+import pytest
+import unittest
+from unittest.mock import MagicMock
+
+from os_hound.scan_pipeline import ScanPipeline
+
+
+class TestScanPipeline(unittest.TestCase):
+    def test_ready_before_scan_finishes(self):
+        release = threading.Event()
+
+        def iter_syn_scan(target_ip, start_port, end_port, ports_list):
+            yield 21, 'filtered'
+            yield 22, 'open'
+            yield 23, 'closed'
+            # The rest of the ports are only scanned once the probes started
+            release.wait()
+            yield 80, 'open'
+
+        scanner = MagicMock()
+        scanner.iter_syn_scan = iter_syn_scan
+
+        pipeline = ScanPipeline(scanner, "192.168.1.1", ports_list=[21, 22, 23, 80]).start()
+
+        assert pipeline.wait_ready(timeout=5)
+        assert pipeline.open_ports == [22]
+        assert pipeline.closed_ports == [23]
+
+        release.set()
+        assert pipeline.join() == [22, 80]
+
+    def test_ready_when_no_open_ports(self):
+        scanner = MagicMock()
+        scanner.iter_syn_scan.return_value = iter([(21, 'closed'), (22, 'filtered')])
+
+        pipeline = ScanPipeline(scanner, "192.168.1.1", start_port=21, end_port=22).start()
+
+        assert not pipeline.wait_ready(timeout=5)
+        assert pipeline.join() == []
+
+
+if __name__ == '__main__':
+    pytest.main()
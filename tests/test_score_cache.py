@@ -0,0 +1,141 @@
+import os
+import random
+import shutil
+import tempfile
+import pytest
+import unittest
+from os_hound.db_parser import DbParser
+from os_hound.score_cache import ScoreCache, profile_hash
+from os_hound.scoring import Scoring
+from tests.helpers import random_db, random_profile, reference_or_error
+
+
+class TestScoreCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.os_dicts = [{"T1": {"R": "Y", "T": "3B-45"}, "os_title": "first"},
+                         {"T1": {"R": "N", "T": "3B-45"}, "os_title": "second"},
+                         {"T1": {"R": "Y|N", "T": "40"}, "os_title": "third"}]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_profile_hash(self):
+        profile = {"T1": {"R": "Y", "T": 0x40}, "IE": {"R": "Y"}}
+
+        assert profile_hash(profile) == profile_hash({"IE": {"R": "Y"}, "T1": {"R": "Y", "T": 0x40}})
+        # Values never scored and unknown fields do not change the hash
+        assert profile_hash(profile) == profile_hash(dict(profile, IE={"R": "Y", "CD": None}, XX={"A": "B"}))
+        assert profile_hash(profile) != profile_hash({"T1": {"R": "Y", "T": 0x41}, "IE": {"R": "Y"}})
+        assert profile_hash(profile) != profile_hash({"T1": {"R": "Y", "T": "40"}, "IE": {"R": "Y"}})
+        # An unconventional value ends the rest of the field, the order of the keys of a field changes the score
+        assert profile_hash(profile) != profile_hash({"T1": {"T": 0x40, "R": "Y"}, "IE": {"R": "Y"}})
+        scoring = Scoring()
+        scoring.scoring_dict["T1"]["R"] = 50
+        assert profile_hash(profile) != profile_hash(profile, scoring)
+
+    def test_hits_and_misses(self):
+        scoring = Scoring()
+        cache = ScoreCache("v1")
+        profile = {"T1": {"R": "Y", "T": 0x40}}
+
+        assert cache.score(scoring, profile, self.os_dicts) == [(self.os_dicts[0], 115), (self.os_dicts[2], 115)]
+        assert cache.score(scoring, {"T1": {"R": "Y", "T": 0x40}}, self.os_dicts) == \
+               [(self.os_dicts[0], 115), (self.os_dicts[2], 115)]
+        assert [match.os_dict for match in cache.top_k(scoring, profile, self.os_dicts, k=1)] == [self.os_dicts[0]]
+        assert [match.os_dict for match in cache.top_k(scoring, profile, self.os_dicts, k=2)] == \
+               [self.os_dicts[0], self.os_dicts[2]]
+        assert (cache.hits, cache.misses) == (1, 3)
+
+    def test_least_recently_used_dropped(self):
+        scoring = Scoring()
+        cache = ScoreCache("v1", maxsize=2)
+        profiles = [{"T1": {"R": value}} for value in ["Y", "N", "S"]]
+
+        cache.score(scoring, profiles[0], self.os_dicts)
+        cache.score(scoring, profiles[1], self.os_dicts)
+        cache.score(scoring, profiles[0], self.os_dicts)
+        cache.score(scoring, profiles[2], self.os_dicts)
+        assert (cache.hits, cache.misses) == (1, 3)
+        cache.score(scoring, profiles[0], self.os_dicts)
+        cache.score(scoring, profiles[1], self.os_dicts)
+        assert (cache.hits, cache.misses) == (2, 4)
+
+    def test_saved_between_runs(self):
+        scoring = Scoring()
+        path = os.path.join(self.temp_dir, "cache", "scores.pickle")
+        cache = ScoreCache("v1", path=path)
+        compiled = DbParser().compile_db(self.os_dicts)
+        expected = cache.score(scoring, {"T1": {"R": "N"}}, compiled)
+        cache.save()
+
+        loaded = ScoreCache("v1", path=path)
+        assert loaded.score(scoring, {"T1": {"R": "N"}}, compiled) == expected
+        assert (loaded.hits, loaded.misses) == (1, 0)
+        # The results of another version of the database are not loaded
+        other = ScoreCache("v2", path=path)
+        other.score(scoring, {"T1": {"R": "N"}}, compiled)
+        assert (other.hits, other.misses) == (0, 1)
+
+    def test_corrupt_file(self):
+        path = os.path.join(self.temp_dir, "scores.pickle")
+        with open(path, "wb") as cache_file:
+            cache_file.write(b"not a pickle")
+
+        assert ScoreCache("v1", path=path).entries == {}
+
+    def test_damaged_file(self):
+        scoring = Scoring()
+        path = os.path.join(self.temp_dir, "scores.pickle")
+        cache = ScoreCache("v1", path=path)
+        profiles = [{"T1": {"R": value}} for value in ["Y", "N", "S"]]
+        top_k = lambda scores, profile: [(match.os_dict, match.score, match.possible)
+                                         for match in scores.top_k(scoring, profile, self.os_dicts, k=2)]
+        expected = [cache.score(scoring, profile, self.os_dicts) for profile in profiles] + \
+                   [top_k(cache, profile) for profile in profiles]
+        cache.save()
+        with open(path, "rb") as cache_file:
+            valid = cache_file.read()
+
+        rng = random.Random(17)
+        for _ in range(300):
+            damaged = bytearray(valid)
+            for _ in range(rng.randint(1, 4)):
+                damaged[rng.randrange(len(damaged))] = rng.randrange(256)
+            with open(path, "wb") as cache_file:
+                cache_file.write(damaged)
+
+            loaded = ScoreCache("v1", path=path)
+            # A damaged file loads nothing, or results of the database: the corrupted bytes may be in a score
+            for profile in profiles:
+                assert all(os_dict in self.os_dicts for os_dict, score in loaded.score(scoring, profile, self.os_dicts))
+                assert all(match.os_dict in self.os_dicts for match in loaded.top_k(scoring, profile, self.os_dicts, k=2))
+        # The valid file still loads every result
+        with open(path, "wb") as cache_file:
+            cache_file.write(valid)
+        loaded = ScoreCache("v1", path=path)
+        assert [loaded.score(scoring, profile, self.os_dicts) for profile in profiles] + \
+               [top_k(loaded, profile) for profile in profiles] == expected
+        assert loaded.misses == 0
+
+    def test_same_results_as_scoring(self):
+        rng = random.Random(13)
+        scoring = Scoring()
+        for _ in range(20):
+            compiled = DbParser().compile_db(random_db(rng, scoring, 20))
+            cache = ScoreCache(str(rng.random()), maxsize=4)
+            profiles = [random_profile(rng, scoring) for _ in range(3)]
+            for profile in profiles * 3:
+                assert reference_or_error(cache.score, scoring, profile, compiled) == \
+                       reference_or_error(scoring.score, profile, compiled)
+                top = reference_or_error(cache.top_k, scoring, profile, compiled, 3)
+                expected = reference_or_error(scoring.top_k, profile, compiled, 3)
+                if isinstance(expected, str):
+                    assert top == expected
+                else:
+                    assert [(match.os_dict, match.score, match.possible) for match in top] == \
+                           [(match.os_dict, match.score, match.possible) for match in expected]
+
+
+if __name__ == '__main__':
+    pytest.main()
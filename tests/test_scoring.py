@@ -1,6 +1,9 @@
+import random
 import pytest
 import unittest
+from os_hound.db_parser import DbParser
 from os_hound.scoring import Scoring
+from tests.helpers import random_db, random_profile, twin_fingerprint
 
 
 class TestScoring(unittest.TestCase):
@@ -86,6 +89,120 @@ class TestScoring(unittest.TestCase):
         # Assert
         assert (result[0][0]['os_title'], 'Fingerprint Microsoft Windows 11 21H2')
 
+    def test_score_many(self):
+        os_dicts = [{"T1": {"R": "Y", "T": "3B-45"}, "T2": {"R": "N"}, "os_title": "first"},
+                    {"T1": {"R": "N", "T": "3B-45"}, "T2": {"R": "N"}, "os_title": "second"},
+                    {"T1": {"R": "Y|N", "T": "40"}, "os_title": "third"}]
+        profiles = [{"T1": {"R": "Y", "T": 0x40}}, {"T1": {"R": "N", "T": 0x3B}, "T2": {"R": "N"}},
+                    {"T1": {"R": "Y", "T": 0x40}}]
+
+        results = Scoring().score_many(profiles, os_dicts)
+
+        assert results == [[(os_dicts[0], 115), (os_dicts[2], 115)], [(os_dicts[1], 195)],
+                           [(os_dicts[0], 115), (os_dicts[2], 115)]]
+        assert results[0] is not results[2]
+
+    def test_score_many_raises_like_score(self):
+        os_dicts = [{"T1": {"T": "40"}, "os_title": "first"}, {"T1": {"T": "K"}, "os_title": "second"}]
+
+        with pytest.raises(ValueError, match="'K'"):
+            Scoring().score_many([{"T1": {"T": 0x40}}, {"T1": {"T": 1}}], os_dicts)
+
+    def test_top_k_confidence(self):
+        os_dicts = [{"T1": {"R": "Y", "T": "3B-45", "DF": "N"}, "os_title": "first"},
+                    {"T1": {"R": "Y"}, "os_title": "second"},
+                    {"T1": {"R": "N", "T": "40"}, "os_title": "third"},
+                    {"T1": {"R": "Y", "T": "U", "DF": "Y"}, "os_title": "fourth"}]
+        profile = {"T1": {"R": "Y", "T": 0x40, "DF": "Y"}}
+
+        results = Scoring().top_k(profile, os_dicts, k=3)
+
+        # The fourth OS stops at T, only R could be compared
+        assert [(match.os_dict["os_title"], match.score, match.possible) for match in results] == \
+               [("second", 100, 100), ("fourth", 100, 100), ("first", 115, 135)]
+        assert results[2].confidence == pytest.approx(100 * 115 / 135)
+
+    def test_top_k_same_as_sorting_all(self):
+        rng = random.Random(6)
+        scoring = Scoring()
+        checked = 0
+        for _ in range(100):
+            os_dicts = DbParser().compile_db(random_db(rng, scoring, 30))
+            profile = random_profile(rng, scoring)
+            try:
+                everything = scoring.top_k(profile, os_dicts, k=len(os_dicts))
+            except ValueError:
+                continue
+            top = scoring.top_k(profile, os_dicts, k=5)
+
+            assert [(match.os_dict, match.score) for match in top] == \
+                   [(match.os_dict, match.score) for match in everything[:5]]
+            assert all(0 <= match.confidence <= 100 for match in everything)
+            checked += 1
+        assert checked
+
+    def test_pruning_counted(self):
+        rng = random.Random(7)
+        scoring = Scoring()
+        pruned = 0
+        for _ in range(30):
+            profile = random_profile(rng, scoring)
+            os_dicts = random_db(rng, scoring, 30)
+            # A fingerprint with the values of the profile, the others can then be abandoned early
+            os_dicts.insert(rng.randint(0, len(os_dicts)), twin_fingerprint(profile))
+            compiled = DbParser().compile_db(os_dicts)
+            score_stats, top_k_stats = scoring.new_stats(), scoring.new_stats()
+            try:
+                scoring.score(profile, compiled, stats=score_stats)
+                scoring.top_k(profile, compiled, k=3, stats=top_k_stats)
+            except ValueError:
+                continue
+
+            pruned += score_stats["pruned_fingerprints"]
+            # Every fingerprint is counted, scored or abandoned
+            assert top_k_stats["fingerprints"] == len(compiled)
+        assert pruned
+
+    def test_duplicate_bodies_scored_once(self):
+        rng = random.Random(8)
+        scoring = Scoring()
+        checked = 0
+        for _ in range(20):
+            profile = random_profile(rng, scoring)
+            unique = random_db(rng, scoring, 10) + [twin_fingerprint(profile)]
+            # Every body under three titles, like the fingerprints of several versions of an OS
+            os_dicts = [dict(os_dict, os_title=f"{os_dict['os_title']} {version}") for version in range(3)
+                        for os_dict in unique]
+            compiled = DbParser().compile_db(os_dicts)
+            score_stats, top_k_stats = scoring.new_stats(), scoring.new_stats()
+            try:
+                scoring.score(profile, compiled, stats=score_stats)
+                scoring.top_k(profile, compiled, k=len(compiled), stats=top_k_stats)
+            except ValueError:
+                continue
+
+            assert score_stats["fingerprints"] <= len(unique)
+            # Each body is scored once for its three titles
+            assert top_k_stats["fingerprints"] == len(unique)
+            checked += 1
+        assert checked
+
+    def test_stats_added_to_given_dictionary(self):
+        scoring = Scoring()
+        compiled = DbParser().compile_db([{"T1": {"R": "Y"}, "os_title": "first"},
+                                          {"T1": {"R": "N"}, "os_title": "second"}])
+        stats = scoring.new_stats()
+        scoring.score({"T1": {"R": "Y"}}, compiled, stats=stats)
+        scoring.top_k({"T1": {"R": "Y"}}, compiled, stats=stats)
+        assert stats["fingerprints"] == 4
+        # Without a dictionary nothing is kept on the scoring, which can be shared by threads
+        scoring.score({"T1": {"R": "Y"}}, compiled)
+        assert not hasattr(scoring, "stats") and stats["fingerprints"] == 4
+
+    def test_top_k_empty(self):
+        assert Scoring().top_k({"T1": {"R": "Y"}}, []) == []
+        assert Scoring().top_k({"T1": {"R": "Y"}}, [{"T1": {"R": "Y"}, "os_title": "first"}], k=0) == []
+
 
 if __name__ == "__main__":
     pytest.main()
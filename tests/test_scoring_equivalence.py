@@ -0,0 +1,106 @@
+import os
+import random
+import shutil
+import tempfile
+import pytest
+import unittest
+from os_hound.db_parser import DbParser
+from os_hound.fingerprint_record import FingerprintRecord
+from os_hound.scoring import Scoring
+from os_hound.sharded_scoring import ShardedScoring
+from os_hound.shared_db import SharedDb
+from os_hound.vector_scoring import np
+from tests.helpers import random_db, random_profile, twin_fingerprint, record_dict, brute_force_ranking, \
+    reference_or_error, random_batch, expected_batch
+
+
+def plain_db(rng: random.Random, scoring: Scoring, profiles: list):
+    os_dicts = random_db(rng, scoring, 30)
+    return os_dicts, os_dicts
+
+
+def twins_db(rng: random.Random, scoring: Scoring, profiles: list):
+    """Fingerprints with the values of half the profiles, the others can be abandoned early, and tied twins."""
+    os_dicts = random_db(rng, scoring, 30)
+    for profile in profiles[:len(profiles) // 2] + profiles[:1] * 2:
+        os_dicts.insert(rng.randint(0, len(os_dicts)), twin_fingerprint(profile))
+    return os_dicts, os_dicts
+
+
+def duplicate_bodies_db(rng: random.Random, scoring: Scoring, profiles: list):
+    """Every body under three titles, like the fingerprints of several versions of an OS."""
+    unique = random_db(rng, scoring, 10) + [twin_fingerprint(profiles[0])]
+    os_dicts = [dict(os_dict, os_title=f"{os_dict['os_title']} {version}") for version in range(3)
+                for os_dict in unique]
+    return os_dicts, os_dicts
+
+
+def records_db(rng: random.Random, scoring: Scoring, profiles: list):
+    """The fingerprints as FingerprintRecord, scored like the dictionaries they are made of."""
+    os_dicts = [record_dict(os_dict) for os_dict in random_db(rng, scoring, 20)]
+    os_dicts.insert(rng.randint(0, len(os_dicts)), record_dict(twin_fingerprint(profiles[0])))
+    return os_dicts, [FingerprintRecord(os_dict) for os_dict in os_dicts]
+
+
+# Each shape makes the OS dictionaries the results are expected from, and the database the scorers are given
+DB_SHAPES = {"plain": plain_db, "twins": twins_db, "duplicate bodies": duplicate_bodies_db, "records": records_db}
+
+
+def matches_or_error(top_k, *args):
+    matches = reference_or_error(top_k, *args)
+    if isinstance(matches, str):
+        return matches
+    return [(match.os_dict, match.score, match.possible) for match in matches]
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestScoringEquivalence(unittest.TestCase):
+    """Every way to score the database against the scoring of each fingerprint, for each shape of database."""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "nmap-db.shared")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_same_results_as_brute_force(self):
+        rng = random.Random(7)
+        scoring = Scoring()
+        for shape, make_db in DB_SHAPES.items():
+            for _ in range(6):
+                profiles = [random_profile(rng, scoring) for _ in range(10)]
+                os_dicts, db = make_db(rng, scoring, profiles)
+                reference = DbParser().compile_db(os_dicts)
+                compiled = DbParser().compile_db(db)
+                index = DbParser().build_index(compiled)
+                SharedDb.write(self.path, compiled)
+                with SharedDb(self.path) as shared_db, ShardedScoring(compiled, shards=3) as sharded:
+                    scorers = {"score": lambda profile: scoring.score(profile, compiled),
+                               "index": lambda profile: scoring.score(profile, compiled, index),
+                               "shared db": shared_db.score,
+                               "sharded": sharded.score}
+                    rankers = {"top_k": lambda profile, k: scoring.top_k(profile, compiled, k),
+                               "sharded": sharded.top_k}
+                    for profile in profiles:
+                        expected = reference_or_error(brute_force_ranking, scoring, profile, reference)
+                        best, ranked = (expected, expected) if isinstance(expected, str) else expected
+                        for name, score in scorers.items():
+                            with self.subTest(shape=shape, scorer=name):
+                                assert reference_or_error(score, profile) == best
+                        for name, top_k in rankers.items():
+                            with self.subTest(shape=shape, scorer=name):
+                                assert matches_or_error(top_k, profile, 5) == (ranked if isinstance(ranked, str)
+                                                                               else ranked[:5])
+                                assert matches_or_error(top_k, profile, len(compiled)) == ranked
+
+                    batch = random_batch(rng, scoring, 20)
+                    expected = expected_batch(scoring.score, batch, reference)
+                    for name, score_many in {"score_many": lambda profiles: scoring.score_many(profiles, compiled),
+                                             "shared db": shared_db.score_many,
+                                             "sharded": sharded.score_many}.items():
+                        with self.subTest(shape=shape, scorer=f"{name} batch"):
+                            assert reference_or_error(score_many, batch) == expected
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,34 @@
+import pytest
+import unittest
+from os_hound.sharded_scoring import ShardedScoring
+
+
+class TestShardedScoring(unittest.TestCase):
+    def test_more_shards_than_fingerprints(self):
+        os_dicts = [{"T1": {"R": "Y"}, "os_title": "first"}, {"T1": {"R": "Y|N"}, "os_title": "second"}]
+
+        with ShardedScoring(os_dicts, shards=4) as sharded:
+            assert len(sharded.executors) == 2
+            assert sharded.score({"T1": {"R": "Y"}}) == [(os_dicts[0], 100), (os_dicts[1], 100)]
+            assert [match.os_dict for match in sharded.top_k({"T1": {"R": "N"}}, k=1)] == [os_dicts[1]]
+            assert sharded.top_k({"T1": {"R": "N"}}, k=0) == []
+
+    def test_empty_db(self):
+        with ShardedScoring([], shards=2) as sharded:
+            assert sharded.score({"T1": {"R": "Y"}}) == []
+            assert sharded.score_many([{"T1": {"R": "Y"}}]) == [[]]
+            assert sharded.top_k({"T1": {"R": "Y"}}) == []
+
+    def test_raises_first_error(self):
+        os_dicts = [{"T1": {"R": "Y"}, "os_title": "first"}, {"T1": {"R": "Y", "T": "K"}, "os_title": "second"},
+                    {"T1": {"R": "Y", "T": "J"}, "os_title": "third"}]
+
+        with ShardedScoring(os_dicts, shards=3) as sharded:
+            with pytest.raises(ValueError, match="'K'"):
+                sharded.score({"T1": {"R": "Y", "T": 0x40}})
+            with pytest.raises(ValueError, match="'K'"):
+                sharded.score_many([{"T1": {"R": "Y"}}, {"T1": {"R": "Y", "T": 0x40}}])
+
+
+if __name__ == '__main__':
+    pytest.main()
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import pytest
+import unittest
+from os_hound.shared_db import SharedDb
+from os_hound.vector_scoring import np
+
+
+def attach_and_score(path: str, profile: dict):
+    return SharedDb(path).score(profile)
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestSharedDb(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "nmap-db.shared")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_only_columns_and_lazy_records(self):
+        os_dicts = [{"T1": {"R": "Y", "T": "3B-45"}, "os_title": "first"},
+                    {"T1": {"R": "N", "T": "3B-45"}, "os_title": "second"},
+                    {"T1": {"R": "Y|N", "T": "40"}, "os_title": "third"}]
+        SharedDb.write(self.path, os_dicts)
+        shared_db = SharedDb(self.path)
+
+        assert not shared_db.vector_scoring.columns["T1", "R"].codes.flags.writeable
+        assert shared_db.score({"T1": {"R": "Y", "T": 0x40}}) == [(os_dicts[0], 115), (os_dicts[2], 115)]
+        # Only the best matches were unpickled
+        assert sorted(shared_db.os_dicts.decoded) == [0, 2]
+        assert list(shared_db.os_dicts) == os_dicts
+        assert shared_db.os_dicts[-1] is shared_db.os_dicts[2]
+
+    def test_decoded_records_bounded(self):
+        os_dicts = [{"T1": {"R": "Y"}, "os_title": str(position)} for position in range(5)]
+        SharedDb.write(self.path, os_dicts)
+        shared_db = SharedDb(self.path, maxsize=2)
+
+        assert list(shared_db.os_dicts) == os_dicts
+        assert list(shared_db.os_dicts.decoded) == [3, 4]
+        shared_db.os_dicts[3]
+        shared_db.os_dicts[0]
+        # The least recently read one is dropped
+        assert list(shared_db.os_dicts.decoded) == [3, 0]
+        with SharedDb(self.path, maxsize=0) as uncached:
+            assert uncached.score({"T1": {"R": "Y"}}) == [(os_dict, 100) for os_dict in os_dicts]
+            assert not uncached.os_dicts.decoded
+
+    def test_close(self):
+        os_dicts = [{"T1": {"R": "Y"}, "os_title": "first"}, {"T1": {"R": "N"}, "os_title": "second"}]
+        SharedDb.write(self.path, os_dicts)
+
+        with SharedDb(self.path) as shared_db:
+            matches = shared_db.score({"T1": {"R": "Y"}})
+        assert shared_db.mmap.closed
+        assert matches == [(os_dicts[0], 100)]
+        with pytest.raises(ValueError, match="closed"):
+            shared_db.score({"T1": {"R": "Y"}})
+        # Closing again does nothing
+        shared_db.close()
+
+    def test_empty_db(self):
+        SharedDb.write(self.path, [])
+
+        assert SharedDb(self.path).score({"T1": {"R": "Y"}}) == []
+
+    def test_not_a_shared_db(self):
+        with open(self.path, "wb") as shared_file:
+            shared_file.write(b"not a shared database")
+
+        with pytest.raises(ValueError, match="not a shared fingerprint database"):
+            SharedDb(self.path)
+
+    def test_workers_attach(self):
+        os_dicts = [{"T1": {"R": "Y"}, "os_title": "first"}, {"T1": {"R": "N"}, "os_title": "second"}]
+        SharedDb.write(self.path, os_dicts)
+
+        with multiprocessing.get_context("spawn").Pool(2) as pool:
+            results = pool.starmap(attach_and_score, [(self.path, {"T1": {"R": "Y"}}), (self.path, {"T1": {"R": "N"}})])
+
+        assert results == [[(os_dicts[0], 100)], [(os_dicts[1], 100)]]
+
+
+if __name__ == '__main__':
+    pytest.main()
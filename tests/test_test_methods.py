@@ -60,6 +60,29 @@ class TestTestMethods(unittest.TestCase):
         assert isr == 158
         assert seq_rates == [416666.6666666666, 833333.3333333333, 1250000.0]
 
+    def test_tcp_isn_isr_with_intervals(self):
+        # Arrange
+        diff = [1000, 3000]
+        intervals = [0.1, 0.1]
+
+        # Act
+        isr, seq_rates = self.instance.tcp_isn_isr(diff, intervals)
+
+        # Assert
+        assert seq_rates == [10000, 30000]
+        assert isr == 115
+
+    def test_send_intervals_skips_non_tcp_responses(self):
+        # Arrange
+        responses = [IP()/TCP(seq=100), IP()/ICMP(), IP()/TCP(seq=500), IP()/TCP(seq=900)]
+        sent_times = [1.0, 1.1, 1.25, 1.3]
+
+        # Act
+        intervals = self.instance.send_intervals(responses, sent_times)
+
+        # Assert
+        assert intervals == pytest.approx([0.25, 0.05])
+
     def test_tcp_isn_isr_empty_diff(self):
         # Arrange
         diff = []
@@ -317,6 +340,23 @@ class TestTestMethods(unittest.TestCase):
         # Assert
         assert result == 1
 
+    def test_calculate_ts_with_sent_times(self):
+        # Arrange
+        response1 = IP() / TCP()
+        response2 = IP() / TCP()
+        # The receive times are ignored when the send times are known
+        response1.time = 1
+        response2.time = 1.5
+        response1[TCP].options = [('Timestamp', (1, 0))]
+        response2[TCP].options = [('Timestamp', (11, 0))]
+        responses = [response1, response2]
+
+        # Act
+        result = self.instance.calculate_ts(responses, [10.0, 10.1])
+
+        # Assert
+        assert result == 7
+
     def test_calculate_ts_increment_7(self):
         # Arrange
         response1 = IP() / TCP()
@@ -0,0 +1,92 @@
+import random
+import pytest
+import unittest
+from os_hound.db_parser import DbParser
+from os_hound.scoring import Scoring
+from os_hound.vector_scoring import VectorScoring, np
+from tests.helpers import random_db, random_profile, reference_or_error, random_batch, expected_batch
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestVectorScoring(unittest.TestCase):
+    def test_ties(self):
+        os_dicts = [{"T1": {"R": "Y", "T": "3B-45"}, "os_title": "first"},
+                    {"T1": {"R": "N", "T": "3B-45"}, "os_title": "second"},
+                    {"T1": {"R": "Y|N", "T": "40"}, "os_title": "third"}]
+        profile = {"T1": {"R": "Y", "T": 0x40}}
+
+        result = VectorScoring(os_dicts).score(profile)
+
+        assert result == [(os_dicts[0], 115), (os_dicts[2], 115)]
+        assert all(type(score) is int for _, score in result)
+
+    def test_stop_value_ends_field(self):
+        os_dicts = [{"SEQ": {"TS": "U", "TI": "I"}, "os_title": "first"},
+                    {"SEQ": {"TS": "A", "TI": "I"}, "os_title": "second"}]
+
+        scores = VectorScoring(os_dicts).scores({"SEQ": {"TS": 10, "TI": "I"}})
+
+        assert scores.tolist() == [0, 200]
+
+    def test_invalid_value_raises(self):
+        os_dicts = [{"T1": {"T": "40"}, "os_title": "first"}, {"T1": {"T": "K"}, "os_title": "second"}]
+
+        with pytest.raises(ValueError, match="'K'"):
+            VectorScoring(os_dicts).score({"T1": {"T": 1}})
+
+    def test_missing_weight_raises(self):
+        os_dicts = [{"T1": {"R": "Y", "X": "Y"}, "os_title": "first"}]
+        profile = {"T1": {"R": "Y", "X": "Y"}}
+
+        with pytest.raises(KeyError):
+            Scoring().score(profile, os_dicts)
+        with pytest.raises(KeyError):
+            VectorScoring(os_dicts).score(profile)
+
+    def test_same_results_as_scoring(self):
+        rng = random.Random(2)
+        scoring = Scoring()
+        for _ in range(100):
+            os_dicts = random_db(rng, scoring, 20)
+            profile = random_profile(rng, scoring)
+
+            expected = reference_or_error(scoring.score, profile, os_dicts)
+            assert reference_or_error(VectorScoring(os_dicts).score, profile) == expected
+            assert reference_or_error(VectorScoring(DbParser().compile_db(os_dicts)).score, profile) == expected
+
+    def test_score_many_same_results_as_score(self):
+        rng = random.Random(4)
+        scoring = Scoring()
+        for _ in range(50):
+            os_dicts = random_db(rng, scoring, 20)
+            profiles = random_batch(rng, scoring, 5)
+            compiled = DbParser().compile_db(os_dicts)
+            vector_scoring = VectorScoring(compiled)
+
+            expected = expected_batch(scoring.score, profiles, compiled)
+            assert reference_or_error(vector_scoring.score_many, profiles) == expected
+            assert reference_or_error(vector_scoring.score_many, profiles, 2) == expected
+
+    def test_score_many_hosts(self):
+        rng = random.Random(5)
+        scoring = Scoring()
+        for _ in range(10):
+            os_dicts = DbParser().compile_db(random_db(rng, scoring, 20))
+            # Hosts of a few kinds that only differ in some SEQ values, sharing the sums of the other fields
+            bases = [random_profile(rng, scoring) for _ in range(3)]
+            profiles = []
+            for _ in range(30):
+                profile = dict(rng.choice(bases))
+                profile["SEQ"] = dict(profile["SEQ"], SP=rng.randint(0, 0x10), ISR=rng.randint(0, 0x10))
+                profiles.append(profile)
+
+            expected = expected_batch(scoring.score, profiles, os_dicts)
+            assert reference_or_error(VectorScoring(os_dicts).score_many, profiles, 8) == expected
+
+    def test_score_many_empty(self):
+        assert VectorScoring([]).score_many([{"T1": {"R": "Y"}}]) == [[]]
+        assert VectorScoring([{"T1": {"R": "Y"}, "os_title": "first"}]).score_many([]) == []
+
+
+if __name__ == '__main__':
+    pytest.main()